@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import argparse
+import contextlib
+import time
+
+from yt_dlp.aes import (
+    _native_aes_cbc_decrypt,
+    _native_aes_gcm_decrypt_and_verify,
+    aes_cbc_decrypt,
+    aes_gcm_decrypt_and_verify,
+)
+
+# The test vectors of test/test_aes.py
+KEY = IV = bytes([0x20, 0x15] + 14 * [0])
+SECRET_MSG = b'Secret message goes here'
+CBC_DATA = b'\x97\x92+\xe5\x0b\xc3\x18\x91ky9m&\xb3\xb5@\xe6\x27\xc2\x96.\xc8u\x88\xab9-[\x9e|\xf1\xcd'
+GCM_DATA = b'\x159Y\xcf5eud\x90\x9c\x85&]\x14\x1d\x0f.\x08\xb4T\xe4/\x17\xbd'
+GCM_TAG = b'\xe8&I\x80rI\x07\x9d}YWuU@:e'
+
+
+def check_vectors():
+    for name, decrypted in (
+        ('CBC (lists)', bytes(aes_cbc_decrypt(list(CBC_DATA), list(KEY), list(IV))).rstrip(b'\x08')),
+        ('CBC (native)', _native_aes_cbc_decrypt(CBC_DATA, KEY, IV).rstrip(b'\x08')),
+        ('GCM (lists)', bytes(aes_gcm_decrypt_and_verify(list(GCM_DATA), list(KEY), list(GCM_TAG), list(IV[:12])))),
+        ('GCM (native)', _native_aes_gcm_decrypt_and_verify(GCM_DATA, KEY, GCM_TAG, IV[:12])),
+    ):
+        if decrypted != SECRET_MSG:
+            sys.exit(f'{name} does not decrypt the test vector')
+
+
+def benchmark(func, size):
+    start = time.perf_counter()
+    func()
+    return size / (time.perf_counter() - start) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the native AES implementations')
+    parser.add_argument('-n', '--size', type=int, default=64, help='KiB of data to decrypt (default: %(default)s)')
+    args = parser.parse_args()
+    check_vectors()
+
+    data = os.urandom(args.size * 1024)
+    # The tag does not match, but the whole data is decrypted and hashed before it is checked
+    tag = bytes(16)
+
+    def gcm(func, *args):
+        with contextlib.suppress(ValueError):
+            func(*args)
+
+    print(f'{"Mode":<6} {"Lists (KiB/s)":>14} {"Native (KiB/s)":>15} {"Speedup":>8}')
+    for mode, lists, native in (
+        ('CBC', lambda: aes_cbc_decrypt(list(data), list(KEY), list(IV)),
+         lambda: _native_aes_cbc_decrypt(data, KEY, IV)),
+        ('GCM', lambda: gcm(aes_gcm_decrypt_and_verify, list(data), list(KEY), list(tag), list(IV[:12])),
+         lambda: gcm(_native_aes_gcm_decrypt_and_verify, data, KEY, tag, IV[:12])),
+    ):
+        lists_speed, native_speed = benchmark(lists, len(data)), benchmark(native, len(data))
+        print(f'{mode:<6} {lists_speed:>14.1f} {native_speed:>15.1f} {native_speed / lists_speed:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
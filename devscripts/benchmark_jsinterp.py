@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import argparse
+import time
+
+from yt_dlp import YoutubeDL
+from yt_dlp.extractor.youtube import YoutubeIE
+from yt_dlp.jsinterp import JSInterpreter
+
+
+def nsig_functions(ie, player_fn):
+    """The nsig function of the player, interpreted and compiled"""
+    with open(player_fn, encoding='utf-8') as f:
+        jscode = f.read()
+    func_name = ie._extract_n_function_name(jscode)
+    argnames, code = ie._fixup_n_function_code(*JSInterpreter(jscode).extract_function_code(func_name), jscode, None)
+    jsi = JSInterpreter(code)
+    return jsi._interpret_function_from_code(argnames, code), jsi.extract_function_from_code(argnames, code)
+
+
+def benchmark(func, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        func([f'{i:016d}'])
+    return (time.perf_counter() - start) / calls * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the JS interpreter on the nsig function of YouTube players')
+    parser.add_argument(
+        '-n', '--calls', type=int, default=20, help='number of calls per function (default: %(default)s)')
+    parser.add_argument('players', nargs='+', help='player JS files, eg. as saved in test/testdata/sigs')
+    args = parser.parse_args()
+
+    with YoutubeDL({'quiet': True}) as ydl:
+        ie = YoutubeIE(ydl)
+        print(f'{"Player":<40} {"Interpreted (ms)":>17} {"Compiled (ms)":>14} {"Speedup":>8}')
+        for player_fn in args.players:
+            interpreted, compiled = nsig_functions(ie, player_fn)
+            assert interpreted(['AbCdEfGhIjKlMnOpQ']) == compiled(['AbCdEfGhIjKlMnOpQ']), 'nsig results differ'
+            interpreted, compiled = benchmark(interpreted, args.calls), benchmark(compiled, args.calls)
+            print(f'{os.path.basename(player_fn):<40} {interpreted:>17.2f} {compiled:>14.2f} '
+                  f'{interpreted / compiled:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import argparse
+import time
+
+from yt_dlp.utils import match_str
+from yt_dlp.utils._utils import _compile_match_one, _compile_match_str
+
+FILTERS = (
+    '!is_live',
+    'duration>?60 & duration<?3600',
+    "title~='(?i)\\bmusic\\b' & view_count>=10K",
+    'like_count>?100 & description & channel!*=Topic',
+)
+
+
+def flat_playlist_entries(count):
+    """Synthetic entries shaped like those of a --flat-playlist run"""
+    for i in range(count):
+        yield {
+            '_type': 'url',
+            'ie_key': 'Youtube',
+            'id': f'{i:011d}',
+            'url': f'https://www.youtube.com/watch?v={i:011d}',
+            'title': f'Music video number {i}' if i % 3 else f'Video number {i}',
+            'duration': 60 + i % 3600,
+            'view_count': i * 37,
+            'channel': 'Channel',
+        }
+
+
+def benchmark(filter_str, entries, compiled):
+    start = time.perf_counter()
+    for info in entries:
+        # Each entry is checked while incomplete and again once it has been extracted
+        for incomplete in (True, False):
+            if not compiled:
+                _compile_match_one.cache_clear()
+                _compile_match_str.cache_clear()
+            match_str(filter_str, info, incomplete)
+    return (time.perf_counter() - start) / len(entries) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the evaluation of --match-filters')
+    parser.add_argument('-n', '--entries', type=int, default=5000, help='number of info dicts (default: %(default)s)')
+    parser.add_argument('filters', nargs='*', default=FILTERS, help='match filters to evaluate')
+    args = parser.parse_args()
+
+    entries = list(flat_playlist_entries(args.entries))
+    print(f'{"Filter":<60} {"Parsed (us)":>12} {"Compiled (us)":>14} {"Speedup":>8}')
+    for filter_str in args.filters:
+        parsed = benchmark(filter_str, entries, compiled=False)
+        compiled = benchmark(filter_str, entries, compiled=True)
+        print(f'{filter_str:<60} {parsed:>12.1f} {compiled:>14.1f} {parsed / compiled:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import argparse
+import time
+
+from yt_dlp import YoutubeDL
+from yt_dlp.YoutubeDL import _compile_outtmpl
+
+TEMPLATES = (
+    '%(id)s',
+    '%(title)s [%(id)s] %(duration_string)s',
+    '%(upload_date>%Y-%m-%d)s %(title).50s %(view_count)08d',
+    '%(playlist_index)s - %(title)s [%(id)s].%(ext)s',
+    '%(url)q',
+)
+
+
+def flat_playlist_entries(count):
+    """Synthetic entries shaped like those of a --flat-playlist run"""
+    for i in range(count):
+        yield {
+            '_type': 'url',
+            'ie_key': 'Youtube',
+            'id': f'{i:011d}',
+            'url': f'https://www.youtube.com/watch?v={i:011d}',
+            'title': f'Video number {i}',
+            'duration': 60 + i % 3600,
+            'view_count': i * 37,
+            'channel': 'Channel',
+            'upload_date': '20240101',
+            'thumbnails': [{'url': f'https://i.ytimg.com/vi/{i:011d}/{j}.jpg'} for j in range(10)],
+            'playlist_index': i + 1,
+            'n_entries': count,
+        }
+
+
+def benchmark(ydl, template, entries, compiled):
+    start = time.perf_counter()
+    for info in entries:
+        if not compiled:
+            _compile_outtmpl.cache_clear()
+            ydl.escape_outtmpl.cache_clear()
+        ydl.evaluate_outtmpl(template, info)
+    return (time.perf_counter() - start) / len(entries) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the evaluation of output templates, as used by --print')
+    parser.add_argument('-n', '--entries', type=int, default=5000, help='number of info dicts (default: %(default)s)')
+    parser.add_argument('templates', nargs='*', default=TEMPLATES, help='output templates to evaluate')
+    args = parser.parse_args()
+
+    entries = list(flat_playlist_entries(args.entries))
+    with YoutubeDL({'quiet': True}) as ydl:
+        print(f'{"Template":<60} {"Parsed (us)":>12} {"Compiled (us)":>14} {"Speedup":>8}')
+        for template in args.templates:
+            parsed = benchmark(ydl, template, entries, compiled=False)
+            compiled = benchmark(ydl, template, entries, compiled=True)
+            print(f'{template:<60} {parsed:>12.1f} {compiled:>14.1f} {parsed / compiled:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import argparse
+import itertools
+import time
+
+from yt_dlp.extractor import gen_extractor_classes
+from yt_dlp.extractor._url_index import ExtractorURLIndex
+
+
+def test_urls(ies):
+    """The URLs of the tests of all the extractors"""
+    for ie in ies:
+        for test in ie.get_testcases(include_onlymatching=True):
+            yield test['url']
+
+
+def first_suitable(ies, url):
+    return next((ie_key for ie_key, ie in ies if ie.suitable(url)), None)
+
+
+def benchmark(urls, find_ies):
+    start = time.perf_counter()
+    for url in urls:
+        first_suitable(find_ies(url), url)
+    return (time.perf_counter() - start) / len(urls) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark finding the suitable extractor for URLs')
+    parser.add_argument('-n', '--urls', type=int, default=None, help='number of URLs to route (default: all test URLs)')
+    parser.add_argument('urls_file', nargs='?', help='file with one URL per line (default: the test URLs)')
+    args = parser.parse_args()
+
+    ies = [(ie.ie_key(), ie) for ie in gen_extractor_classes()]
+    if args.urls_file:
+        with open(args.urls_file, encoding='utf-8') as f:
+            urls = list(filter(None, map(str.strip, f)))
+    else:
+        urls = list(test_urls(ie for _, ie in ies))
+    if args.urls:
+        urls = list(itertools.islice(itertools.cycle(urls), args.urls))
+
+    start = time.perf_counter()
+    index = ExtractorURLIndex(ies)
+    print(f'Indexed {len(ies)} extractors in {time.perf_counter() - start:.2f}s')
+
+    mismatches = [url for url in urls if first_suitable(ies, url) != first_suitable(index.candidates(url), url)]
+    for url in mismatches:
+        print(f'Different extractor found for {url}')
+
+    linear = benchmark(urls, lambda url: ies)
+    indexed = benchmark(urls, index.candidates)
+    print(f'{"URLs":<10} {"Linear (us)":>12} {"Indexed (us)":>13} {"Speedup":>8}')
+    print(f'{len(urls):<10} {linear:>12.1f} {indexed:>13.1f} {linear / indexed:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
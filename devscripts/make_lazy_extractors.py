@@ -11,6 +11,7 @@
 
 from devscripts.utils import get_filename_args, read_file, write_file
 from yt_dlp.extractor import import_extractors
+from yt_dlp.extractor._url_index import extractor_url_hosts
 from yt_dlp.extractor.common import InfoExtractor, SearchInfoExtractor
 from yt_dlp.globals import extractors
 
@@ -31,6 +32,7 @@
 IE_TEMPLATE = '''
 class {name}({bases}):
     _module = {module!r}
+    _URL_HOSTS = {url_hosts!r}
 '''
 MODULE_TEMPLATE = read_file('devscripts/lazy_load_template.py')
 
@@ -107,7 +109,11 @@ def build_lazy_ie(ie, name, attr_base):
         'SearchInfoExtractor': 'LazyLoadSearchExtractor',
     }.get(base.__name__, base.__name__) for base in ie.__bases__)
 
-    s = IE_TEMPLATE.format(name=name, module=ie.__module__, bases=bases)
+    # Used by ExtractorURLIndex; defined for every class since it must not be inherited
+    url_hosts = extractor_url_hosts(ie)
+    if url_hosts is not None:
+        url_hosts = tuple(sorted(url_hosts))
+    s = IE_TEMPLATE.format(name=name, module=ie.__module__, bases=bases, url_hosts=url_hosts)
     return s + '\n'.join(extra_ie_code(ie, attr_base))
 
 
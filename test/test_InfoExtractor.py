@@ -10,6 +10,7 @@
 
 import http.server
 import threading
+import time
 
 from test.helper import FakeYDL, expect_dict, expect_value, http_server_port
 from yt_dlp.compat import compat_etree_fromstring
@@ -1425,6 +1426,45 @@ def test_parse_mpd_formats(self):
                 expect_value(self, formats, expected_formats, None)
                 expect_value(self, subtitles, expected_subtitles, None)
 
+    def test_parse_dynamic_mpd_formats(self):
+        # The segments that ended within the time shift buffer are available
+        availability_start_time = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(time.time() - 101))
+        formats = self.ie._parse_mpd_formats(compat_etree_fromstring(f'''<?xml version="1.0"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="dynamic" availabilityStartTime="{availability_start_time}"
+     timeShiftBufferDepth="PT10S" minimumUpdatePeriod="PT2S">
+  <Period id="1" start="PT0S">
+    <AdaptationSet mimeType="video/mp4">
+      <SegmentTemplate timescale="1000" duration="2000" startNumber="1" media="$Number$.m4s"/>
+      <Representation id="v" bandwidth="1000000" codecs="avc1.64001f" width="1280" height="720"/>
+    </AdaptationSet>
+  </Period>
+</MPD>'''.encode()), mpd_base_url='http://unknown/', mpd_url='http://unknown/live.mpd')
+        self.assertEqual(
+            [fragment['path'] for fragment in formats[0]['fragments']], [f'{n}.m4s' for n in range(46, 51)])
+        self.assertEqual(formats[0]['fragments'][0]['duration'], 2)
+
+    def test_parse_mpd_byte_ranges(self):
+        formats = self.ie._parse_mpd_formats(compat_etree_fromstring(b'''<?xml version="1.0"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" mediaPresentationDuration="PT4S">
+  <Period>
+    <AdaptationSet mimeType="video/mp4">
+      <Representation id="v" bandwidth="1000000" codecs="avc1.64001f" width="1280" height="720">
+        <BaseURL>video.mp4</BaseURL>
+        <SegmentList timescale="1000" duration="2000">
+          <Initialization range="0-99"/>
+          <SegmentURL mediaRange="100-599"/>
+          <SegmentURL mediaRange="600-999"/>
+        </SegmentList>
+      </Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>'''), mpd_base_url='http://unknown/', mpd_url='http://unknown/manifest.mpd')
+        self.assertEqual(formats[0]['fragments'], [
+            {'url': 'http://unknown/video.mp4', 'byte_range': {'start': 0, 'end': 100}},
+            {'url': 'http://unknown/video.mp4', 'byte_range': {'start': 100, 'end': 600}, 'duration': 2},
+            {'url': 'http://unknown/video.mp4', 'byte_range': {'start': 600, 'end': 1000}, 'duration': 2},
+        ])
+
     def test_parse_ism_formats(self):
         _TEST_CASES = [
             (
@@ -13,7 +13,12 @@
 
 import contextlib
 import copy
+import functools
 import json
+import shutil
+import tempfile
+import threading
+import time
 
 from test.helper import FakeYDL, assertRegexpMatches, try_rm
 from yt_dlp import YoutubeDL
@@ -23,11 +28,13 @@
 from yt_dlp.utils import (
     ExtractorError,
     LazyList,
+    MaxDownloadsReached,
     OnDemandPagedList,
     int_or_none,
     match_filter_func,
 )
 from yt_dlp.utils.traversal import traverse_obj
+from yt_dlp.YoutubeDL import _compile_outtmpl
 
 TEST_URL = 'http://localhost/sample.mp4'
 
@@ -951,6 +958,25 @@ def gen():
         test('%(title3)s', ('foo/bar\\test', 'foo⧸bar⧹test'))
         test('folder/%(title3)s', ('folder/foo/bar\\test', f'folder{os.path.sep}foo⧸bar⧹test'))
 
+    def test_compiled_outtmpl(self):
+        _compile_outtmpl.cache_clear()
+        tmpl = '%(title)s - %(formats.0.{format_id,ext})j %(width+height|NA)s %(duration_string)s'
+        parts, keys = _compile_outtmpl(tmpl)
+        self.assertEqual(keys, {'title', 'formats', 'width', 'height', 'duration_string'})
+        self.assertIs(_compile_outtmpl(tmpl)[0], parts)
+        self.assertIsNone(_compile_outtmpl('%()j')[1])
+
+        ydl = YoutubeDL()
+        info = {'title': 'foo', 'formats': [{'format_id': '1', 'ext': 'mp4'}], 'duration': 61, 'id': '1234'}
+        self.assertEqual(
+            ydl.evaluate_outtmpl(tmpl, info),
+            'foo - {"format_id": "1", "ext": "mp4"} NA 1:01')
+        self.assertEqual(
+            ydl.evaluate_outtmpl(tmpl, {**info, 'width': 1, 'height': 2}),
+            'foo - {"format_id": "1", "ext": "mp4"} 3.0 1:01')
+        # The template is only parsed once
+        self.assertEqual(_compile_outtmpl.cache_info().misses, 2)
+
     def test_format_note(self):
         ydl = YoutubeDL()
         self.assertEqual(ydl._format_note({}), '')
@@ -1306,6 +1332,219 @@ def _real_extract(self, url):
         self.assertEqual(downloaded['extractor'], 'Video')
         self.assertEqual(downloaded['extractor_key'], 'Video')
 
+    def test_concurrent_playlist_entries(self):
+        def playlist(n):
+            return {
+                '_type': 'playlist',
+                'id': 'test',
+                'extractor': 'test:playlist',
+                'extractor_key': 'test:playlist',
+                'webpage_url': 'http://example.com',
+                'entries': [{
+                    'id': str(i),
+                    'title': str(i),
+                    'url': TEST_URL,
+                } for i in range(n)],
+            }
+
+        class _YDL(YDL):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.threads = set()
+
+            def process_info(self, info_dict):
+                self.threads.add(threading.get_ident())
+                # Finish the entries in reverse order
+                time.sleep(0.02 * (10 - int(info_dict['id'])))
+                super().process_info(info_dict)
+
+        ydl = _YDL({'concurrent_video_downloads': 4})
+        result = ydl.process_ie_result(playlist(10))
+        self.assertEqual([e['id'] for e in result['entries']], [str(i) for i in range(10)])
+        self.assertEqual([e['playlist_index'] for e in result['entries']], list(range(1, 11)))
+        self.assertEqual(sorted(int(i['id']) for i in ydl.downloaded_info_dicts), list(range(10)))
+        self.assertGreater(len(ydl.threads), 1)
+        self.assertNotIn(threading.get_ident(), ydl.threads)
+
+        ydl = FakeYDL({'concurrent_video_downloads': 4, 'max_downloads': 3, 'simulate': True})
+        with self.assertRaises(MaxDownloadsReached):
+            ydl.process_ie_result(playlist(10))
+        self.assertEqual(ydl._num_downloads, 3)
+
+    def test_concurrent_urls_output_order(self):
+        finished = []
+
+        class _TestIE(InfoExtractor):
+            _VALID_URL = r'test:(?P<id>\d+)'
+
+            def _real_extract(self, url):
+                video_id = self._match_id(url)
+                # Finish the URLs in reverse order
+                time.sleep(0.02 * (5 - int(video_id)))
+                finished.append(video_id)
+                return {'id': video_id, 'title': video_id, 'url': TEST_URL}
+
+        class _YDL(FakeYDL):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.stdout = []
+
+            def _write_string(self, message, out=None, only_once=False):
+                if out is self._out_files.out:
+                    self.stdout.append(message)
+
+        ydl = _YDL({'concurrent_video_downloads': 4, 'dump_single_json': True, 'simulate': True})
+        ydl.add_info_extractor(_TestIE(ydl))
+        YoutubeDL.download(ydl, [f'test:{i}' for i in range(5)])
+        self.assertNotEqual(finished, [str(i) for i in range(5)])
+        # The output is written in the order of the URLs
+        self.assertEqual([json.loads(line)['id'] for line in ydl.stdout], [str(i) for i in range(5)])
+
+    def test_concurrent_extractor_instances(self):
+        instances, lock = set(), threading.Lock()
+
+        class _TestIE(InfoExtractor):
+            _VALID_URL = r'test:(?P<id>\d+)'
+
+            def _real_extract(self, url):
+                video_id = self._match_id(url)
+                with lock:
+                    instances.add(self)
+                # The state of the extraction is not changed by the other jobs
+                self._video_id = video_id
+                time.sleep(0.05)
+                return {'id': self._video_id, 'title': video_id, 'url': TEST_URL}
+
+        ydl = FakeYDL({'concurrent_video_downloads': 4, 'simulate': True})
+        ie = _TestIE(ydl)
+        ydl.add_info_extractor(ie)
+        infos = [info for _, info in ydl._run_jobs(
+            (i, functools.partial(ydl.extract_info, f'test:{i}', download=False)) for i in range(4))]
+        self.assertEqual(sorted(info['id'] for info in infos), [str(i) for i in range(4)])
+        self.assertEqual(len(instances), 4)
+        self.assertNotIn(ie, instances)
+        self.assertIs(ydl.get_info_extractor(_TestIE.ie_key()), ie)
+
+    def test_pipeline_stages(self):
+        from yt_dlp.YoutubeDL import _PipelineStages
+
+        pipeline = _PipelineStages(('extract', 'download', 'post_process'))
+        events, lock = [], threading.Lock()
+        active = dict.fromkeys(pipeline.stages, 0)
+
+        def run(job, seq, stages):
+            for stage in stages:
+                job.enter(stage)
+                with lock:
+                    active[stage] += 1
+                    self.assertEqual(active[stage], 1, f'More than one job in stage {stage}')
+                    events.append((stage, seq))
+                time.sleep(0.01)
+                with lock:
+                    active[stage] -= 1
+            job.finish()
+
+        jobs = [(pipeline.new_job(), seq) for seq in range(6)]
+        # Odd jobs are not downloaded and skip ahead to post-processing
+        threads = [threading.Thread(target=run, args=(job, seq, (
+            'extract', 'post_process') if seq % 2 else pipeline.stages)) for job, seq in reversed(jobs)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for stage in pipeline.stages:
+            seqs = [seq for s, seq in events if s == stage]
+            self.assertEqual(seqs, sorted(seqs), f'Jobs entered stage {stage} out of order')
+        self.assertEqual([seq for s, seq in events if s == 'download'], [0, 2, 4])
+        self.assertEqual(len(events), 6 * 2 + 3)
+
+    def test_pipelined_playlist_entries(self):
+        entry_count = 5
+        lock, events = threading.Lock(), []
+        in_flight, max_in_flight = set(), [0]
+        download_started = [threading.Event() for _ in range(entry_count)]
+
+        def record(stage, video_id, action):
+            with lock:
+                events.append((stage, int(video_id), action))
+
+        class _PP(PostProcessor):
+            def run(self, info):
+                video_id = int(info['id'])
+                record('post_process', video_id, 'enter')
+                # Wait for the next entry to start downloading; a sequential run would time out here
+                if video_id + 1 < entry_count:
+                    download_started[video_id + 1].wait(5)
+                record('post_process', video_id, 'leave')
+                return [], info
+
+        class _YDL(YoutubeDL):
+            def process_info(self, info_dict):
+                with lock:
+                    in_flight.add(info_dict['id'])
+                    max_in_flight[0] = max(max_in_flight[0], len(in_flight))
+                try:
+                    super().process_info(info_dict)
+                finally:
+                    with lock:
+                        in_flight.discard(info_dict['id'])
+
+            def dl(self, name, info, subtitle=False, test=False):
+                video_id = int(info['id'])
+                record('download', video_id, 'enter')
+                download_started[video_id].set()
+                time.sleep(0.01)
+                with open(name, 'wb') as f:
+                    f.write(b'test')
+                record('download', video_id, 'leave')
+                return True, True
+
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        ydl = _YDL({
+            'pipelined_downloads': True,
+            'outtmpl': os.path.join(tmpdir, '%(id)s.%(ext)s'),
+            'fixup': 'never',
+            'quiet': True,
+            'noprogress': True,
+        })
+        ydl.add_post_processor(_PP(), when='post_process')
+        result = ydl.process_ie_result({
+            '_type': 'playlist',
+            'id': 'test',
+            'extractor': 'test:playlist',
+            'extractor_key': 'test:playlist',
+            'webpage_url': 'http://example.com',
+            'entries': [{
+                'id': str(i),
+                'title': str(i),
+                'url': TEST_URL,
+                'ext': 'mp4',
+            } for i in range(entry_count)],
+        })
+        self.assertEqual([e['id'] for e in result['entries']], [str(i) for i in range(entry_count)])
+
+        active = {'download': 0, 'post_process': 0}
+        intervals = {}
+        for index, (stage, video_id, action) in enumerate(events):
+            active[stage] += 1 if action == 'enter' else -1
+            # Each stage admits one entry at a time with concurrent_video_downloads=1
+            self.assertIn(active[stage], (0, 1), f'More than one entry in stage {stage}')
+            intervals.setdefault((stage, video_id), []).append(index)
+        for stage in active:
+            self.assertEqual(
+                [video_id for s, video_id, action in events if s == stage and action == 'enter'],
+                list(range(entry_count)), f'Entries entered stage {stage} out of order')
+        for video_id in range(entry_count - 1):
+            pp_enter, pp_leave = intervals['post_process', video_id]
+            dl_enter, dl_leave = intervals['download', video_id + 1]
+            self.assertLess(dl_enter, pp_leave, f'Entry {video_id + 1} was not downloaded during post-processing')
+            self.assertLess(pp_enter, dl_leave, f'Entry {video_id + 1} was not downloaded during post-processing')
+        # The entries in progress are bounded by one per stage
+        self.assertLessEqual(max_in_flight[0], len(YoutubeDL._PIPELINE_STAGES))
+        self.assertGreater(max_in_flight[0], 1)
+
     def test_header_cookies(self):
         from http.cookiejar import Cookie
 
@@ -1429,6 +1668,68 @@ def check_for_cookie_header(result):
         self.assertFalse(result.get('cookies'), msg='Cookies set in cookies field for wrong domain')
         self.assertFalse(ydl.cookiejar.get_cookie_header(fmt['url']), msg='Cookies set in cookiejar for wrong domain')
 
+    def test_extract_cache(self):
+        extractions, expire, headers = [], int(time.time()) + 3000, {}
+
+        class CachedIE(InfoExtractor):
+            _VALID_URL = r'cached:(?P<id>\w+)'
+
+            def _real_extract(self, url):
+                video_id = self._match_id(url)
+                extractions.append(video_id)
+                return _make_result([{'url': f'{TEST_URL}?expire={expire}', 'http_headers': headers}], id=video_id)
+
+        cachedir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cachedir)
+
+        def extract(url, **params):
+            ydl = YDL({'cachedir': cachedir, 'extract_cache': True, **params})
+            ydl.add_info_extractor(CachedIE(ydl))
+            ydl.extract_info(url)
+            self.assertEqual(ydl.downloaded_info_dicts[0]['url'], f'{TEST_URL}?expire={expire}')
+            return ydl
+
+        def cache_entry(ydl, url):
+            return ydl.cache.backend.get(
+                'extract-results', ydl._extract_cache_key(ydl.get_info_extractor('Cached'), url))
+
+        extract('cached:a')
+        ydl = extract('cached:a')
+        self.assertEqual(extractions, ['a'])
+        self.assertEqual(ydl._extract_cache_stats, {'hits': 1})
+        self.assertAlmostEqual(
+            cache_entry(ydl, 'cached:a')['expires'], expire - YoutubeDL._EXTRACT_CACHE_MARGIN, delta=5)
+        extract('cached:a', extract_cache=False)
+        self.assertEqual(extractions, ['a', 'a'])
+
+        # The results are not shared with other extractor args, cookies, accounts or source addresses
+        extract('cached:a', extractor_args={'cached': {'client': ['other']}})
+        extract('cached:a', cookiefile='other.txt')
+        extract('cached:a', username='other')
+        extract('cached:a', source_address='0.0.0.0')
+        self.assertEqual(extractions, ['a'] * 6)
+        # Nor with newer versions
+        with patch('yt_dlp.YoutubeDL.__version__', '9999.01.01'):
+            extract('cached:a')
+        self.assertEqual(extractions, ['a'] * 7)
+
+        # The maximum age is used if it is earlier than the expiry of the formats
+        ydl = extract('cached:b', extract_cache_max_age=60)
+        self.assertEqual(ydl._extract_cache_stats, {'misses': 1})
+        self.assertAlmostEqual(cache_entry(ydl, 'cached:b')['expires'], time.time() + 60, delta=5)
+
+        # Formats that are about to expire are not cached
+        expire = int(time.time()) + 300
+        extract('cached:c')
+        extract('cached:c')
+        self.assertEqual(extractions, ['a'] * 7 + ['b', 'c', 'c'])
+
+        # Nor are the results with credentials in their headers
+        expire = int(time.time()) + 3000
+        headers['Authorization'] = 'Bearer secret'
+        ydl = extract('cached:d')
+        self.assertIsNone(cache_entry(ydl, 'cached:d'))
+
     def test_load_plugins_compat(self):
         # Should try to reload plugins if they haven't already been loaded
         all_plugins_loaded.value = False
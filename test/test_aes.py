@@ -9,8 +9,12 @@
 
 
 import base64
+import random
 
 from yt_dlp.aes import (
+    _native_aes_cbc_decrypt,
+    _native_aes_cbc_encrypt,
+    _native_aes_gcm_decrypt_and_verify,
     aes_cbc_decrypt,
     aes_cbc_decrypt_bytes,
     aes_cbc_encrypt,
@@ -23,6 +27,7 @@
     aes_encrypt,
     aes_gcm_decrypt_and_verify,
     aes_gcm_decrypt_and_verify_bytes,
+    ghash,
     key_expansion,
     pad_block,
 )
@@ -94,6 +99,50 @@ def test_gcm_aligned_decrypt(self):
                 data, bytes(self.key), authentication_tag, bytes(self.iv[:12]))
             self.assertEqual(decrypted.rstrip(b'\x08'), self.secret_msg[:16])
 
+    def test_native_bytes(self):
+        # The native implementation of the *_bytes functions is used when pycryptodome is unavailable
+        data = b'\x97\x92+\xe5\x0b\xc3\x18\x91ky9m&\xb3\xb5@\xe6\x27\xc2\x96.\xc8u\x88\xab9-[\x9e|\xf1\xcd'
+        self.assertEqual(_native_aes_cbc_decrypt(data, bytes(self.key), bytes(self.iv)).rstrip(b'\x08'), self.secret_msg)
+        self.assertEqual(_native_aes_cbc_encrypt(self.secret_msg, bytes(self.key), bytes(self.iv)), data)
+
+        data = b'\x159Y\xcf5eud\x90\x9c\x85&]\x14\x1d\x0f.\x08\xb4T\xe4/\x17\xbd'
+        authentication_tag = b'\xe8&I\x80rI\x07\x9d}YWuU@:e'
+        decrypted = _native_aes_gcm_decrypt_and_verify(data, bytes(self.key), authentication_tag, bytes(self.iv[:12]))
+        self.assertEqual(decrypted, self.secret_msg)
+        with self.assertRaisesRegex(ValueError, 'Mismatching authentication tag'):
+            _native_aes_gcm_decrypt_and_verify(data, bytes(self.key), authentication_tag[::-1], bytes(self.iv[:12]))
+
+    def test_native_bytes_random(self):
+        rand = random.Random(0)
+        for key_size in (16, 24, 32):
+            for length in (0, 1, 15, 16, 17, 100, 256):
+                key, iv = rand.randbytes(key_size), rand.randbytes(16)
+                data = rand.randbytes(length)
+                with self.subTest(key_size=key_size, length=length):
+                    self.assertEqual(
+                        _native_aes_cbc_decrypt(data, key, iv), bytes(aes_cbc_decrypt(list(data), list(key), list(iv))))
+                    for padding_mode in ('pkcs7', 'iso7816', 'whitespace', 'zero'):
+                        self.assertEqual(
+                            _native_aes_cbc_encrypt(data, key, iv, padding_mode=padding_mode),
+                            bytes(aes_cbc_encrypt(list(data), list(key), list(iv), padding_mode=padding_mode)))
+                    for nonce in (iv[:12], iv):
+                        tag = self._gcm_tag(list(data), list(key), list(nonce))
+                        self.assertEqual(
+                            _native_aes_gcm_decrypt_and_verify(data, key, bytes(tag), nonce),
+                            bytes(aes_gcm_decrypt_and_verify(list(data), list(key), tag, list(nonce))))
+                        with self.assertRaises(ValueError):
+                            _native_aes_gcm_decrypt_and_verify(data, key, bytes(tag[::-1]), nonce)
+
+    @staticmethod
+    def _gcm_tag(data, key, nonce):
+        hash_subkey = aes_encrypt([0] * 16, key_expansion(key))
+        if len(nonce) == 12:
+            j0 = [*nonce, 0, 0, 0, 1]
+        else:
+            j0 = ghash(hash_subkey, nonce + [0] * (-len(nonce) % 16 + 8) + list((8 * len(nonce)).to_bytes(8, 'big')))
+        s_tag = ghash(hash_subkey, data + [0] * (-len(data) % 16) + [0] * 8 + list((len(data) * 8).to_bytes(8, 'big')))
+        return aes_ctr_encrypt(s_tag, key, j0)
+
     def test_decrypt_text(self):
         password = bytes(self.key).decode()
         encrypted = base64.b64encode(
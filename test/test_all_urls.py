@@ -12,6 +12,7 @@
 
 from test.helper import gettestcases
 from yt_dlp.extractor import FacebookIE, YoutubeIE, gen_extractors
+from yt_dlp.extractor._url_index import ExtractorURLIndex, url_hosts
 
 
 class TestAllURLsMatching(unittest.TestCase):
@@ -82,6 +83,30 @@ def test_no_duplicates(self):
                         ie.suitable(url),
                         f'{type(ie).__name__} should not match URL {url!r} . That URL belongs to {tc["name"]}.')
 
+    def test_url_hosts(self):
+        self.assertEqual(url_hosts(r'https?://(?:www\.)?vimeo\.com/(?P<id>\d+)'), {'vimeo.com', 'www.vimeo.com'})
+        self.assertEqual(url_hosts(r'https?://(?:[^/]+\.)?apa\.at/embed/'), {'apa.at'})
+        self.assertEqual(url_hosts(r'https?://[a-z]+\.Example\.com(?::\d+)?$'), {'example.com'})
+        self.assertEqual(url_hosts([r'(?i)mms://.+', r'npo:(?P<id>\d+)']), {'^mms://', 'npo'})
+        self.assertEqual(url_hosts(r'ytsearch(?P<prefix>|[1-9][0-9]*|all):.+'), {'ytsearch', 'ytsearchall', '^ytsearch'})
+        self.assertEqual(url_hosts(False), set())
+        self.assertIsNone(url_hosts(r'https?://[^/]+/Mediasite/'))
+        self.assertIsNone(url_hosts(r'https?://(?:www\.)?example.com/'))
+        self.assertIsNone(url_hosts(r'.*'))
+
+    def test_url_index(self):
+        ies = [(ie.ie_key(), ie) for ie in self.ies]
+        index = ExtractorURLIndex(ies)
+        for tc in gettestcases(include_onlymatching=True):
+            self.assertIn(
+                tc['name'], [ie_key for ie_key, _ in index.candidates(tc['url'])],
+                f'{tc["name"]}IE should be a candidate for URL {tc["url"]!r}')
+        for url in (':ytsubs', 'ytsearch5:test', 'MMS://example.com/video', 'https://a/b.app.box.com/s/x',
+                    'HTTPS://VIMEO.COM/channels/31259', 'http://tatianamaslanydaily.tumblr.com/post/54196191430'):
+            self.assertEqual(
+                next(ie_key for ie_key, ie in index.candidates(url) if ie.suitable(url)),
+                next(ie_key for ie_key, ie in ies if ie.suitable(url)))
+
     def test_keywords(self):
         self.assertMatch(':ytsubs', ['youtube:subscriptions'])
         self.assertMatch(':ytsubscriptions', ['youtube:subscriptions'])
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import shutil
+
+from test.helper import FakeYDL
+from yt_dlp.archive import (
+    SQLiteDownloadArchive,
+    TextDownloadArchive,
+    open_download_archive,
+)
+from yt_dlp.dependencies import sqlite3
+
+
+class TestDownloadArchive(unittest.TestCase):
+    def setUp(self):
+        TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+        self.test_dir = os.path.join(TEST_DIR, 'testdata', 'archive_test')
+        self.tearDown()
+        os.makedirs(self.test_dir)
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _path(self, name):
+        return os.path.join(self.test_dir, name)
+
+    def test_text_archive(self):
+        fn = self._path('archive.txt')
+        with open(fn, 'w', encoding='utf-8') as f:
+            f.write('youtube abc\n')
+        archive = open_download_archive(fn)
+        self.assertIsInstance(archive, TextDownloadArchive)
+        self.assertIn('youtube abc', archive)
+        self.assertNotIn('youtube def', archive)
+        archive.add('youtube def')
+        archive.update(['youtube abc', 'youtube ghi'])
+        archive.close()
+        with open(fn, encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'youtube abc\nyoutube def\nyoutube ghi\n')
+
+    @unittest.skipUnless(sqlite3, 'sqlite3 is not available')
+    def test_sqlite_archive(self):
+        fn = self._path('archive.sqlite')
+        archive = open_download_archive(fn)
+        self.assertIsInstance(archive, SQLiteDownloadArchive)
+        self.assertNotIn('youtube abc', archive)
+        archive.add('youtube abc')
+        archive.add('youtube abc')
+        self.assertIn('youtube abc', archive)
+
+        # Pending IDs are only visible to other processes after they are written
+        other = SQLiteDownloadArchive(fn)
+        self.assertNotIn('youtube abc', other)
+        archive.update(f'youtube {i}' for i in range(archive.BATCH_SIZE))
+        self.assertIn('youtube abc', other)
+        archive.add('youtube def')
+        self.assertNotIn('youtube def', other)
+        archive.close()
+        self.assertIn('youtube def', other)
+        self.assertEqual(list(other)[:2], ['youtube abc', 'youtube 0'])
+        self.assertEqual(len(list(other)), archive.BATCH_SIZE + 2)
+        other.close()
+
+        # Existing databases are detected regardless of the extension
+        os.rename(fn, self._path('archive.txt'))
+        archive = open_download_archive(self._path('archive.txt'))
+        self.assertIsInstance(archive, SQLiteDownloadArchive)
+        self.assertIn('youtube def', archive)
+        archive.close()
+
+    @unittest.skipUnless(sqlite3, 'sqlite3 is not available')
+    def test_import_export(self):
+        text_fn, export_fn = self._path('archive.txt'), self._path('export.txt')
+        with open(text_fn, 'w', encoding='utf-8') as f:
+            f.write('youtube abc\n\nyoutube def\n')
+        archive = open_download_archive(self._path('archive.db'), backend='sqlite')
+        self.assertEqual(archive.import_text(text_fn), 2)
+        self.assertIn('youtube def', archive)
+        self.assertEqual(archive.export_text(export_fn), 2)
+        archive.close()
+        with open(export_fn, encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'youtube abc\nyoutube def\n')
+
+    @unittest.skipUnless(sqlite3, 'sqlite3 is not available')
+    def test_ydl_archive(self):
+        fn = self._path('archive.sqlite')
+        info = {'id': 'abc', 'extractor_key': 'Youtube'}
+        with FakeYDL({'download_archive': fn}) as ydl:
+            self.assertFalse(ydl.in_download_archive(info))
+            ydl.record_download_archive(info)
+            self.assertTrue(ydl.in_download_archive(info))
+        with FakeYDL({'download_archive': fn, 'download_archive_export': self._path('export.txt')}) as ydl:
+            self.assertTrue(ydl.in_download_archive(info))
+        with open(self._path('export.txt'), encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'youtube abc\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,10 +8,17 @@
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
+import json
 import shutil
+import time
+from unittest import mock
 
 from test.helper import FakeYDL
-from yt_dlp.cache import Cache
+from yt_dlp.cache import Cache, DirectoryCacheBackend, SQLiteCacheBackend
+from yt_dlp.dependencies import sqlite3
+from yt_dlp.version import __version__
+
+ENTRY_SIZE = len(json.dumps({'yt-dlp_version': __version__, 'data': 'lru0'}))
 
 
 def _is_empty(d):
@@ -52,6 +59,124 @@ def test_cache(self):
         self.assertFalse(os.path.exists(self.test_dir))
         self.assertEqual(c.load('test_cache', 'k.'), None)
 
+    def test_invalid_entry(self):
+        c = Cache(FakeYDL({'cachedir': self.test_dir}))
+        for entry in ({'yt-dlp_version': '2024.01.01'}, {'yt-dlp_version': 'invalid', 'data': 1}):
+            with self.subTest(entry=entry):
+                c.backend.put('test_cache', 'k', entry)
+                self.assertEqual(c.load('test_cache', 'k', default='default', min_ver='2023.01.01'), 'default')
+                # The entry is deleted
+                self.assertIsNone(c.backend.get('test_cache', 'k'))
+
+    def _test_backend(self, backend):
+        ydl = FakeYDL({
+            'cachedir': self.test_dir,
+            'cache_backend': backend,
+            'cache_max_size': int(ENTRY_SIZE * 3.5),
+        })
+        c = Cache(ydl)
+        obj = {'x': 1, 'y': ['ä', '\\a', True]}
+        self.assertEqual(c.load('test_cache', 'k.'), None)
+        c.store('test_cache', 'k.', obj)
+        self.assertEqual(c.load('test_cache', 'k.'), obj)
+        self.assertEqual(c.load('test_cache2', 'k.'), None)
+        self.assertEqual(c.load('test_cache', 'k.', min_ver='9999.01.01'), None)
+
+        c.store('test_cache', 'ttl', 1, ttl=10)
+        self.assertEqual(c.load('test_cache', 'ttl'), 1)
+        with mock.patch('time.time', return_value=time.time() + 20):
+            self.assertEqual(c.load('test_cache', 'ttl'), None)
+        self.assertEqual(c.backend.usage()[0], 1)
+
+        # Only the 3 most recently used entries fit, including those last loaded from memory
+        c.backend.delete('test_cache', 'k.')
+        for i in range(5):
+            time.sleep(0.01)
+            c.store('test_cache', f'lru{i}', f'lru{i}')
+            if i in (1, 2):
+                time.sleep(0.01)
+                self.assertEqual(c.load('test_cache', 'lru0'), 'lru0')
+        self.assertEqual(c.backend.usage(), (3, 3 * ENTRY_SIZE))
+        self.assertEqual([c.load('test_cache', f'lru{i}') for i in range(5)], ['lru0', None, None, 'lru3', 'lru4'])
+        self.assertEqual(c.backend.evictions, 2)
+        self.assertEqual(c._stats['expired'], 1)
+
+        c.remove()
+        self.assertEqual(c.load('test_cache', 'k.'), None)
+        c.close()
+
+    def _test_size_tracking(self, backend):
+        c = Cache(FakeYDL({
+            'cachedir': self.test_dir,
+            'cache_backend': backend,
+            'cache_max_size': 100 * ENTRY_SIZE,
+        }))
+        for i in range(5):
+            c.store('test_cache', f'lru{i}', f'lru{i}')
+        c.store('test_cache', 'lru0', 'lru9')
+        c.backend.delete('test_cache', 'lru1')
+        self.assertEqual(c.backend._size, 4 * ENTRY_SIZE)
+        self.assertEqual(c.backend.usage(), (4, 4 * ENTRY_SIZE))
+        c.close()
+
+    def test_dir_backend(self):
+        self._test_backend('dir')
+        # The directory is only scanned for the first entry below the maximum size
+        with mock.patch.object(
+                DirectoryCacheBackend, '_files', autospec=True, side_effect=DirectoryCacheBackend._files) as files:
+            self._test_size_tracking('dir')
+        self.assertEqual(files.call_count, 2)  # including usage
+
+    @unittest.skipUnless(sqlite3, 'sqlite3 is not available')
+    def test_sqlite_backend(self):
+        self._test_backend('sqlite')
+        self._test_size_tracking('sqlite')
+        # The database is shared with other instances
+        c1 = Cache(FakeYDL({'cachedir': self.test_dir, 'cache_backend': SQLiteCacheBackend}))
+        c2 = Cache(FakeYDL({'cachedir': self.test_dir, 'cache_backend': 'sqlite'}))
+        c1.store('test_cache', 'k', [1])
+        self.assertEqual(c2.load('test_cache', 'k'), [1])
+        c1.close()
+        c2.close()
+
+    def _test_memory_tier(self, backend):
+        params = {'cachedir': self.test_dir, 'cache_backend': backend}
+        c, other = Cache(FakeYDL(params)), Cache(FakeYDL(params))
+        c.store('test_cache', 'k', {'x': [1]})
+        for _ in range(3):
+            data = c.load('test_cache', 'k')
+            self.assertEqual(data, {'x': [1]})
+            data['x'].append(2)
+        self.assertEqual(c._stats['memory hits'], 2)
+
+        # Changed by another process
+        other.store('test_cache', 'k', {'x': [1, 2, 3]})
+        self.assertEqual(c.load('test_cache', 'k'), {'x': [1, 2, 3]})
+        self.assertEqual(c._stats['memory hits'], 2)
+        self.assertEqual(c.load('test_cache', 'k'), {'x': [1, 2, 3]})
+        self.assertEqual(c._stats['memory hits'], 3)
+        other.backend.delete('test_cache', 'k')
+        self.assertEqual(c.load('test_cache', 'k'), None)
+
+        c.store('test_cache', 'k', 1)
+        self.assertEqual(c.load('test_cache', 'k'), 1)
+        c.invalidate()
+        self.assertEqual(c.load('test_cache', 'k'), 1)
+        self.assertEqual(c._stats['memory hits'], 3)
+        c.close()
+        other.close()
+
+    def test_dir_memory_tier(self):
+        self._test_memory_tier('dir')
+
+    @unittest.skipUnless(sqlite3, 'sqlite3 is not available')
+    def test_sqlite_memory_tier(self):
+        self._test_memory_tier('sqlite')
+
+    def test_memory_backend(self):
+        self._test_backend('memory')
+        self.assertFalse(os.path.exists(self.test_dir))
+
 
 if __name__ == '__main__':
     unittest.main()
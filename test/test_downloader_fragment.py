@@ -0,0 +1,654 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import http.server
+import json
+import struct
+import tempfile
+import threading
+import time
+import urllib.parse
+from unittest.mock import patch
+
+from test.helper import http_server_port
+from yt_dlp import YoutubeDL
+from yt_dlp.aes import aes_cbc_decrypt_bytes as real_aes_cbc_decrypt_bytes
+from yt_dlp.aes import aes_cbc_encrypt_bytes
+from yt_dlp.downloader.dash import DashSegmentsFD
+from yt_dlp.downloader.external import FFmpegFD
+from yt_dlp.downloader.fragment import AdaptiveConcurrency, HttpMemoryDownloader, _FragmentBuffer
+from yt_dlp.downloader.hls import HlsFD
+from yt_dlp.downloader.http import LatencyHedger
+from yt_dlp.utils._utils import _YDLLogger as FakeLogger
+
+FRAGMENT_COUNT = 8
+KEY = b'0123456789abcdef'
+LIVE_RELOADS = 3
+LL_SEGMENTS = 6
+# The live MPD has a window of 4 segments, that advances by 2 segments on each refresh
+# and has a second period from the 7th segment. The last refresh makes it static
+MPD_REFRESHES = 3
+MPD_TEMPLATE = '''<?xml version="1.0" encoding="UTF-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="{type}" minimumUpdatePeriod="PT0.1S"
+     availabilityStartTime="2025-01-01T00:00:00Z" profiles="urn:mpeg:dash:profile:isoff-live:2011">
+{periods}
+</MPD>
+'''
+MPD_PERIOD_TEMPLATE = '''  <Period id="{period}" start="PT{start}S">
+    <AdaptationSet mimeType="video/mp4">
+      <SegmentTemplate timescale="1" media="frag/$Time$" initialization="init/{period}">
+        <SegmentTimeline><S t="{first}" d="1" r="{repeat}"/></SegmentTimeline>
+      </SegmentTemplate>
+      <Representation id="{period}" bandwidth="{bandwidth}" codecs="avc1.64001f" width="640" height="360"/>
+    </AdaptationSet>
+  </Period>'''
+
+# A SegmentList of byte ranges of /file
+MPD_RANGES_PERIOD_TEMPLATE = '''  <Period id="1" start="PT0S">
+    <AdaptationSet mimeType="video/mp4">
+      <Representation id="1" bandwidth="1000" codecs="avc1.64001f" width="640" height="360">
+        <BaseURL>file</BaseURL>
+        <SegmentList timescale="1" duration="1">
+          <Initialization sourceURL="init/1"/>
+{segments}
+        </SegmentList>
+      </Representation>
+    </AdaptationSet>
+  </Period>'''
+
+
+def fragment_content(index):
+    return b'%d;' % index * (100 * index)
+
+
+def encrypted_fragment_content(index):
+    content = fragment_content(index)
+    padding = 16 - len(content) % 16
+    return aes_cbc_encrypt_bytes(content + bytes([padding]) * padding, KEY, struct.pack('>8xq', index))
+
+
+def fragment_offset(index):
+    return sum(map(len, map(fragment_content, range(1, index))))
+
+
+class FragmentRequestHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        if path == '/ll.m3u8':
+            return self.respond_ll_playlist(dict(urllib.parse.parse_qsl(query)))
+        if path.startswith('/part/'):
+            # The hinted part is only returned once it is published
+            msn, part = map(int, path[6:].split('.'))
+            self.server.requested.append((msn, part))
+            self.publish_parts(msn, part)
+            content = fragment_content(msn)
+            return self.respond(content[:len(content) // 2] if part == 0 else content[len(content) // 2:])
+        if path == '/vod.m3u8':
+            return self.respond('\n'.join((
+                '#EXTM3U', '#EXT-X-TARGETDURATION:1',
+                *(f'#EXTINF:1.0,\n/frag/{index}' for index in range(1, FRAGMENT_COUNT + 1)),
+                '#EXT-X-ENDLIST', '')).encode())
+        if path == '/unknown_durations.m3u8':
+            return self.respond('\n'.join((
+                '#EXTM3U', '#EXT-X-TARGETDURATION:1',
+                *(f'#EXTINF:,\n/frag/{index}' for index in range(1, FRAGMENT_COUNT + 1)),
+                '#EXT-X-ENDLIST', '')).encode())
+        if path == '/ranges.m3u8':
+            # The fragments are byte ranges of a single file, with a gap before the 6th fragment
+            return self.respond('\n'.join((
+                '#EXTM3U', '#EXT-X-TARGETDURATION:1',
+                *(f'#EXTINF:1.0,\n#EXT-X-BYTERANGE:{len(fragment_content(index))}@{fragment_offset(index)}\n/file'
+                  for index in range(1, FRAGMENT_COUNT + 1) if index != 6),
+                '#EXT-X-ENDLIST', '')).encode())
+        if path == '/file':
+            content = b''.join(map(fragment_content, range(1, FRAGMENT_COUNT + 1)))
+            start, _, end = self.headers['Range'].partition('=')[2].partition('-')
+            self.server.requested.append((int(start), int(end) + 1))
+            self.send_response(206)
+            self.send_header('Content-Type', 'video/mp4')
+            self.send_header('Content-Length', str(int(end) + 1 - int(start)))
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(content)}')
+            self.end_headers()
+            self.wfile.write(content[int(start):int(end) + 1])
+            return
+        if path == '/live.mpd':
+            return self.respond_mpd()
+        if path == '/live_ranges.mpd':
+            return self.respond_ranges_mpd()
+        if path.startswith('/init/'):
+            return self.respond(b'init%d;' % int(path[6:]))
+        if self.path == '/live.m3u8':
+            # A sliding window of 3 fragments, that advances by 2 fragments on each reload
+            reloads = self.server.playlist_reloads
+            self.server.playlist_reloads += 1
+            first = 1 + 2 * reloads
+            return self.respond('\n'.join((
+                '#EXTM3U', '#EXT-X-TARGETDURATION:1', f'#EXT-X-MEDIA-SEQUENCE:{first}',
+                *(f'#EXTINF:1,\n/frag/{index}' for index in range(first, first + 3)),
+                *(['#EXT-X-ENDLIST'] if reloads == LIVE_RELOADS else []), '')).encode())
+        if self.path == '/key':
+            self.server.requested.append('key')
+            time.sleep(0.1)
+            return self.respond(KEY)
+        index = int(self.path.rpartition('/')[2])
+        self.server.requested.append(index)
+        if index in self.server.failures:
+            self.server.failures.remove(index)
+            self.send_response(429)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        time.sleep(self.server.delays.pop(index, 0))
+        if index in self.server.stalls:
+            # Send half of the fragment, then stall until the end of the test
+            self.server.stalls.remove(index)
+            content = fragment_content(index)
+            self.send_response(200)
+            self.send_header('Content-Type', 'video/mp4')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content[:len(content) // 2])
+            self.wfile.flush()
+            self.server.stall_released.wait()
+            return
+        self.respond(encrypted_fragment_content(index) if self.path.startswith('/encrypted/')
+                     else fragment_content(index))
+        self.server.served.append(index)
+
+    def publish_parts(self, msn, part):
+        # There are 2 parts per segment, and blocking requests publish the parts they are waiting for
+        self.server.ll_published = min(max(self.server.ll_published, (msn - 1) * 2 + part + 1), LL_SEGMENTS * 2)
+
+    def respond_ll_playlist(self, query):
+        self.server.ll_queries.append(query)
+        if '_HLS_msn' in query:
+            self.publish_parts(int(query['_HLS_msn']), int(query.get('_HLS_part', 0)))
+        published = self.server.ll_published
+        complete = published // 2
+        skipped = max(complete - 1, 0) if query.get('_HLS_skip') == 'YES' else 0
+        lines = [
+            '#EXTM3U', '#EXT-X-TARGETDURATION:1', '#EXT-X-VERSION:9',
+            '#EXT-X-SERVER-CONTROL:CAN-BLOCK-RELOAD=YES,CAN-SKIP-UNTIL=6.0', '#EXT-X-PART-INF:PART-TARGET=0.5',
+            '#EXT-X-MEDIA-SEQUENCE:1']
+        if skipped:
+            lines.append(f'#EXT-X-SKIP:SKIPPED-SEGMENTS={skipped}')
+        for msn in range(skipped + 1, complete + 1):
+            lines.extend((
+                f'#EXT-X-PART:DURATION=0.5,URI="/part/{msn}.0"', f'#EXT-X-PART:DURATION=0.5,URI="/part/{msn}.1"',
+                '#EXTINF:1,', f'/frag/{msn}'))
+        if published % 2:
+            lines.append(f'#EXT-X-PART:DURATION=0.5,URI="/part/{complete + 1}.0"')
+        if published < LL_SEGMENTS * 2:
+            lines.append(f'#EXT-X-PRELOAD-HINT:TYPE=PART,URI="/part/{published // 2 + 1}.{published % 2}"')
+        else:
+            lines.append('#EXT-X-ENDLIST')
+        self.respond('\n'.join((*lines, '')).encode())
+
+    def respond_mpd(self):
+        refreshes = self.server.mpd_refreshes
+        self.server.mpd_refreshes += 1
+        first, last = 2 * refreshes + 1, 2 * refreshes + 4
+        periods = []
+        if first <= 6:
+            periods.append(MPD_PERIOD_TEMPLATE.format(
+                period=1, start=0, first=first, repeat=min(last, 6) - first, bandwidth=1000))
+        if last >= 7:
+            # The representations of the second period only differ by their bitrate
+            periods.append(MPD_PERIOD_TEMPLATE.format(
+                period=2, start=6, first=max(first, 7), repeat=last - max(first, 7), bandwidth=1200))
+        self.respond(MPD_TEMPLATE.format(
+            type='static' if refreshes == MPD_REFRESHES else 'dynamic', periods='\n'.join(periods)).encode())
+
+    def respond_ranges_mpd(self):
+        # Like /live.mpd, with a window of 4 segments that advances by 2 segments on each refresh
+        refreshes = self.server.mpd_refreshes
+        self.server.mpd_refreshes += 1
+        first = 2 * refreshes + 1
+        segments = '\n'.join(
+            f'          <SegmentURL mediaRange="{fragment_offset(index)}-{fragment_offset(index + 1) - 1}"/>'
+            for index in range(first, min(first + 4, FRAGMENT_COUNT + 1)))
+        self.respond(MPD_TEMPLATE.format(
+            type='static' if refreshes == MPD_REFRESHES else 'dynamic',
+            periods=MPD_RANGES_PERIOD_TEMPLATE.format(segments=segments)).encode())
+
+    def respond(self, content):
+        self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class TestFragmentFD(unittest.TestCase):
+    def setUp(self):
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), FragmentRequestHandler)
+        self.httpd.requested, self.httpd.served, self.httpd.delays, self.httpd.failures = [], [], {}, set()
+        self.httpd.playlist_reloads, self.httpd.ll_published, self.httpd.ll_queries = 0, 5, []
+        self.httpd.mpd_refreshes, self.httpd.stalls, self.httpd.stall_released = 0, set(), threading.Event()
+        self.port = http_server_port(self.httpd)
+        self.server_thread = threading.Thread(target=self.httpd.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        self.addCleanup(self.httpd.server_close)
+        self.addCleanup(self.httpd.shutdown)
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.filename = os.path.join(self.tmpdir.name, 'test.mp4')
+
+    def download(self, params, progress_hook=None):
+        params = {'logger': FakeLogger(), 'noprogress': True, **params}
+        downloader = DashSegmentsFD(YoutubeDL(params), params)
+        if progress_hook:
+            downloader.add_progress_hook(progress_hook)
+        self.assertTrue(downloader.real_download(self.filename, {
+            'id': 'test',
+            'ext': 'mp4',
+            'protocol': 'http_dash_segments',
+            'fragment_base_url': f'http://127.0.0.1:{self.port}/frag/',
+            'fragments': [{'path': str(index)} for index in range(1, FRAGMENT_COUNT + 1)],
+        }))
+        self.assertEqual(os.listdir(self.tmpdir.name), ['test.mp4'])
+        with open(self.filename, 'rb') as f:
+            self.assertEqual(f.read(), b''.join(map(fragment_content, range(1, FRAGMENT_COUNT + 1))))
+
+    def test_fragment_files(self):
+        self.download({})
+        self.download({'concurrent_fragment_downloads': 4})
+
+    def test_fragment_memory(self):
+        for params in ({}, {'concurrent_fragment_downloads': 4}):
+            # With a limit of 1 byte, every fragment falls back to a fragment file
+            for limit in (1, 1000, 1024 ** 2):
+                with self.subTest(limit=limit, **params):
+                    self.download({**params, 'fragment_memory_limit': limit})
+
+    def test_fragment_memory_spill(self):
+        params = {'logger': FakeLogger(), 'noprogress': True}
+        dl = HttpMemoryDownloader(YoutubeDL(params), params, 10)
+        filename = os.path.join(self.tmpdir.name, 'test.mp4.part-Frag1')
+        # The memory is reserved as the data arrives
+        buffer = _FragmentBuffer(dl, filename)
+        buffer.write(b'a' * 6)
+        self.assertEqual(dl._memory_used, 6)
+        # Once over the limit, the fragment is written to its .part file and the memory is released
+        buffer.write(b'b' * 6)
+        self.assertEqual(dl._memory_used, 0)
+        self.assertEqual(os.listdir(self.tmpdir.name), ['test.mp4.part-Frag1.part'])
+        buffer.write(b'c')
+        self.assertEqual(buffer.finish(), (None, filename))
+        with open(filename, 'rb') as f:
+            self.assertEqual(f.read(), b'a' * 6 + b'b' * 6 + b'c')
+
+        buffer = _FragmentBuffer(dl, filename)
+        buffer.write(b'a' * 6)
+        self.assertEqual(buffer.finish(), (b'a' * 6, None))
+        self.assertEqual(dl._memory_used, 6)
+        dl.release_memory(6)
+        buffer = _FragmentBuffer(dl, filename)
+        buffer.write(b'a' * 20)
+        buffer.discard()
+        self.assertEqual(dl._memory_used, 0)
+        self.assertEqual(os.listdir(self.tmpdir.name), ['test.mp4.part-Frag1'])
+
+    def test_reorder_window(self):
+        # The other fragments are downloaded while the slow one is pending
+        self.httpd.delays[2] = 1
+        buffered = []
+        self.download({'concurrent_fragment_downloads': 2}, lambda d: buffered.append(d.get('fragments_buffered', 0)))
+        self.assertEqual(self.httpd.served[-1], 2)
+        self.assertEqual(max(buffered), FRAGMENT_COUNT - 2)
+        self.assertEqual(buffered[-1], 0)
+
+    def test_adaptive_concurrency(self):
+        self.httpd.failures.add(5)
+        concurrency = []
+        self.download({
+            'concurrent_fragment_downloads': 4,
+            'adaptive_fragment_concurrency': True,
+            'fragment_retries': 1,
+            'retry_sleep_functions': {'fragment': lambda n: 0},
+        }, lambda d: concurrency.append(d.get('fragment_concurrency')))
+        self.assertEqual(self.httpd.requested.count(5), 2)
+        self.assertIn(1, concurrency)
+        self.assertLessEqual(set(concurrency) - {None}, {1, 2, 3, 4})
+
+    def test_adaptive_concurrency_limit(self):
+        concurrency = AdaptiveConcurrency(4)
+        self.assertEqual(concurrency.limit, 1)
+        concurrency.fragment_done(1000, 0.1)
+        self.assertEqual(concurrency.limit, 2)
+        concurrency.limit = 4
+        # Failures of the fragments that were already downloading only back off once
+        concurrency.fragment_failed()
+        concurrency.fragment_failed()
+        self.assertEqual(concurrency.limit, 2)
+        # The limit is held for the window after a failure
+        concurrency.fragment_done(1000, 0.1)
+        concurrency.fragment_done(1000, 0.1)
+        self.assertEqual(concurrency.limit, 2)
+        with concurrency.slot(), concurrency.slot():
+            self.assertEqual(concurrency._active, 2)
+
+    def test_hedged_fragments(self):
+        # The first request for the fragment is slow, so that the duplicate request completes first
+        for params in ({}, {'fragment_memory_limit': 1024 ** 2}):
+            with self.subTest(**params), patch.object(LatencyHedger, '_MIN_SAMPLES', 2):
+                self.httpd.requested.clear()
+                self.httpd.delays[6] = 1
+                hedged = []
+                self.download({'concurrent_fragment_downloads': 2, 'hedge_percentile': 50, **params},
+                              lambda d: hedged.append(d.get('hedged_requests')))
+                self.assertEqual(self.httpd.requested.count(6), 2)
+                self.assertGreaterEqual(max(filter(None, hedged)), 1)
+
+    def test_hedged_fragment_stalled(self):
+        # The first request for the fragment never completes, and must not hold up the download until the timeout
+        self.addCleanup(self.httpd.stall_released.set)
+        for params in ({}, {'fragment_memory_limit': 1024 ** 2}):
+            with self.subTest(**params), patch.object(LatencyHedger, '_MIN_SAMPLES', 2):
+                self.httpd.requested.clear()
+                self.httpd.stalls.add(6)
+                start = time.monotonic()
+                self.download({'concurrent_fragment_downloads': 2, 'hedge_percentile': 50, 'socket_timeout': 60,
+                               'fragment_retries': 0, **params})
+                self.assertLess(time.monotonic() - start, 20)
+                self.assertEqual(self.httpd.requested.count(6), 2)
+
+    def test_latency_hedger(self):
+        hedger = LatencyHedger(90)
+        for latency in range(1, 8):
+            hedger.record(latency / 10)
+        self.assertIsNone(hedger.threshold)
+        for latency in range(8, 21):
+            hedger.record(latency / 10)
+        self.assertEqual(hedger.threshold, 1.9)
+
+    def download_encrypted(self, params):
+        self.httpd.requested.clear()
+        params = {'logger': FakeLogger(), 'noprogress': True, **params}
+        downloader = DashSegmentsFD(YoutubeDL(params), params)
+        ctx = {'filename': self.filename, 'total_frags': FRAGMENT_COUNT}
+        downloader._prepare_and_start_frag_download(ctx, {})
+        decrypt_info = {'METHOD': 'AES-128', 'URI': f'http://127.0.0.1:{self.port}/key'}
+        self.assertTrue(downloader.download_and_append_fragments(ctx, [{
+            'frag_index': index,
+            'url': f'http://127.0.0.1:{self.port}/encrypted/{index}',
+            'decrypt_info': decrypt_info,
+            'media_sequence': index,
+        } for index in range(1, FRAGMENT_COUNT + 1)], {}))
+        with open(self.filename, 'rb') as f:
+            self.assertEqual(f.read(), b''.join(map(fragment_content, range(1, FRAGMENT_COUNT + 1))))
+        return ctx
+
+    def test_decryption(self):
+        for params in ({}, {'concurrent_fragment_downloads': 4}, {'fragment_memory_limit': 1000},
+                       {'concurrent_fragment_downloads': 4, 'fragment_memory_limit': 2000}):
+            with self.subTest(**params):
+                decrypting_threads = set()
+
+                def aes_cbc_decrypt_bytes(*args):
+                    decrypting_threads.add(threading.current_thread())
+                    return real_aes_cbc_decrypt_bytes(*args)
+
+                with patch('yt_dlp.downloader.fragment.aes_cbc_decrypt_bytes', aes_cbc_decrypt_bytes):
+                    ctx = self.download_encrypted(params)
+                # The concurrent workers decrypt both the fragment files and the fragments in memory
+                if params.get('concurrent_fragment_downloads'):
+                    self.assertNotIn(threading.current_thread(), decrypting_threads)
+                else:
+                    self.assertEqual(decrypting_threads, {threading.current_thread()})
+                if params.get('fragment_memory_limit'):
+                    # The decrypted fragments are accounted against the limit until they are appended
+                    self.assertEqual(ctx['dl']._memory_used, 0)
+                # The key is only fetched once by the concurrent workers
+                self.assertEqual(self.httpd.requested.count('key'), 1)
+                self.assertEqual(os.listdir(self.tmpdir.name), ['test.mp4'])
+
+    def test_decryption_resume(self):
+        # The fragment files stay encrypted, so that they can be resumed and kept
+        with open(f'{self.filename}.part-Frag3', 'wb') as f:
+            f.write(encrypted_fragment_content(3))
+        self.download_encrypted({'concurrent_fragment_downloads': 4, 'keep_fragments': True})
+        self.assertNotIn(3, self.httpd.requested)
+        for index in range(1, FRAGMENT_COUNT + 1):
+            with open(f'{self.filename}.part-Frag{index}', 'rb') as f:
+                self.assertEqual(f.read(), encrypted_fragment_content(index))
+
+    def test_fragment_memory_resume(self):
+        with open(f'{self.filename}.part', 'wb') as f:
+            f.write(fragment_content(1) + fragment_content(2))
+        with open(f'{self.filename}.ytdl', 'w') as f:
+            json.dump({'downloader': {'current_fragment': {'index': 2}}}, f)
+        self.download({'fragment_memory_limit': 1024 ** 2})
+        self.assertEqual(self.httpd.requested, list(range(3, FRAGMENT_COUNT + 1)))
+
+    def test_live_hls(self):
+        fragment_count = 3 + 2 * LIVE_RELOADS
+        for params in ({}, {'concurrent_fragment_downloads': 2}):
+            with self.subTest(**params):
+                self.httpd.requested.clear()
+                self.httpd.playlist_reloads = 0
+                params = {'logger': FakeLogger(), 'noprogress': True, **params}
+                downloader = HlsFD(YoutubeDL(params), params)
+                self.assertTrue(downloader.real_download(self.filename, {
+                    'id': 'test',
+                    'ext': 'mp4',
+                    'protocol': 'm3u8_native',
+                    'url': f'http://127.0.0.1:{self.port}/live.m3u8',
+                    'is_live': True,
+                }))
+                self.assertEqual(self.httpd.playlist_reloads, LIVE_RELOADS + 1)
+                # Each fragment is only downloaded once, although it is in several playlists
+                self.assertEqual(sorted(self.httpd.requested), list(range(1, fragment_count + 1)))
+                with open(self.filename, 'rb') as f:
+                    self.assertEqual(f.read(), b''.join(map(fragment_content, range(1, fragment_count + 1))))
+
+    def test_low_latency_hls(self):
+        for params in ({}, {'concurrent_fragment_downloads': 2}):
+            with self.subTest(**params):
+                self.httpd.requested.clear()
+                self.httpd.ll_queries.clear()
+                self.httpd.ll_published = 5
+                params = {'logger': FakeLogger(), 'noprogress': True, **params}
+                downloader = HlsFD(YoutubeDL(params), params)
+                start = time.monotonic()
+                self.assertTrue(downloader.real_download(self.filename, {
+                    'id': 'test',
+                    'ext': 'mp4',
+                    'protocol': 'm3u8_native',
+                    'url': f'http://127.0.0.1:{self.port}/ll.m3u8',
+                    'is_live': True,
+                }))
+                # The blocking reloads do not wait for a target duration
+                self.assertLess(time.monotonic() - start, 2)
+                # The complete segments are downloaded whole, and the others by parts
+                self.assertEqual(sorted(self.httpd.requested, key=lambda x: x if isinstance(x, tuple) else (x, )), [
+                    1, 2, *((msn, part) for msn in range(3, LL_SEGMENTS + 1) for part in (0, 1))])
+                self.assertEqual(self.httpd.ll_queries[1], {'_HLS_msn': '3', '_HLS_part': '1', '_HLS_skip': 'YES'})
+                with open(self.filename, 'rb') as f:
+                    self.assertEqual(f.read(), b''.join(map(fragment_content, range(1, LL_SEGMENTS + 1))))
+
+    def test_live_dash(self):
+        mpd_url = f'http://127.0.0.1:{self.port}/live.mpd'
+        for params in ({}, {'concurrent_fragment_downloads': 2}):
+            with self.subTest(**params):
+                self.httpd.mpd_refreshes = 0
+                params = {'logger': FakeLogger(), 'noprogress': True, **params}
+                ydl = YoutubeDL(params)
+                fmt, = ydl.get_info_extractor('Generic')._extract_mpd_formats(mpd_url, 'test')
+                self.assertEqual(fmt['tbr'], 1)
+                self.httpd.requested.clear()
+                self.httpd.mpd_refreshes = 0
+                downloader = DashSegmentsFD(ydl, params)
+                self.assertTrue(downloader.real_download(self.filename, {
+                    **fmt,
+                    'id': 'test',
+                    'is_live': True,
+                }))
+                self.assertEqual(self.httpd.mpd_refreshes, MPD_REFRESHES + 1)
+                # The recording starts 3 segments from the live edge
+                self.assertEqual(sorted(self.httpd.requested), list(range(2, 11)))
+                with open(self.filename, 'rb') as f:
+                    self.assertEqual(f.read(), b''.join((
+                        b'init1;', *map(fragment_content, range(2, 7)),
+                        b'init2;', *map(fragment_content, range(7, 11)))))
+
+    def test_live_dash_byte_ranges(self):
+        mpd_url = f'http://127.0.0.1:{self.port}/live_ranges.mpd'
+        params = {'logger': FakeLogger(), 'noprogress': True}
+        ydl = YoutubeDL(params)
+        fmt, = ydl.get_info_extractor('Generic')._extract_mpd_formats(mpd_url, 'test')
+        self.httpd.requested.clear()
+        self.httpd.mpd_refreshes = 0
+        self.assertTrue(DashSegmentsFD(ydl, params).real_download(self.filename, {
+            **fmt,
+            'id': 'test',
+            'is_live': True,
+        }))
+        # Each byte range of the file is a fragment, starting 3 segments from the live edge
+        self.assertEqual(sorted(self.httpd.requested), [
+            (fragment_offset(index), fragment_offset(index + 1)) for index in range(2, FRAGMENT_COUNT + 1)])
+        with open(self.filename, 'rb') as f:
+            self.assertEqual(f.read(), b''.join((b'init1;', *map(fragment_content, range(2, FRAGMENT_COUNT + 1)))))
+
+    def test_live_dash_without_manifest_url(self):
+        params = {'logger': FakeLogger(), 'noprogress': True}
+        ydl = YoutubeDL(params)
+        self.httpd.mpd_refreshes = 0
+        fmt, = ydl.get_info_extractor('Generic')._extract_mpd_formats(
+            f'http://127.0.0.1:{self.port}/live.mpd', 'test')
+        self.httpd.requested.clear()
+        self.assertTrue(DashSegmentsFD(ydl, params).real_download(self.filename, {
+            **fmt,
+            'id': 'test',
+            'is_live': True,
+            'manifest_url': None,
+        }))
+        self.assertEqual(self.httpd.mpd_refreshes, 1)
+        with open(self.filename, 'rb') as f:
+            self.assertEqual(f.read(), b''.join((b'init1;', *map(fragment_content, range(1, 5)))))
+
+    def test_select_section_fragments(self):
+        fragments = [
+            {'path': 'init1'}, *({'path': str(index), 'duration': 2} for index in range(1, 4)),
+            {'path': 'init2'}, *({'path': str(index), 'duration': 2} for index in range(4, 7))]
+        for start, end, expected_paths, expected_offset in (
+                (None, None, ['init1', *map(str, range(1, 4)), 'init2', *map(str, range(4, 7))], 0),
+                (3, 5, ['init1', '2', '3'], 2),
+                (5, 7.5, ['init1', '3', 'init2', '4'], 4),
+                (7, None, ['init2', '4', '5', '6'], 6),
+                (None, 2, ['init1', '1'], 0)):
+            with self.subTest(start=start, end=end):
+                selected, offset = DashSegmentsFD._select_section_fragments(
+                    fragments, {'section_start': start, 'section_end': end})
+                self.assertEqual([fragment['path'] for fragment in selected], expected_paths)
+                self.assertEqual(offset, expected_offset)
+        self.assertEqual(DashSegmentsFD._select_section_fragments(
+            [{'path': '1', 'duration': None}], {'section_start': 1}), (None, None))
+        # e.g. a SegmentList without a segment duration
+        self.assertEqual(DashSegmentsFD._select_section_fragments(
+            [{'path': 'init'}, {'path': '1'}, {'path': '2'}], {'section_start': 1}), (None, None))
+        selected, _ = DashSegmentsFD._select_section_fragments(
+            [{'path': '1', 'duration': 2}, {'path': 'init', 'is_map': True}, {'path': '2', 'duration': 2}],
+            {'section_start': 3})
+        self.assertEqual([fragment['path'] for fragment in selected], ['init', '2'])
+
+    def test_coalesce_fragments(self):
+        def fragment(url, start, end):
+            return {'url': url, 'byte_range': {'start': start, 'end': end}}
+
+        gap = DashSegmentsFD._COALESCE_MAX_GAP
+        fragments = [
+            # Small gaps are merged, but not gaps over _COALESCE_MAX_GAP or overlaps
+            fragment('a', 0, 100), fragment('a', 100, 200), fragment('a', 700, 800),
+            fragment('a', 801 + gap, 900 + gap), fragment('a', 0, 100), fragment('b', 100, 200), {'url': 'b'},
+            fragment('c', 0, 600), fragment('c', 600, 1200), fragment('c', 1200, 1500), fragment('c', 1500, 1700)]
+        merged = list(DashSegmentsFD._coalesce_fragments(fragments, 1000))
+        self.assertEqual([(f['url'], f.get('byte_range') and tuple(f['byte_range'].values())) for f in merged], [
+            ('a', (0, 800)), ('a', (801 + gap, 900 + gap)), ('a', (0, 100)), ('b', (100, 200)), ('b', None),
+            ('c', (0, 600)), ('c', (600, 1500)), ('c', (1500, 1700))])
+        self.assertEqual(merged[0]['coalesced'], fragments[:3])
+        self.assertNotIn('coalesced', merged[1])
+        self.assertEqual(
+            [(sub['byte_range']['start'], content) for sub, content in DashSegmentsFD._split_coalesced_fragment(
+                merged[-2], b'a' * 600 + b'b' * 300)],
+            [(600, b'a' * 600), (1200, b'b' * 300)])
+
+    def test_coalesced_byte_ranges(self):
+        expected_indices = [index for index in range(1, FRAGMENT_COUNT + 1) if index != 6]
+        for size, requests in ((None, 7), (3000, 2), (1024 ** 2, 1)):
+            for params in ({}, {'concurrent_fragment_downloads': 4}, {'fragment_memory_limit': 1000}):
+                with self.subTest(size=size, **params):
+                    self.httpd.requested.clear()
+                    progress = []
+                    params = {'logger': FakeLogger(), 'noprogress': True, 'fragment_coalesce_size': size, **params}
+                    downloader = HlsFD(YoutubeDL(params), params)
+                    downloader.add_progress_hook(lambda d: progress.append(d.get('fragment_index')))
+                    self.assertTrue(downloader.real_download(self.filename, {
+                        'id': 'test', 'ext': 'mp4', 'protocol': 'm3u8_native',
+                        'url': f'http://127.0.0.1:{self.port}/ranges.m3u8'}))
+                    self.assertEqual(len(self.httpd.requested), requests)
+                    self.assertEqual(max(filter(None, progress)), len(expected_indices))
+                    self.assertEqual(os.listdir(self.tmpdir.name), ['test.mp4'])
+                    with open(self.filename, 'rb') as f:
+                        self.assertEqual(f.read(), b''.join(map(fragment_content, expected_indices)))
+
+    def test_download_sections(self):
+        section = {'section_start': 2.5, 'section_end': 4.5}
+        for fd, info_dict in ((DashSegmentsFD, {
+            'protocol': 'http_dash_segments',
+            'fragment_base_url': f'http://127.0.0.1:{self.port}/frag/',
+            'fragments': [{'path': str(index), 'duration': 1} for index in range(1, FRAGMENT_COUNT + 1)],
+        }), (HlsFD, {
+            'protocol': 'm3u8_native',
+            'url': f'http://127.0.0.1:{self.port}/vod.m3u8',
+        })):
+            for params in ({}, {'concurrent_fragment_downloads': 4}):
+                with self.subTest(fd=fd.FD_NAME, **params):
+                    self.httpd.requested.clear()
+                    params = {'logger': FakeLogger(), 'noprogress': True, **params}
+                    downloader = fd(YoutubeDL(params), params)
+                    # The fragments are not media that ffmpeg could cut
+                    downloader._trim_section = lambda filename, info_dict, offset: offset == 2
+                    self.assertTrue(downloader.real_download(self.filename, {
+                        'id': 'test', 'ext': 'mp4', **info_dict, **section}))
+                    self.assertEqual(sorted(self.httpd.requested), [3, 4, 5])
+                    with open(self.filename, 'rb') as f:
+                        self.assertEqual(f.read(), b''.join(map(fragment_content, range(3, 6))))
+
+    def test_download_sections_unknown_durations(self):
+        # The section is downloaded with ffmpeg, which seeks in the stream itself
+        section = {'section_start': 2.5, 'section_end': 4.5}
+        for fd, info_dict in ((DashSegmentsFD, {
+            'protocol': 'http_dash_segments',
+            'fragment_base_url': f'http://127.0.0.1:{self.port}/frag/',
+            'fragments': [{'path': str(index)} for index in range(1, FRAGMENT_COUNT + 1)],
+        }), (HlsFD, {
+            'protocol': 'm3u8_native',
+            'url': f'http://127.0.0.1:{self.port}/unknown_durations.m3u8',
+        })):
+            with self.subTest(fd=fd.FD_NAME):
+                self.httpd.requested.clear()
+                info_dict = {'id': 'test', 'ext': 'mp4', **info_dict, **section}
+                params = {'logger': FakeLogger(), 'noprogress': True}
+                downloader = fd(YoutubeDL(params), params)
+                with patch.object(FFmpegFD, 'can_download', return_value=True), \
+                        patch.object(FFmpegFD, 'real_download', return_value=True) as real_download:
+                    self.assertTrue(downloader.real_download(self.filename, info_dict))
+                real_download.assert_called_once_with(self.filename, info_dict)
+                self.assertEqual(self.httpd.requested, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
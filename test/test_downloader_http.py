@@ -9,18 +9,22 @@
 
 
 import http.server
+import json
 import re
 import threading
+import time
+from unittest.mock import patch
 
 from test.helper import http_server_port, try_rm
 from yt_dlp import YoutubeDL
-from yt_dlp.downloader.http import HttpFD
+from yt_dlp.downloader.http import HttpFD, LatencyHedger
 from yt_dlp.utils._utils import _YDLLogger as FakeLogger
 
 TEST_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
 TEST_SIZE = 10 * 1024
+TEST_CONTENT = bytes(i % 251 for i in range(TEST_SIZE))
 
 
 class HTTPTestRequestHandler(http.server.BaseHTTPRequestHandler):
@@ -54,8 +58,21 @@ def serve(self, range=True, content_length=True):
         self.end_headers()
         self.wfile.write(b'#' * size)
 
+    def serve_ranges(self):
+        start, end = map(int, re.match(r'bytes=(\d+)-(\d+)', self.headers['Range']).groups())
+        self.server.requested.append((start, end + 1))
+        time.sleep(self.server.delays.pop((start, end + 1), 0))
+        self.send_response(206)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Range', f'bytes {start}-{end}/{TEST_SIZE}')
+        self.send_header('Content-Length', end + 1 - start)
+        self.end_headers()
+        self.wfile.write(TEST_CONTENT[start:end + 1])
+
     def do_GET(self):
-        if self.path == '/regular':
+        if self.path == '/ranges':
+            self.serve_ranges()
+        elif self.path == '/regular':
             self.serve()
         elif self.path == '/no-content-length':
             self.serve(content_length=False)
@@ -63,14 +80,22 @@ def do_GET(self):
             self.serve(range=False)
         elif self.path == '/no-range-no-content-length':
             self.serve(range=False, content_length=False)
+        elif self.path == '/range-error':
+            if self.headers.get('Range'):
+                self.send_response(416)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            else:
+                self.serve(range=False)
         else:
             assert False
 
 
 class TestHttpFD(unittest.TestCase):
     def setUp(self):
-        self.httpd = http.server.HTTPServer(
+        self.httpd = http.server.ThreadingHTTPServer(
             ('127.0.0.1', 0), HTTPTestRequestHandler)
+        self.httpd.requested, self.httpd.delays = [], {}
         self.port = http_server_port(self.httpd)
         self.server_thread = threading.Thread(target=self.httpd.serve_forever)
         self.server_thread.daemon = True
@@ -100,6 +125,84 @@ def test_chunked(self):
             'http_chunk_size': 1000,
         })
 
+    def download_segmented(self, params, min_segment_size=4096):
+        params = {'logger': FakeLogger(), 'http_connections': 2, **params}
+        downloader = HttpFD(YoutubeDL(params), params)
+        downloader._MIN_SEGMENT_SIZE = min_segment_size
+        filename = 'testfile.mp4'
+        self.addCleanup(try_rm, filename)
+        self.assertTrue(downloader.real_download(filename, {
+            'url': f'http://127.0.0.1:{self.port}/ranges',
+        }))
+        with open(filename, 'rb') as f:
+            self.assertEqual(f.read(), TEST_CONTENT)
+        self.assertFalse(os.path.exists(f'{filename}.ytdl'))
+
+    def test_segmented(self):
+        # Servers that ignore the ranges are downloaded with a single connection
+        with patch.object(HttpFD, '_MIN_SEGMENT_SIZE', 1024):
+            self.download_all({'http_connections': 4})
+        self.download_segmented({})
+        self.assertEqual(sorted(self.httpd.requested), [(0, 1), (0, TEST_SIZE // 2), (TEST_SIZE // 2, TEST_SIZE)])
+
+    def test_segmented_work_stealing(self):
+        # The idle connection takes over half of the slow range, until it is too small to split
+        self.httpd.delays[0, TEST_SIZE // 2] = 0.5
+        self.download_segmented({}, min_segment_size=1024)
+        self.assertEqual(sorted(self.httpd.requested), [
+            (0, 1), (0, TEST_SIZE // 2), (TEST_SIZE // 8, TEST_SIZE // 4),
+            (TEST_SIZE // 4, TEST_SIZE // 2), (TEST_SIZE // 2, TEST_SIZE)])
+
+        self.httpd.requested.clear()
+        self.httpd.delays.clear()
+        self.download_segmented({'http_chunk_size': 1000}, min_segment_size=1024)
+        self.assertLessEqual(max(end - start for start, end in self.httpd.requested), 1000)
+
+    def test_segmented_hedging(self):
+        # The range can not be split anymore, so the idle connection sends a duplicate request
+        self.httpd.delays[TEST_SIZE // 2, TEST_SIZE] = 1
+        with patch.object(LatencyHedger, '_MIN_SAMPLES', 2):
+            self.download_segmented({'hedge_percentile': 50})
+        self.assertEqual(self.httpd.requested.count((TEST_SIZE // 2, TEST_SIZE)), 2)
+
+    def test_segmented_resume(self):
+        with open('testfile.mp4.part', 'wb') as f:
+            f.write(TEST_CONTENT[:3000] + bytes(2000) + TEST_CONTENT[5000:8000] + bytes(TEST_SIZE - 8000))
+        with open('testfile.mp4.ytdl', 'w') as f:
+            json.dump({'downloader': {'total_bytes': TEST_SIZE, 'ranges': [[3000, 5000], [8000, TEST_SIZE]]}}, f)
+        self.download_segmented({})
+        self.assertEqual(sorted(self.httpd.requested), [(0, 1), (3000, 5000), (8000, TEST_SIZE)])
+
+        # The preallocated file is resumed even with a single connection
+        self.httpd.requested.clear()
+        with open('testfile.mp4.part', 'wb') as f:
+            f.write(TEST_CONTENT[:5000] + bytes(TEST_SIZE - 5000))
+        with open('testfile.mp4.ytdl', 'w') as f:
+            json.dump({'downloader': {'total_bytes': TEST_SIZE, 'ranges': [[5000, TEST_SIZE]]}}, f)
+        self.download_segmented({'http_connections': 1})
+        self.assertEqual(sorted(self.httpd.requested), [(0, 1), (5000, TEST_SIZE)])
+
+        # The preallocated file is restarted when the ranges can no longer be requested
+        for ep in ('no-range', 'range-error'):
+            with open('testfile.mp4.part', 'wb') as f:
+                f.write(TEST_CONTENT[:5000] + bytes(TEST_SIZE - 5000))
+            with open('testfile.mp4.ytdl', 'w') as f:
+                json.dump({'downloader': {'total_bytes': TEST_SIZE, 'ranges': [[5000, TEST_SIZE]]}}, f)
+            params = {'logger': FakeLogger(), 'http_connections': 2}
+            self.assertTrue(HttpFD(YoutubeDL(params), params).real_download('testfile.mp4', {
+                'url': f'http://127.0.0.1:{self.port}/{ep}',
+            }))
+            with open('testfile.mp4', 'rb') as f:
+                self.assertEqual(f.read(), b'#' * TEST_SIZE)
+            self.assertFalse(os.path.exists('testfile.mp4.ytdl'))
+
+        # A partial download with a single connection is resumed
+        self.httpd.requested.clear()
+        with open('testfile.mp4.part', 'wb') as f:
+            f.write(TEST_CONTENT[:6000])
+        self.download_segmented({})
+        self.assertEqual(sorted(self.httpd.requested), [(0, 1), (6000, TEST_SIZE)])
+
 
 if __name__ == '__main__':
     unittest.main()
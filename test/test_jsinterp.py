@@ -8,7 +8,9 @@
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import math
+from unittest import mock
 
+from yt_dlp import jsinterp
 from yt_dlp.jsinterp import JS_Undefined, JSInterpreter, js_number_to_string
 
 
@@ -61,6 +63,8 @@ def test_mod(self):
         self._test('function f(){return 42 % 7;}', 0)
         self._test('function f(){return 42 % 0;}', NaN)
         self._test('function f(){return 42 % undefined;}', NaN)
+        self._test('function f(){return -7 % 4;}', -3)
+        self._test('function f(){return 7 % -4;}', 3)
 
     def test_exp(self):
         self._test('function f(){return 42 ** 2;}', 1764)
@@ -536,6 +540,40 @@ def test_nested_function_scoping(self):
             }
         ''', 31)
 
+    def test_invalid_index(self):
+        # Both the compiled functions and the interpreter raise JSInterpreter.Exception
+        for code in (
+            'function f(){var b = [1]; b[b.length] = 2; return b;}',
+            'function f(){var b = [1]; b[5] += 2; return b;}',
+            'function f(){var b = [1]; b[5]++; return b;}',
+            'function f(){var b = "ab"; b[0] = "c"; return b;}',
+            'function f(){return /a/.test("abc");}',
+            'function f(){var a = /a/; return a.test("abc");}',
+        ):
+            with self.subTest(code=code), self.assertRaises(JSInterpreter.Exception):
+                JSInterpreter(code).call_function('f')
+
+
+class TestJSCompiler(unittest.TestCase):
+    def test_compile(self):
+        code = 'var x = 0; for (var i = 0; i < a; i++) { x += i; } return x;'
+        self.assertIsNotNone(jsinterp._compile_function(code))
+        hits = jsinterp._compile_function.cache_info().hits
+        self.assertEqual(JSInterpreter(f'function f(a){{{code}}}').call_function('f', 4), 6)
+        self.assertEqual(JSInterpreter(f'function g(a){{{code}}}').call_function('g', 10), 45)
+        self.assertEqual(jsinterp._compile_function.cache_info().hits, hits + 2)
+
+        # Unsupported syntax is left to the interpreter
+        self.assertIsNone(jsinterp._compile_function('x: for (;;) { break x; }'))
+        self.assertIsNone(jsinterp._compile_function('return typeof a'))
+
+
+class TestJSInterpreterWithoutCompiling(TestJSInterpreter):
+    def setUp(self):
+        patcher = mock.patch.object(jsinterp, '_compile_function', lambda code: None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import http.client
+import json
+import socket
+import tempfile
+import threading
+
+from test.helper import FakeYDL
+from yt_dlp.extractor.common import InfoExtractor
+from yt_dlp.server import YoutubeDLServer
+
+
+class _TestIE(InfoExtractor):
+    _VALID_URL = r'test:(?P<id>\w+)'
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        return {
+            'id': video_id,
+            'title': f'Video {video_id}',
+            'url': f'https://example.com/{video_id}.mp4',
+        }
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__('localhost')
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self._path)
+
+
+class TestServer(unittest.TestCase):
+    def _start(self, address, token=None):
+        ydl = FakeYDL()
+        ydl.add_info_extractor(_TestIE(ydl))
+        server = YoutubeDLServer(ydl, address, token)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.close)
+        self.addCleanup(server.shutdown)
+        return ydl, server
+
+    def _request(self, conn, method, path, data=None, headers=None):
+        headers = {'Content-Type': 'application/json', **(headers or {})}
+        conn.request(method, path, body=data if data is None else json.dumps(data), headers=headers)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+
+    def _test_endpoints(self, ydl, conn):
+        # The connection is kept alive between the requests
+        self.assertEqual(self._request(conn, 'GET', '/status')[1]['jobs'], 0)
+        status, info = self._request(conn, 'POST', '/extract', {'url': 'test:abc'})
+        self.assertEqual(status, 200)
+        self.assertEqual((info['id'], info['title'], info['extractor_key']), ('abc', 'Video abc', '_Test'))
+        self.assertEqual(self._request(conn, 'POST', '/download', {'urls': ['test:a', 'test:b']}), (200, {'retcode': None}))
+        self.assertEqual(ydl.result, [['test:a', 'test:b']])
+        self.assertEqual(self._request(conn, 'GET', '/status')[1]['jobs'], 2)
+
+        self.assertEqual(self._request(conn, 'POST', '/extract', {})[0], 400)
+        self.assertEqual(self._request(conn, 'POST', '/unknown', {'url': 'test:abc'})[0], 404)
+        self.assertEqual(self._request(conn, 'GET', '/unknown')[0], 404)
+
+    def test_tcp(self):
+        ydl, server = self._start('127.0.0.1:0')
+        self.assertRegex(server.address, r'^127\.0\.0\.1:\d+$')
+        conn = http.client.HTTPConnection(*server.address.split(':'))
+        self.addCleanup(conn.close)
+        self._test_endpoints(ydl, conn)
+
+    def test_rejected_requests(self):
+        ydl, server = self._start('127.0.0.1:0', token='secret')
+        conn = http.client.HTTPConnection(*server.address.split(':'))
+        self.addCleanup(conn.close)
+        auth = {'Authorization': 'Bearer secret'}
+
+        # Content types that browsers send cross-origin without a preflight
+        for content_type in ('text/plain', 'application/x-www-form-urlencoded', 'multipart/form-data'):
+            self.assertEqual(self._request(
+                conn, 'POST', '/download', {'urls': ['test:a']}, {**auth, 'Content-Type': content_type})[0], 415)
+        # DNS rebinding
+        rebound = {**auth, 'Host': f'attacker.example:{server.address.split(":")[1]}'}
+        self.assertEqual(self._request(conn, 'GET', '/status', headers=rebound)[0], 403)
+        self.assertEqual(self._request(conn, 'POST', '/extract', {'url': 'test:abc'}, rebound)[0], 403)
+        # Missing or wrong token
+        for headers in ({}, {'Authorization': 'Bearer wrong'}, {'Authorization': 'Basic secret'}):
+            self.assertEqual(self._request(conn, 'GET', '/status', headers=headers)[0], 401)
+            self.assertEqual(self._request(conn, 'POST', '/download', {'urls': ['test:a']}, headers)[0], 401)
+        self.assertEqual(ydl.result, [])
+        self.assertEqual(server.status()['jobs'], 0)
+
+        self.assertEqual(self._request(conn, 'POST', '/extract', {'url': 'test:abc'}, auth)[0], 200)
+        self.assertEqual(self._request(
+            conn, 'GET', '/status', headers={**auth, 'Host': server.address.replace('127.0.0.1', 'localhost')})[0], 200)
+
+    def test_wildcard_address(self):
+        _, server = self._start('0.0.0.0:0')
+        conn = http.client.HTTPConnection('127.0.0.1', server.address.split(':')[1])
+        self.addCleanup(conn.close)
+        self.assertEqual(self._request(conn, 'GET', '/status', headers={'Host': 'example.com'})[0], 200)
+
+    def test_archive_as_set(self):
+        ydl, server = self._start('127.0.0.1:0')
+        ydl.archive = {'_test other'}
+        self.assertEqual(server.run_job('extract', {'url': 'test:abc'})['id'], 'abc')
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'UNIX sockets are not supported')
+    def test_unix_socket(self):
+        path = os.path.join(tempfile.mkdtemp(), 'yt-dlp.sock')
+        self.addCleanup(os.rmdir, os.path.dirname(path))
+        ydl, server = self._start(path)
+        conn = _UnixHTTPConnection(path)
+        self.addCleanup(conn.close)
+        self._test_endpoints(ydl, conn)
+
+
+if __name__ == '__main__':
+    unittest.main()
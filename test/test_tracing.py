@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import json
+import tempfile
+import threading
+
+from yt_dlp.utils.tracing import start_tracing, stop_tracing, trace_span, traced
+
+
+@traced('test', args=lambda x: {'x': x})
+def _double(x):
+    with trace_span('inner', 'test', x=x):
+        return x * 2
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        fd, self.fn = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.addCleanup(os.remove, self.fn)
+
+    def test_not_tracing(self):
+        with trace_span('span', 'test'):
+            self.assertEqual(_double(2), 4)
+        self.assertEqual(_double.__name__, '_double')
+
+    def test_trace_file(self):
+        tracer = start_tracing(self.fn)
+        self.assertIsNotNone(tracer)
+        # Only one trace is recorded at a time
+        self.assertIsNone(start_tracing(self.fn))
+        self.assertEqual(_double(2), 4)
+        thread = threading.Thread(target=_double, args=(3, ), name='worker')
+        thread.start()
+        thread.join()
+        stop_tracing(tracer)
+        stop_tracing(None)
+        self.assertEqual(_double(4), 8)
+
+        with open(self.fn, encoding='utf-8') as f:
+            events = json.load(f)
+        spans = [event for event in events if event['ph'] == 'X']
+        self.assertEqual(
+            [(span['name'], span['args']) for span in spans],
+            [('inner', {'x': 2}), ('_double', {'x': 2}), ('inner', {'x': 3}), ('_double', {'x': 3})])
+        inner, outer = spans[:2]
+        self.assertEqual(inner['tid'], outer['tid'])
+        self.assertLessEqual(outer['ts'], inner['ts'])
+        self.assertGreaterEqual(outer['ts'] + outer['dur'], inner['ts'] + inner['dur'])
+        self.assertNotEqual(spans[2]['tid'], outer['tid'])
+        self.assertIn('worker', [event['args']['name'] for event in events if event['ph'] == 'M'])
+
+
+if __name__ == '__main__':
+    unittest.main()
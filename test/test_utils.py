@@ -12,7 +12,9 @@
 import io
 import itertools
 import json
+import operator
 import pickle
+import re
 import subprocess
 import unittest
 import unittest.mock
@@ -32,6 +34,7 @@
     NO_DEFAULT,
     OnDemandPagedList,
     Popen,
+    RejectedVideoReached,
     age_restricted,
     args_to_str,
     base_url,
@@ -74,6 +77,7 @@
     limit_length,
     locked_file,
     lowercase_escape,
+    match_filter_func,
     match_str,
     merge_dicts,
     mimetype2ext,
@@ -138,6 +142,87 @@
 )
 
 
+def _reference_match_str(filter_str, dct, incomplete=False):
+    """The implementation of match_str before filters were compiled, to test against"""
+    def match_one(filter_part):
+        STRING_OPERATORS = {
+            '*=': operator.contains,
+            '^=': lambda attr, value: attr.startswith(value),
+            '$=': lambda attr, value: attr.endswith(value),
+            '~=': lambda attr, value: re.search(value, attr),
+        }
+        COMPARISON_OPERATORS = {
+            **STRING_OPERATORS,
+            '<=': operator.le,
+            '<': operator.lt,
+            '>=': operator.ge,
+            '>': operator.gt,
+            '=': operator.eq,
+        }
+
+        if isinstance(incomplete, bool):
+            is_incomplete = lambda _: incomplete
+        else:
+            is_incomplete = lambda k: k in incomplete
+
+        operator_rex = re.compile(r'''(?x)
+            (?P<key>[a-z_]+)
+            \s*(?P<negation>!\s*)?(?P<op>{})(?P<none_inclusive>\s*\?)?\s*
+            (?:
+                (?P<quote>["\'])(?P<quotedstrval>.+?)(?P=quote)|
+                (?P<strval>.+?)
+            )
+            '''.format('|'.join(map(re.escape, COMPARISON_OPERATORS.keys()))))
+        m = operator_rex.fullmatch(filter_part.strip())
+        if m:
+            m = m.groupdict()
+            unnegated_op = COMPARISON_OPERATORS[m['op']]
+            if m['negation']:
+                op = lambda attr, value: not unnegated_op(attr, value)
+            else:
+                op = unnegated_op
+            comparison_value = m['quotedstrval'] or m['strval']
+            if m['quote']:
+                comparison_value = comparison_value.replace(r'\{}'.format(m['quote']), m['quote'])
+            actual_value = dct.get(m['key'])
+            numeric_comparison = None
+            if isinstance(actual_value, (int, float)):
+                try:
+                    numeric_comparison = int(comparison_value)
+                except ValueError:
+                    numeric_comparison = parse_filesize(comparison_value)
+                    if numeric_comparison is None:
+                        numeric_comparison = parse_filesize(f'{comparison_value}B')
+                    if numeric_comparison is None:
+                        numeric_comparison = parse_duration(comparison_value)
+            if numeric_comparison is not None and m['op'] in STRING_OPERATORS:
+                raise ValueError('Operator {} only supports string values!'.format(m['op']))
+            if actual_value is None:
+                return is_incomplete(m['key']) or m['none_inclusive']
+            return op(actual_value, comparison_value if numeric_comparison is None else numeric_comparison)
+
+        UNARY_OPERATORS = {
+            '': lambda v: (v is True) if isinstance(v, bool) else (v is not None),
+            '!': lambda v: (v is False) if isinstance(v, bool) else (v is None),
+        }
+        operator_rex = re.compile(r'''(?x)
+            (?P<op>{})\s*(?P<key>[a-z_]+)
+            '''.format('|'.join(map(re.escape, UNARY_OPERATORS.keys()))))
+        m = operator_rex.fullmatch(filter_part.strip())
+        if m:
+            op = UNARY_OPERATORS[m.group('op')]
+            actual_value = dct.get(m.group('key'))
+            if is_incomplete(m.group('key')) and actual_value is None:
+                return True
+            return op(actual_value)
+
+        raise ValueError(f'Invalid filter part {filter_part!r}')
+
+    return all(
+        match_one(filter_part.replace(r'\&', '&'))
+        for filter_part in re.split(r'(?<!\\)&', filter_str))
+
+
 class TestUtil(unittest.TestCase):
     def test_timeconvert(self):
         self.assertTrue(timeconvert('') is None)
@@ -1556,6 +1641,44 @@ def test_match_str(self):
         self.assertTrue(match_str('!x', {'id': 'foo'}, True))
         self.assertFalse(match_str('x', {'id': 'foo'}, False))
 
+    def test_match_str_equivalence(self):
+        FILTERS = (
+            'x', '!x', ' ! x ', 'is_live', '!is_live', 'x>0', 'x >? 0', 'x>=1K', 'x<1.5MiB', 'x > 1:00:00',
+            'x=1200', 'x!=1200', 'x ! = 1200', 'x<=?12', 'x=abc', 'x = "abc"', 'x^=ab', 'x!^=ab', 'x$=bc',
+            'x!$=bc', 'x*=b', 'x!*=b', r'x~=(?i)^A', r'x!~=\d', 'x^=12', 'x~=[', 'x=""', "x='a\\'b'",
+            'x & y', 'x>?1 & !y', r'x=a \& b', r'x="a \& b" & y', 'x>0 & @invalid', '@invalid & x>0', 'X', '',
+            'x=PT5M', 'x<5m', 'x>=1e3', 'x=nan', 'x>True',
+        )
+        DICTS = (
+            {}, {'x': None}, {'x': 0}, {'x': 1200}, {'x': 3700.5}, {'x': True}, {'x': False}, {'x': ''},
+            {'x': 'abc'}, {'x': 'ABC'}, {'x': "a'b"}, {'x': 'a & b', 'y': 1}, {'x': '1200'}, {'x': [1]},
+            {'x': 12, 'y': None}, {'x': 300, 'y': 'y'},
+        )
+
+        def evaluate(func, *args):
+            try:
+                return bool(func(*args))
+            except Exception as e:
+                return type(e)
+
+        for filter_str, dct, incomplete in itertools.product(FILTERS, DICTS, (False, True, {'x'}, {'y'})):
+            with self.subTest(filter_str=filter_str, dct=dct, incomplete=incomplete):
+                self.assertEqual(
+                    evaluate(match_str, filter_str, dct, incomplete),
+                    evaluate(_reference_match_str, filter_str, dct, incomplete))
+
+        match_filter = match_filter_func(FILTERS[:10], 'x!=1200')
+        for dct, incomplete in itertools.product(DICTS, (False, True)):
+            if isinstance(dct.get('x'), list):  # Whether this raises depends on the order of the filters
+                continue
+            with self.subTest(dct=dct, incomplete=incomplete):
+                if not _reference_match_str('x!=1200', dct, incomplete):
+                    self.assertRaises(RejectedVideoReached, match_filter, dct, incomplete)
+                elif any(_reference_match_str(f, dct, incomplete) for f in FILTERS[:10]):
+                    self.assertIsNone(match_filter(dct, incomplete))
+                else:
+                    self.assertIsInstance(match_filter(dct, incomplete), str)
+
     def test_parse_dfxp_time_expr(self):
         self.assertEqual(parse_dfxp_time_expr(None), None)
         self.assertEqual(parse_dfxp_time_expr(''), None)
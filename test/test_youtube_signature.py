@@ -10,12 +10,16 @@
 
 import contextlib
 import re
+import shutil
 import string
+import tempfile
 import urllib.request
+from unittest import mock
 
 from test.helper import FakeYDL, is_download_test
 from yt_dlp.extractor import YoutubeIE
 from yt_dlp.jsinterp import JSInterpreter
+from yt_dlp.utils import ExtractorError
 
 _SIG_TESTS = [
     (
@@ -416,6 +420,81 @@ def tearDown(self):
                 os.remove(f)
 
 
+class TestNsigCache(unittest.TestCase):
+    PLAYER_URL = 'https://www.youtube.com/s/player/4c3f79c5/player_ias.vflset/en_US/base.js'
+
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cachedir)
+
+    def _ie(self):
+        ie = YoutubeIE(FakeYDL({'cachedir': self.cachedir}))
+        ie.cache.store(
+            'youtube-nsig', ie._player_js_cache_key(self.PLAYER_URL),
+            [['a'], 'return a.split("").reverse().join("")'])
+        return ie
+
+    def test_nsig_results(self):
+        ie = self._ie()
+        self.assertEqual(ie._decrypt_nsig('abcdef', 'id', self.PLAYER_URL), 'fedcba')
+        self.assertEqual(ie._decrypt_nsig('ghijkl', 'id', self.PLAYER_URL), 'lkjihg')
+        with mock.patch.object(ie, '_extract_n_function_code', side_effect=AssertionError):
+            self.assertEqual(ie._decrypt_nsig('abcdef', 'id', self.PLAYER_URL), 'fedcba')
+        # The results are written at once on close, by a single close hook
+        self.assertIsNone(ie.cache.load('youtube-nsig-results', ie._player_js_cache_key(self.PLAYER_URL)))
+        self.assertEqual(ie._downloader._close_hooks.count(ie._write_nsig_results), 1)
+        with mock.patch.object(ie.cache, 'store', wraps=ie.cache.store) as store:
+            ie._downloader.close()
+        self.assertEqual(store.call_count, 1)
+
+        # Another process finds the results without running any JS
+        ie = self._ie()
+        with mock.patch.object(ie, '_extract_n_function_code', side_effect=AssertionError):
+            self.assertEqual(ie._decrypt_nsig('abcdef', 'id', self.PLAYER_URL), 'fedcba')
+            self.assertEqual(ie._decrypt_nsig('ghijkl', 'id', self.PLAYER_URL), 'lkjihg')
+
+        # Only the most recent results are kept
+        with mock.patch.object(YoutubeIE, '_NSIG_RESULTS_CACHE_SIZE', 2):
+            other = self._ie()
+            self.assertEqual(other._decrypt_nsig('mnopqr', 'id', self.PLAYER_URL), 'rqponm')
+            other._downloader.close()
+        self.assertEqual(
+            list(ie.cache.load('youtube-nsig-results', ie._player_js_cache_key(self.PLAYER_URL))),
+            ['ghijkl', 'mnopqr'])
+
+    def test_nsig_results_per_video(self):
+        ie = self._ie()
+
+        def extract_formats(*args):
+            ie._decrypt_nsig('abcdef', 'id', self.PLAYER_URL)
+            return ({}, )
+
+        # The results are written after the formats of each video, without closing the YoutubeDL
+        with mock.patch.object(ie, '_extract_formats_and_subtitles', extract_formats):
+            ie._list_formats('id', [], [], [], self.PLAYER_URL)
+        self.assertEqual(
+            ie.cache.load('youtube-nsig-results', ie._player_js_cache_key(self.PLAYER_URL)), {'abcdef': 'fedcba'})
+        self.assertEqual(ie._new_nsig_results, {})
+
+    def test_nsig_results_in_memory(self):
+        with mock.patch.object(YoutubeIE, '_NSIG_RESULTS_CACHE_SIZE', 2):
+            ie = self._ie()
+            cache_id = ('youtube-nsig-results', ie._player_js_cache_key(self.PLAYER_URL))
+            for s in ('abc', 'def', 'abc', 'ghi'):
+                ie._decrypt_nsig(s, 'id', self.PLAYER_URL)
+        # Only the most recently used results are kept in memory
+        self.assertEqual(list(ie._player_cache[cache_id]), ['abc', 'ghi'])
+        self.assertEqual(list(ie._new_nsig_results[cache_id]), ['def', 'ghi'])
+
+        # A failure is remembered, but not written to the cache
+        with mock.patch.object(ie, '_extract_n_function_code', side_effect=ExtractorError('failed')) as extract:
+            for _ in range(2):
+                with self.assertRaises(ExtractorError):
+                    ie._decrypt_nsig('jkl', 'id', self.PLAYER_URL)
+        self.assertEqual(extract.call_count, 1)
+        self.assertNotIn('jkl', ie._new_nsig_results[cache_id])
+
+
 def t_factory(name, sig_func, url_pattern):
     def make_tfunc(url, sig_input, expected_sig):
         m = url_pattern.match(url)
@@ -1,10 +1,12 @@
 import collections
+import concurrent.futures
 import contextlib
 import copy
 import datetime as dt
 import errno
 import fileinput
 import functools
+import hashlib
 import http.cookiejar
 import io
 import itertools
@@ -19,11 +21,13 @@
 import subprocess
 import sys
 import tempfile
+import threading
 import time
 import tokenize
 import traceback
 import unicodedata
 
+from .archive import DownloadArchive, open_download_archive
 from .cache import Cache
 from .compat import urllib  # isort: split
 from .compat import urllib_req_to_req
@@ -31,6 +35,7 @@
 from .downloader import FFmpegFD, get_suitable_downloader, shorten_protocol_name
 from .downloader.rtmp import rtmpdump_version
 from .extractor import gen_extractor_classes, get_info_extractor, import_extractors
+from .extractor._url_index import ExtractorURLIndex
 from .extractor.common import UnsupportedURLIE
 from .extractor.openload import PhantomJSwrapper
 from .globals import (
@@ -132,7 +137,6 @@
     iri_to_uri,
     is_path_like,
     join_nonempty,
-    locked_file,
     make_archive_id,
     make_dir,
     number_of_digits,
@@ -172,6 +176,7 @@
     clean_proxies,
     std_headers,
 )
+from .utils.tracing import start_tracing, stop_tracing, trace_span, traced
 from .version import CHANNEL, ORIGIN, RELEASE_GIT_HEAD, VARIANT, __version__
 
 if os.name == 'nt':
@@ -192,6 +197,244 @@ def wrapper(self, *args, **kwargs):
     return wrapper
 
 
+_OUTTMPL_MATH_FUNCTIONS = {
+    '+': float.__add__,
+    '-': float.__sub__,
+    '*': float.__mul__,
+}
+# Field is of the form key1.key2...
+# where keys (except first) can be string, int, slice or "{field, ...}"
+_OUTTMPL_FIELD_INNER_RE = r'(?:\w+|%(num)s|%(num)s?(?::%(num)s?){1,2})' % {'num': r'(?:-?\d+)'}  # noqa: UP031
+_OUTTMPL_FIELD_RE = r'\w*(?:\.(?:%(inner)s|{%(field)s(?:,%(field)s)*}))*' % {  # noqa: UP031
+    'inner': _OUTTMPL_FIELD_INNER_RE,
+    'field': rf'\w*(?:\.{_OUTTMPL_FIELD_INNER_RE})*',
+}
+_OUTTMPL_MATH_FIELD_RE = rf'(?:{_OUTTMPL_FIELD_RE}|-?{NUMBER_RE})'
+_OUTTMPL_MATH_OPERATORS_RE = r'(?:{})'.format('|'.join(map(re.escape, _OUTTMPL_MATH_FUNCTIONS.keys())))
+_OUTTMPL_EXTERNAL_FORMAT_RE = re.compile(STR_FORMAT_RE_TMPL.format('[^)]*', f'[{STR_FORMAT_TYPES}ljhqBUDS]'))
+_OUTTMPL_INTERNAL_FORMAT_RE = re.compile(rf'''(?xs)
+    (?P<negate>-)?
+    (?P<fields>{_OUTTMPL_FIELD_RE})
+    (?P<maths>(?:{_OUTTMPL_MATH_OPERATORS_RE}{_OUTTMPL_MATH_FIELD_RE})*)
+    (?:>(?P<strf_format>.+?))?
+    (?P<remaining>
+        (?P<alternate>(?<!\\),[^|&)]+)?
+        (?:&(?P<replacement>.*?))?
+        (?:\|(?P<default>.*?))?
+    )$''')
+
+
+def _outtmpl_field_path(fields):
+    """Convert a template field like "formats.0.{url,ext}" into a path for traverse_obj"""
+    def from_user_input(field):
+        if field == ':':
+            return ...
+        elif ':' in field:
+            return slice(*map(int_or_none, field.split(':')))
+        elif int_or_none(field) is not None:
+            return int(field)
+        return field
+
+    fields = [f for x in re.split(r'\.({.+?})\.?', fields)
+              for f in ([x] if x.startswith('{') else x.split('.'))]
+    for i in (0, -1):
+        if fields and not fields[i]:
+            fields.pop(i)
+
+    for i, f in enumerate(fields):
+        if not f.startswith('{'):
+            fields[i] = from_user_input(f)
+            continue
+        assert f.endswith('}'), f'No closing brace for {f} in {fields}'
+        fields[i] = {k: list(map(from_user_input, k.split('.'))) for k in f[1:-1].split(',')}
+
+    return fields
+
+
+def _outtmpl_math_operations(maths):
+    """Split the maths of a template field into a list of (operator, operand)"""
+    operations, operator = [], None
+    while maths:
+        item = re.match(_OUTTMPL_MATH_FIELD_RE if operator else _OUTTMPL_MATH_OPERATORS_RE, maths).group(0)
+        maths = maths[len(item):]
+        if operator is None:
+            operator = _OUTTMPL_MATH_FUNCTIONS[item]
+            continue
+        operations.append((operator, item))
+        if not item:  # Invalid; fails when evaluated
+            break
+        operator = None
+    return operations
+
+
+class _ReplacementFormatter(string.Formatter):
+    def get_field(self, field_name, args, kwargs):
+        if field_name.isdigit():
+            return args[0], -1
+        raise ValueError('Unsupported field')
+
+
+_OUTTMPL_REPLACEMENT_FORMATTER = _ReplacementFormatter()
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_outtmpl(outtmpl):
+    """Parse an output template once so that it can be evaluated against any number of info dicts
+
+    @returns    (parts, keys) where parts is a tuple of literal strings and replacement fields,
+                and keys is the set of top-level info_dict keys the fields reference,
+                or None if they may need the whole info_dict
+    """
+    parts, keys = [], set()
+
+    def add_keys(path):
+        nonlocal keys
+        if keys is None:
+            return
+        first = path[0] if path else None
+        if isinstance(first, dict):
+            for sub_path in first.values():
+                add_keys(sub_path)
+        elif isinstance(first, str):
+            keys.add(first)
+        else:
+            keys = None
+
+    last_end = 0
+    for outer_mobj in _OUTTMPL_EXTERNAL_FORMAT_RE.finditer(outtmpl):
+        if not outer_mobj.group('has_key'):
+            continue
+        parts.append(outtmpl[last_end:outer_mobj.start()])
+        last_end = outer_mobj.end()
+        key, chain = outer_mobj.group('key'), []
+        mobj = _OUTTMPL_INTERNAL_FORMAT_RE.match(key)
+        while mobj:
+            mobj = mobj.groupdict()
+            mobj['path'] = _outtmpl_field_path(mobj['fields'])
+            # Most fields are a plain key that do not need a full traversal
+            mobj['simple_key'] = mobj['path'][0] if len(mobj['path']) == 1 and isinstance(mobj['path'][0], str) else None
+            add_keys(mobj['path'])
+            mobj['math_operations'] = _outtmpl_math_operations(mobj['maths'])
+            for _, operand in mobj['math_operations']:
+                operand = operand.removeprefix('-')
+                if operand and float_or_none(operand) is None:
+                    add_keys(_outtmpl_field_path(operand))
+            chain.append(mobj)
+            if not mobj['alternate']:
+                break
+            mobj = _OUTTMPL_INTERNAL_FORMAT_RE.match(mobj['remaining'][1:])
+        parts.append({
+            'chain': chain,
+            'format': outer_mobj.group('format'),
+            'conversion': outer_mobj.group('conversion') or '',
+            'prefix': outer_mobj.group('prefix'),
+            'tmpl_key': '{}\0{}'.format(key.replace('%', '%\0'), outer_mobj.group('format')),
+        })
+    parts.append(outtmpl[last_end:])
+    return tuple(parts), None if keys is None else frozenset(keys)
+
+
+class _PipelineStages:
+    """Admits jobs into a sequence of stages in the order the jobs were created
+
+    At most `capacity` jobs can be in a stage at any time. A job can only move
+    forward through the stages, and the stages it skips are passed immediately
+    """
+
+    def __init__(self, stages, capacity=1):
+        self.stages = tuple(stages)
+        self._capacity = capacity
+        self._cond = threading.Condition()
+        self._next = [0] * len(self.stages)
+        self._active = [0] * len(self.stages)
+        self._passed = [set() for _ in self.stages]
+        self._counter = itertools.count()
+
+    def new_job(self):
+        return _PipelineJob(self, next(self._counter))
+
+    def _advance(self, stage):
+        while self._next[stage] in self._passed[stage]:
+            self._passed[stage].remove(self._next[stage])
+            self._next[stage] += 1
+
+    def _move(self, seq, current, target):
+        with self._cond:
+            for stage in range(0 if current is None else current + 1, target):
+                self._passed[stage].add(seq)
+                self._advance(stage)
+            if current is not None:
+                self._active[current] -= 1
+            self._cond.notify_all()
+            if target == len(self.stages):
+                return
+            self._cond.wait_for(lambda: self._next[target] == seq and self._active[target] < self._capacity)
+            self._active[target] += 1
+            self._next[target] += 1
+            self._advance(target)
+            self._cond.notify_all()
+
+
+class _PipelineJob:
+    def __init__(self, pipeline, seq):
+        self._pipeline, self._seq = pipeline, seq
+        self.stage = None
+
+    def enter(self, stage):
+        """Wait for the turn of the job in the given stage. Does nothing if the job is already past it"""
+        target = self._pipeline.stages.index(stage)
+        if self.stage is not None and target <= self.stage:
+            return
+        self._pipeline._move(self._seq, self.stage, target)
+        self.stage = target
+
+    def finish(self):
+        self._pipeline._move(self._seq, self.stage, len(self._pipeline.stages))
+        self.stage = len(self._pipeline.stages)
+
+
+class _OrderedOutput:
+    """Writes the output of concurrent jobs in the order the jobs were created
+
+    The output of the earliest unfinished job is written immediately, and that of
+    the later jobs is buffered until all the jobs before them have finished
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._head = 0
+        self._buffers, self._finished = {}, set()
+        self._counter = itertools.count()
+
+    def new_job(self):
+        return next(self._counter)
+
+    def write(self, seq, write_func, *args):
+        with self._lock:
+            if seq == self._head:
+                write_func(*args)
+            else:
+                self._buffers.setdefault(seq, []).append((write_func, args))
+
+    def finish(self, seq):
+        with self._lock:
+            self._finished.add(seq)
+            while self._head in self._finished:
+                self._finished.remove(self._head)
+                self._head += 1
+                self._flush(self._head)
+
+    def close(self):
+        """Write the remaining buffered output, e.g. of the jobs that finished after an earlier one was cancelled"""
+        with self._lock:
+            for seq in sorted(self._buffers):
+                self._flush(seq)
+
+    def _flush(self, seq):
+        for write_func, args in self._buffers.pop(seq, ()):
+            write_func(*args)
+
+
 class YoutubeDL:
     """YoutubeDL class.
 
@@ -289,6 +532,11 @@ class YoutubeDL:
     playlist_items:    Specific indices of playlist to download.
     playlistrandom:    Download playlist items in random order.
     lazy_playlist:     Process playlist entries as they are received.
+    concurrent_video_downloads: The number of playlist entries (or input URLs)
+                       to extract, download and post-process concurrently (experimental)
+    pipelined_downloads: Overlap the extraction, download and post-processing of
+                       consecutive playlist entries (or input URLs). Each stage handles
+                       at most concurrent_video_downloads entries at a time, in order (experimental)
     matchtitle:        Download only matching titles.
     rejecttitle:       Reject downloads for matching titles.
     logger:            A class having a `debug`, `warning` and `error` function where
@@ -325,6 +573,12 @@ class YoutubeDL:
     skip_download:     Skip the actual download of the video file
     cachedir:          Location of the cache files in the filesystem.
                        False to disable filesystem cache.
+    cache_backend:     How the cache is stored; one of "dir" (one file per entry in
+                       cachedir, default), "sqlite" (a single database in cachedir)
+                       or "memory" (not persisted). See yt_dlp/cache.py
+    cache_max_size:    Maximum size of the cache in bytes. The least recently
+                       used entries are evicted to stay under it
+    cache_stats:       Print the usage of the cache when closing
     noplaylist:        Download single video instead of a playlist if in doubt.
     age_limit:         An integer representing the user's age in years.
                        Unsuitable videos for the given age are skipped.
@@ -339,6 +593,12 @@ class YoutubeDL:
                        downloaded. None for no limit.
     download_archive:  A set, or the name of a file where all downloads are recorded.
                        Videos already present in the file are not downloaded again.
+    download_archive_backend: The backend of the download_archive file; one of
+                       "text" or "sqlite" (see yt_dlp/archive.py). By default, sqlite is
+                       used for existing databases and for .sqlite/.sqlite3/.db files
+    download_archive_import: Add the IDs from this text archive file to download_archive
+    download_archive_export: Write all the IDs of download_archive to this text archive
+                       file when the YoutubeDL is closed
     break_on_existing: Stop the download process after attempting to download a
                        file that is in the archive.
     break_per_url:     Whether break_on_reject and break_on_existing
@@ -366,6 +626,8 @@ class YoutubeDL:
     bidi_workaround:   Work around buggy terminals without bidirectional text
                        support, using fridibi
     debug_printtraffic:Print out sent and received HTTP traffic
+    trace_file:        File to write a Chrome trace of the timed spans of the run to.
+                       See yt_dlp.utils.tracing
     default_search:    Prepend this string if an input url is not valid.
                        'auto' for elaborate guessing
     encoding:          Use this encoding instead of the system-specified.
@@ -408,6 +670,15 @@ class YoutubeDL:
                                          downloaded video fragment.
                        * fragment_count: The number of fragments (= individual
                                          files that will be merged)
+                       * fragments_buffered: The number of downloaded fragments
+                                         waiting for an earlier fragment, when
+                                         downloading fragments concurrently
+                       * fragment_concurrency: The current number of concurrent
+                                         fragment downloads, with
+                                         adaptive_fragment_concurrency
+                       * hedged_requests: The number of duplicate requests sent
+                                         for slow fragments or ranges, with
+                                         hedge_percentile
 
                        Progress hooks are guaranteed to be called at least once
                        (with status "finished") if the download is successful.
@@ -509,7 +780,9 @@ class YoutubeDL:
     nopart, updatetime, buffersize, ratelimit, throttledratelimit, min_filesize,
     max_filesize, test, noresizebuffer, retries, file_access_retries, fragment_retries,
     continuedl, xattr_set_filesize, hls_use_mpegts, http_chunk_size,
-    external_downloader_args, concurrent_fragment_downloads, progress_delta.
+    external_downloader_args, concurrent_fragment_downloads, adaptive_fragment_concurrency,
+    fragment_memory_limit, fragment_coalesce_size, http_connections, hedge_percentile,
+    progress_delta.
 
     The following options are used by the post processors:
     ffmpeg_location:   Location of the ffmpeg/avconv binary; either the path
@@ -531,6 +804,13 @@ class YoutubeDL:
                        See "EXTRACTOR ARGUMENTS" for details.
                        E.g. {'youtube': {'skip': ['dash', 'hls']}}
     mark_watched:      Mark videos watched (even with --simulate). Only for YouTube
+    extract_cache:     Reuse the results of previous extractions of the same videos
+                       with the same version, extractor args, cookies, account and
+                       source address, from the cache, until their format URLs expire.
+                       Playlists, live streams and results with credentials in their
+                       headers are not cached
+    extract_cache_max_age: Maximum age of the reused extraction results in seconds
+                       (default: 3600)
 
     The following options are deprecated and may be removed in the future:
 
@@ -621,6 +901,18 @@ class YoutubeDL:
         'creator': 'creators',
         'genre': 'genres',
     }
+    _PIPELINE_STAGES = ('extract', 'download', 'post_process')
+    # Cached extraction results expire this many seconds before their format URLs do
+    _EXTRACT_CACHE_MARGIN = 600
+    # Extraction results are only reused with the same values of these params
+    _EXTRACT_CACHE_PARAMS = (
+        'extractor_args', 'cookiefile', 'cookiesfrombrowser', 'username', 'usenetrc', 'netrc_location', 'netrc_cmd',
+        'videopassword', 'ap_mso', 'ap_username', 'http_headers', 'impersonate', 'proxy', 'geo_verification_proxy',
+        'geo_bypass', 'geo_bypass_country', 'geo_bypass_ip_block', 'allow_unplayable_formats', 'source_address',
+        'dynamic_mpd', 'hls_split_discontinuity', 'youtube_include_dash_manifest', 'youtube_include_hls_manifest')
+    # Extraction results with such headers are not written to the cache
+    _EXTRACT_CACHE_SENSITIVE_HEADERS_RE = re.compile(r'(?i)auth|cookie|token|session')
+
     _format_selection_exts = {
         'audio': set(MEDIA_EXTENSIONS.common_audio),
         'video': {*MEDIA_EXTENSIONS.common_video, '3gp'},
@@ -637,6 +929,7 @@ def __init__(self, params=None, auto_init=True):
         self.params = params
         self._ies = {}
         self._ies_instances = {}
+        self._url_index = None
         self._pps = {k: [] for k in POSTPROCESS_WHEN}
         self._printed_messages = set()
         self._first_webpage_request = True
@@ -649,7 +942,13 @@ def __init__(self, params=None, auto_init=True):
         self._num_videos = 0
         self._playlist_level = 0
         self._playlist_urls = set()
+        self._download_lock = threading.RLock()
+        self._worker_state = threading.local()
+        self._worker_ies = threading.local()
+        self._shared_progress = None
+        self._tracer = start_tracing(params['trace_file']) if params.get('trace_file') else None
         self.cache = Cache(self)
+        self._extract_cache_stats = collections.Counter()
         self.__header_cookies = []
 
         # compat for API: load plugins if they have not already
@@ -827,25 +1126,20 @@ def check_deprecated(param, option, suggestion):
                 get_postprocessor(pp_def.pop('key'))(self, **pp_def),
                 when=when)
 
-        def preload_download_archive(fn):
-            """Preload the archive, if any is specified"""
-            archive = set()
+        def open_archive(fn):
+            """Open the archive, if any is specified"""
             if fn is None:
-                return archive
+                return set()
             elif not is_path_like(fn):
                 return fn
+            return open_download_archive(fn, self, self.params.get('download_archive_backend'))
 
-            self.write_debug(f'Loading archive file {fn!r}')
-            try:
-                with locked_file(fn, 'r', encoding='utf-8') as archive_file:
-                    for line in archive_file:
-                        archive.add(line.strip())
-            except OSError as ioe:
-                if ioe.errno != errno.ENOENT:
-                    raise
-            return archive
-
-        self.archive = preload_download_archive(self.params.get('download_archive'))
+        self.archive = open_archive(self.params.get('download_archive'))
+        if self.params.get('download_archive_import'):
+            if not isinstance(self.archive, DownloadArchive):
+                raise YoutubeDLError('download_archive_import requires a download_archive file')
+            count = self.archive.import_text(self.params['download_archive_import'])
+            self.to_screen(f'[info] Imported {count} IDs into the download archive')
 
     def warn_if_short_id(self, argv):
         # short YouTube ID starting with dash?
@@ -866,16 +1160,39 @@ def add_info_extractor(self, ie):
         """Add an InfoExtractor object to the end of the list."""
         ie_key = ie.ie_key()
         self._ies[ie_key] = ie
+        self._url_index = None
         if not isinstance(ie, type):
             self._ies_instances[ie_key] = ie
             ie.set_downloader(self)
 
+    def _suitable_extractors(self, url):
+        """Get the (ie_key, ie) that may be suitable for the URL, in the order they were added"""
+        if not LAZY_EXTRACTORS.value:
+            # Deriving the hosts of all the extractors at runtime would cost more than it saves
+            return self._ies.items()
+        if self._url_index is None:
+            self._url_index = ExtractorURLIndex(self._ies.items())
+        return self._url_index.candidates(url)
+
     def get_info_extractor(self, ie_key):
         """
         Get an instance of an IE with name ie_key, it will try to get one from
         the _ies list, if there's no instance it will create a new one and add
         it to the extractor list.
+
+        The IEs keep state of their extractions, so each worker thread of the
+        concurrent jobs gets its own instances, that are not added to the list
         """
+        if getattr(self._worker_state, 'active', False):
+            ies_instances = self._worker_ies.__dict__
+            ie = ies_instances.get(ie_key)
+            if ie is None:
+                ie_class = self._ies.get(ie_key) or get_info_extractor(ie_key)
+                ie = (ie_class if isinstance(ie_class, type) else type(ie_class))()
+                ie.set_downloader(self)
+                ies_instances[ie_key] = ie
+            return ie
+
         ie = self._ies_instances.get(ie_key)
         if ie is None:
             ie = get_info_extractor(ie_key)()
@@ -954,7 +1271,14 @@ def to_stdout(self, message, skip_eol=False, quiet=None):
         if skip_eol is not False:
             self.deprecation_warning('"YoutubeDL.to_stdout" no longer accepts the argument skip_eol. '
                                      'Use "YoutubeDL.to_screen" instead')
-        self._write_string(f'{self._bidi_workaround(message)}\n', self._out_files.out)
+        message = f'{self._bidi_workaround(message)}\n'
+        # Concurrent jobs write their output in the order of the jobs
+        output = getattr(self._worker_state, 'output', None)
+        if output:
+            ordered_output, seq = output
+            ordered_output.write(seq, self._write_string, message, self._out_files.out)
+        else:
+            self._write_string(message, self._out_files.out)
 
     def to_screen(self, message, skip_eol=False, quiet=None, only_once=False):
         """Print message to screen if not in quiet mode"""
@@ -1019,13 +1343,29 @@ def __exit__(self, *args):
 
     def close(self):
         self.save_cookies()
+        if isinstance(self.archive, DownloadArchive):
+            if self.params.get('download_archive_export'):
+                count = self.archive.export_text(self.params['download_archive_export'])
+                self.to_screen(f'[info] Exported {count} IDs from the download archive')
+            self.archive.close()
         if '_request_director' in self.__dict__:
             self._request_director.close()
             del self._request_director
 
+        # The close hooks may write to the cache
         for close_hook in self._close_hooks:
             close_hook()
 
+        if self.params.get('cache_stats'):
+            self.cache.report_stats()
+            if self.params.get('extract_cache'):
+                self.to_screen(
+                    f'[cache] Extraction results: {self._extract_cache_stats["hits"]} hits, '
+                    f'{self._extract_cache_stats["misses"]} misses')
+        self.cache.close()
+        stop_tracing(self._tracer)
+        self._tracer = None
+
     def trouble(self, message=None, tb=None, is_error=True):
         """Determine action to take when a download problem appears.
 
@@ -1194,6 +1534,7 @@ def _outtmpl_expandpath(outtmpl):
         return expand_path(outtmpl).replace(sep, '')
 
     @staticmethod
+    @functools.lru_cache(maxsize=1024)
     def escape_outtmpl(outtmpl):
         """ Escape any remaining strings like %s, %abc% etc. """
         return re.sub(
@@ -1228,16 +1569,6 @@ def prepare_outtmpl(self, outtmpl, info_dict, sanitize=False):
 
         info_dict.setdefault('epoch', int(time.time()))  # keep epoch consistent once set
 
-        info_dict = self._copy_infodict(info_dict)
-        info_dict['duration_string'] = (  # %(duration>%H-%M-%S)s is wrong if duration > 24hrs
-            formatSeconds(info_dict['duration'], '-' if sanitize else ':')
-            if info_dict.get('duration', None) is not None
-            else None)
-        info_dict['autonumber'] = int(self.params.get('autonumber_start', 1) - 1 + self._num_downloads)
-        info_dict['video_autonumber'] = self._num_videos
-        if info_dict.get('resolution') is None:
-            info_dict['resolution'] = self.format_resolution(info_dict, default=None)
-
         # For fields playlist_index, playlist_autonumber and autonumber convert all occurrences
         # of %(field)s to %(field)0Nd for backward compatibility
         field_size_compat_map = {
@@ -1246,88 +1577,51 @@ def prepare_outtmpl(self, outtmpl, info_dict, sanitize=False):
             'autonumber': self.params.get('autonumber_size') or 5,
         }
 
-        TMPL_DICT = {}
-        EXTERNAL_FORMAT_RE = re.compile(STR_FORMAT_RE_TMPL.format('[^)]*', f'[{STR_FORMAT_TYPES}ljhqBUDS]'))
-        MATH_FUNCTIONS = {
-            '+': float.__add__,
-            '-': float.__sub__,
-            '*': float.__mul__,
-        }
-        # Field is of the form key1.key2...
-        # where keys (except first) can be string, int, slice or "{field, ...}"
-        FIELD_INNER_RE = r'(?:\w+|%(num)s|%(num)s?(?::%(num)s?){1,2})' % {'num': r'(?:-?\d+)'}  # noqa: UP031
-        FIELD_RE = r'\w*(?:\.(?:%(inner)s|{%(field)s(?:,%(field)s)*}))*' % {  # noqa: UP031
-            'inner': FIELD_INNER_RE,
-            'field': rf'\w*(?:\.{FIELD_INNER_RE})*',
-        }
-        MATH_FIELD_RE = rf'(?:{FIELD_RE}|-?{NUMBER_RE})'
-        MATH_OPERATORS_RE = r'(?:{})'.format('|'.join(map(re.escape, MATH_FUNCTIONS.keys())))
-        INTERNAL_FORMAT_RE = re.compile(rf'''(?xs)
-            (?P<negate>-)?
-            (?P<fields>{FIELD_RE})
-            (?P<maths>(?:{MATH_OPERATORS_RE}{MATH_FIELD_RE})*)
-            (?:>(?P<strf_format>.+?))?
-            (?P<remaining>
-                (?P<alternate>(?<!\\),[^|&)]+)?
-                (?:&(?P<replacement>.*?))?
-                (?:\|(?P<default>.*?))?
-            )$''')
-
-        def _from_user_input(field):
-            if field == ':':
-                return ...
-            elif ':' in field:
-                return slice(*map(int_or_none, field.split(':')))
-            elif int_or_none(field) is not None:
-                return int(field)
-            return field
-
-        def _traverse_infodict(fields):
-            fields = [f for x in re.split(r'\.({.+?})\.?', fields)
-                      for f in ([x] if x.startswith('{') else x.split('.'))]
-            for i in (0, -1):
-                if fields and not fields[i]:
-                    fields.pop(i)
-
-            for i, f in enumerate(fields):
-                if not f.startswith('{'):
-                    fields[i] = _from_user_input(f)
-                    continue
-                assert f.endswith('}'), f'No closing brace for {f} in {fields}'
-                fields[i] = {k: list(map(_from_user_input, k.split('.'))) for k in f[1:-1].split(',')}
+        # Only the fields that are referenced by the template need to be evaluated
+        parts, keys = _compile_outtmpl(outtmpl)
+        fields = self._copy_infodict(
+            info_dict if keys is None else {k: info_dict[k] for k in keys if k in info_dict})
+        if keys is None or 'duration_string' in keys:
+            fields['duration_string'] = (  # %(duration>%H-%M-%S)s is wrong if duration > 24hrs
+                formatSeconds(info_dict['duration'], '-' if sanitize else ':')
+                if info_dict.get('duration', None) is not None
+                else None)
+        if keys is None or 'autonumber' in keys:
+            num_downloads = getattr(self._worker_state, 'num_downloads', None) or self._num_downloads
+            fields['autonumber'] = int(self.params.get('autonumber_start', 1) - 1 + num_downloads)
+        if keys is None or 'video_autonumber' in keys:
+            fields['video_autonumber'] = self._num_videos
+        if (keys is None or 'resolution' in keys) and fields.get('resolution') is None:
+            fields['resolution'] = self.format_resolution(info_dict, default=None)
+        info_dict = fields
 
-            return traverse_obj(info_dict, fields, traverse_string=True)
+        TMPL_DICT = {}
 
         def get_value(mdict):
             # Object traversal
-            value = _traverse_infodict(mdict['fields'])
+            if mdict['simple_key'] is not None:
+                value = info_dict.get(mdict['simple_key'])
+                if value == {}:  # Same as traverse_obj
+                    value = None
+            else:
+                value = traverse_obj(info_dict, mdict['path'], traverse_string=True)
             # Negative
             if mdict['negate']:
                 value = float_or_none(value)
                 if value is not None:
                     value *= -1
             # Do maths
-            offset_key = mdict['maths']
-            if offset_key:
+            if mdict['maths']:
                 value = float_or_none(value)
-                operator = None
-                while offset_key:
-                    item = re.match(
-                        MATH_FIELD_RE if operator else MATH_OPERATORS_RE,
-                        offset_key).group(0)
-                    offset_key = offset_key[len(item):]
-                    if operator is None:
-                        operator = MATH_FUNCTIONS[item]
-                        continue
+                for operator, item in mdict['math_operations']:
                     item, multiplier = (item[1:], -1) if item[0] == '-' else (item, 1)
                     offset = float_or_none(item)
                     if offset is None:
-                        offset = float_or_none(_traverse_infodict(item))
+                        offset = float_or_none(traverse_obj(info_dict, _outtmpl_field_path(item), traverse_string=True))
                     try:
                         value = operator(value, multiplier * offset)
                     except (TypeError, ZeroDivisionError):
                         return None
-                    operator = None
             # Datetime formatting
             if mdict['strf_format']:
                 value = strftime_or_none(value, mdict['strf_format'].replace('\\,', ','))
@@ -1362,41 +1656,26 @@ def _dumpjson_default(obj):
                 return list(obj)
             return repr(obj)
 
-        class _ReplacementFormatter(string.Formatter):
-            def get_field(self, field_name, args, kwargs):
-                if field_name.isdigit():
-                    return args[0], -1
-                raise ValueError('Unsupported field')
-
-        replacement_formatter = _ReplacementFormatter()
-
-        def create_key(outer_mobj):
-            if not outer_mobj.group('has_key'):
-                return outer_mobj.group(0)
-            key = outer_mobj.group('key')
-            mobj = re.match(INTERNAL_FORMAT_RE, key)
+        def create_key(part):
             value, replacement, default, last_field = None, None, na, ''
-            while mobj:
-                mobj = mobj.groupdict()
+            for mobj in part['chain']:
                 default = mobj['default'] if mobj['default'] is not None else default
                 value = get_value(mobj)
                 last_field, replacement = mobj['fields'], mobj['replacement']
-                if value is None and mobj['alternate']:
-                    mobj = re.match(INTERNAL_FORMAT_RE, mobj['remaining'][1:])
-                else:
+                if value is not None or not mobj['alternate']:
                     break
 
             if None not in (value, replacement):
                 try:
-                    value = replacement_formatter.format(replacement, value)
+                    value = _OUTTMPL_REPLACEMENT_FORMATTER.format(replacement, value)
                 except ValueError:
                     value, default = None, na
 
-            fmt = outer_mobj.group('format')
+            fmt = part['format']
             if fmt == 's' and last_field in field_size_compat_map and isinstance(value, int):
                 fmt = f'0{field_size_compat_map[last_field]:d}d'
 
-            flags = outer_mobj.group('conversion') or ''
+            flags = part['conversion']
             str_fmt = f'{fmt[:-1]}s'
             if value is None:
                 value, fmt = default, 's'
@@ -1446,11 +1725,11 @@ def create_key(outer_mobj):
                 if fmt[-1] in 'csra':
                     value = sanitize(last_field, value)
 
-            key = '{}\0{}'.format(key.replace('%', '%\0'), outer_mobj.group('format'))
+            key = part['tmpl_key']
             TMPL_DICT[key] = value
-            return '{prefix}%({key}){fmt}'.format(key=key, fmt=fmt, prefix=outer_mobj.group('prefix'))
+            return '{prefix}%({key}){fmt}'.format(key=key, fmt=fmt, prefix=part['prefix'])
 
-        return EXTERNAL_FORMAT_RE.sub(create_key, outtmpl), TMPL_DICT
+        return ''.join(part if isinstance(part, str) else create_key(part) for part in parts), TMPL_DICT
 
     def evaluate_outtmpl(self, outtmpl, info_dict, *args, **kwargs):
         outtmpl, info_dict = self.prepare_outtmpl(outtmpl, info_dict, *args, **kwargs)
@@ -1630,11 +1909,11 @@ def extract_info(self, url, download=True, ie_key=None, extra_info=None,
             ie_key = 'Generic'
 
         if ie_key:
-            ies = {ie_key: self._ies[ie_key]} if ie_key in self._ies else {}
+            ies = [(ie_key, self._ies[ie_key])] if ie_key in self._ies else []
         else:
-            ies = self._ies
+            ies = self._suitable_extractors(url)
 
-        for key, ie in ies.items():
+        for key, ie in ies:
             if not ie.suitable(url):
                 continue
 
@@ -1649,7 +1928,8 @@ def extract_info(self, url, download=True, ie_key=None, extra_info=None,
                 if self.params.get('break_on_existing', False):
                     raise ExistingVideoReached
                 break
-            return self.__extract_info(url, self.get_info_extractor(key), download, extra_info, process)
+            with trace_span('extract_info', 'extract', url=url, extractor=key):
+                return self.__extract_info(url, self.get_info_extractor(key), download, extra_info, process)
         else:
             extractors_restricted = self.params.get('allowed_extractors') not in (None, ['default'])
             self.report_error(f'No suitable extractor{format_field(ie_key, None, " (%s)")} found for URL {url}',
@@ -1794,23 +2074,29 @@ def _apply_header_cookies(self, url, cookies=None):
     def __extract_info(self, url, ie, download, extra_info, process):
         self._apply_header_cookies(url)
 
-        try:
-            ie_result = ie.extract(url)
-        except UserNotLive as e:
-            if process:
-                if self.params.get('wait_for_video'):
-                    self.report_warning(e)
-                self._wait_for_video()
-            raise
-        if ie_result is None:  # Finished already (backwards compatibility; listformats and friends should be moved here)
-            self.report_warning(f'Extractor {ie.IE_NAME} returned nothing{bug_reports_message()}')
-            return
-        if isinstance(ie_result, list):
-            # Backwards compatibility: old IE result format
-            ie_result = {
-                '_type': 'compat_list',
-                'entries': ie_result,
-            }
+        cache_key = self._extract_cache_key(ie, url)
+        ie_result = cache_key and self._load_extract_cache(ie, cache_key)
+        if not ie_result:
+            try:
+                ie_result = ie.extract(url)
+            except UserNotLive as e:
+                if process:
+                    if self.params.get('wait_for_video'):
+                        self.report_warning(e)
+                    self._wait_for_video()
+                raise
+            # Finished already (backwards compatibility; listformats and friends should be moved here)
+            if ie_result is None:
+                self.report_warning(f'Extractor {ie.IE_NAME} returned nothing{bug_reports_message()}')
+                return
+            if isinstance(ie_result, list):
+                # Backwards compatibility: old IE result format
+                ie_result = {
+                    '_type': 'compat_list',
+                    'entries': ie_result,
+                }
+            if cache_key:
+                self._store_extract_cache(cache_key, ie_result)
         if extra_info.get('original_url'):
             ie_result.setdefault('original_url', extra_info['original_url'])
         self.add_default_extra_info(ie_result, ie, url)
@@ -1820,6 +2106,57 @@ def __extract_info(self, url, ie, download, extra_info, process):
         else:
             return ie_result
 
+    def _extract_cache_key(self, ie, url):
+        if not self.params.get('extract_cache'):
+            return None
+        video_id = ie.get_temp_id(url)
+        if not video_id:
+            return None
+        params = {name: self.params.get(name) for name in self._EXTRACT_CACHE_PARAMS}
+        digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=repr).encode()).hexdigest()
+        return f'{ie.ie_key()}_{video_id}_{digest[:16]}'
+
+    def _load_extract_cache(self, ie, cache_key):
+        # The extractors of other versions may have returned other results
+        ie_result = self.cache.load('extract-results', cache_key, min_ver=__version__)
+        self._extract_cache_stats['hits' if ie_result else 'misses'] += 1
+        if ie_result:
+            self.to_screen(f'[{ie.IE_NAME}] {ie_result.get("id")}: Reusing the extraction result from the cache')
+        return ie_result
+
+    def _extract_cache_ttl(self, ie_result):
+        """@returns     Seconds until the earliest expiry of the format URLs, limited to extract_cache_max_age"""
+        ttl = self.params.get('extract_cache_max_age')
+        if ttl is None:
+            ttl = 3600
+        for url in traverse_obj(
+                ie_result.get('formats') or [ie_result], (..., ('url', 'manifest_url', 'fragment_base_url'), {str})):
+            # e.g. ?expire=1700000000 (YouTube, signed URLs), /expire/1700000000/ (YouTube manifests), ?Expires= (S3)
+            expires = re.search(r'[/?&]expires?[=/](\d{9,})(?:[/&#]|$)', url, re.IGNORECASE)
+            if expires:
+                ttl = min(ttl, int(expires.group(1)) - time.time() - self._EXTRACT_CACHE_MARGIN)
+        return ttl
+
+    def _store_extract_cache(self, cache_key, ie_result):
+        if (ie_result.get('_type', 'video') != 'video' or ie_result.get('is_live')
+                or ie_result.get('live_status') in ('is_live', 'is_upcoming', 'post_live')
+                or '__post_extractor' in ie_result):
+            return
+        sensitive = self._EXTRACT_CACHE_SENSITIVE_HEADERS_RE.search
+        if any(info.get('cookies') or any(map(sensitive, info.get('http_headers') or {}))
+               for info in (ie_result, *(ie_result.get('formats') or []))):
+            self.write_debug(f'Not caching the extraction result of {cache_key}, since it has credentials')
+            return
+        ttl = self._extract_cache_ttl(ie_result)
+        if ttl <= 0:
+            return
+        try:
+            json.dumps(ie_result)
+        except (TypeError, ValueError) as e:
+            self.write_debug(f'Unable to cache the extraction result of {cache_key}: {e}')
+            return
+        self.cache.store('extract-results', cache_key, ie_result, ttl=ttl)
+
     def add_default_extra_info(self, ie_result, ie, url):
         if url is not None:
             self.add_extra_info(ie_result, {
@@ -1940,16 +2277,18 @@ def process_ie_result(self, ie_result, download=True, extra_info=None):
                         ie_result.get('title')) or ie_result.get('id'))
                 return
 
-            self._playlist_level += 1
-            self._playlist_urls.add(webpage_url)
+            with self._download_lock:
+                self._playlist_level += 1
+                self._playlist_urls.add(webpage_url)
             self._fill_common_fields(ie_result, False)
             self._sanitize_thumbnails(ie_result)
             try:
                 return self.__process_playlist(ie_result, download)
             finally:
-                self._playlist_level -= 1
-                if not self._playlist_level:
-                    self._playlist_urls.clear()
+                with self._download_lock:
+                    self._playlist_level -= 1
+                    if not self._playlist_level:
+                        self._playlist_urls.clear()
         elif result_type == 'compat_list':
             self.report_warning(
                 'Extractor {} returned a compat_list result. '
@@ -2065,38 +2404,42 @@ def __process_playlist(self, ie_result, download):
         if keep_resolved_entries:
             self.write_debug('The information of all playlist entries will be held in memory')
 
-        failures = 0
-        max_failures = self.params.get('skip_playlist_after_errors') or float('inf')
-        for i, (playlist_index, entry) in enumerate(entries):
-            if lazy:
-                resolved_entries.append((playlist_index, entry))
-            if not entry:
-                continue
+        def entry_jobs():
+            for i, (playlist_index, entry) in enumerate(entries):
+                if lazy:
+                    resolved_entries.append((playlist_index, entry))
+                if not entry:
+                    continue
 
-            entry['__x_forwarded_for_ip'] = ie_result.get('__x_forwarded_for_ip')
-            if not lazy and 'playlist-index' in self.params['compat_opts']:
-                playlist_index = ie_result['requested_entries'][i]
+                entry['__x_forwarded_for_ip'] = ie_result.get('__x_forwarded_for_ip')
+                if not lazy and 'playlist-index' in self.params['compat_opts']:
+                    playlist_index = ie_result['requested_entries'][i]
 
-            entry_copy = collections.ChainMap(entry, {
-                **common_info,
-                'n_entries': int_or_none(n_entries),
-                'playlist_index': playlist_index,
-                'playlist_autonumber': i + 1,
-            })
+                entry_copy = collections.ChainMap(entry, {
+                    **common_info,
+                    'n_entries': int_or_none(n_entries),
+                    'playlist_index': playlist_index,
+                    'playlist_autonumber': i + 1,
+                })
 
-            if self._match_entry(entry_copy, incomplete=True) is not None:
-                # For compatabilty with youtube-dl. See https://github.com/yt-dlp/yt-dlp/issues/4369
-                resolved_entries[i] = (playlist_index, NO_DEFAULT)
-                continue
+                if self._match_entry(entry_copy, incomplete=True) is not None:
+                    # For compatabilty with youtube-dl. See https://github.com/yt-dlp/yt-dlp/issues/4369
+                    resolved_entries[i] = (playlist_index, NO_DEFAULT)
+                    continue
+
+                self.to_screen(
+                    f'[download] Downloading item {self._format_screen(i + 1, self.Styles.ID)} '
+                    f'of {self._format_screen(n_entries, self.Styles.EMPHASIS)}')
 
-            self.to_screen(
-                f'[download] Downloading item {self._format_screen(i + 1, self.Styles.ID)} '
-                f'of {self._format_screen(n_entries, self.Styles.EMPHASIS)}')
+                yield (i, playlist_index), functools.partial(
+                    self.__process_iterable_entry, entry, download, collections.ChainMap({
+                        'playlist_index': playlist_index,
+                        'playlist_autonumber': i + 1,
+                    }, extra))
 
-            entry_result = self.__process_iterable_entry(entry, download, collections.ChainMap({
-                'playlist_index': playlist_index,
-                'playlist_autonumber': i + 1,
-            }, extra))
+        failures = 0
+        max_failures = self.params.get('skip_playlist_after_errors') or float('inf')
+        for (i, playlist_index), entry_result in self._run_jobs(entry_jobs(), allow_concurrency=download):
             if not entry_result:
                 failures += 1
             if failures >= max_failures:
@@ -2128,6 +2471,95 @@ def __process_iterable_entry(self, entry, download, extra_info):
         return self.process_ie_result(
             entry, download=download, extra_info=extra_info)
 
+    def _run_jobs(self, jobs, *, allow_concurrency=True):
+        """Run the given jobs, using concurrent_video_downloads worker threads if requested
+
+        @param jobs               An iterable of (key, func) tuples. It is consumed lazily,
+                                  and never more than one job per worker is started ahead
+        @param allow_concurrency  Whether the jobs may be run concurrently
+        @returns                  A generator of (key, result) tuples in the order the jobs finished.
+                                  If a job raises, no further jobs are started and the error is
+                                  re-raised once the already running jobs have finished.
+                                  The jobs' stdout output is still written in the order of the jobs
+        """
+        max_workers = self.params.get('concurrent_video_downloads') or 1
+        pipeline = None
+        if self.params.get('pipelined_downloads'):
+            pipeline = _PipelineStages(self._PIPELINE_STAGES, max_workers)
+            max_workers *= len(pipeline.stages)
+        if not allow_concurrency or max_workers <= 1 or getattr(self._worker_state, 'active', False):
+            # Jobs started from inside a worker are always run sequentially
+            for key, func in jobs:
+                yield key, func()
+            return
+
+        free_lines = collections.deque(range(max_workers))
+        output = _OrderedOutput()
+
+        def run_job(func, pipeline_job, seq):
+            line = free_lines.popleft()
+            self._worker_state.active, self._worker_state.progress_idx = True, line
+            self._worker_state.pipeline_job, self._worker_state.output = pipeline_job, (output, seq)
+            try:
+                if pipeline_job:
+                    pipeline_job.enter(self._PIPELINE_STAGES[0])
+                return func()
+            finally:
+                if pipeline_job:
+                    pipeline_job.finish()
+                self._worker_state.__dict__.clear()
+                output.finish(seq)
+                free_lines.append(line)
+
+        if os.name == 'nt':
+            # wait() cannot be interrupted by KeyboardInterrupt on Windows
+            wait_timeout = 0.1
+        else:
+            wait_timeout = None
+
+        self._shared_progress = Namespace(lines=max_workers, printer=None, lock=threading.Lock())
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix='yt-dlp-worker')
+        pending, jobs, exhausted = {}, iter(jobs), False
+        try:
+            while True:
+                while not exhausted and len(pending) < max_workers:
+                    try:
+                        key, func = next(jobs)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending[pool.submit(run_job, func, pipeline and pipeline.new_job(), output.new_job())] = key
+                if not pending:
+                    return
+                done, _ = concurrent.futures.wait(
+                    pending, timeout=wait_timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in [f for f in pending if f in done]:
+                    yield pending.pop(future), future.result()
+        except KeyboardInterrupt:
+            self.to_stderr('\r')
+            self.report_error('Interrupted by user. Waiting for all threads to shutdown...', is_error=False, tb=False)
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            output.close()
+            shared_progress, self._shared_progress = self._shared_progress, None
+            if shared_progress.printer:
+                shared_progress.printer.end()
+
+    def _enter_pipeline_stage(self, stage):
+        """Wait for the turn of the current job in the given stage, when pipelined_downloads is used"""
+        pipeline_job = getattr(self._worker_state, 'pipeline_job', None)
+        if pipeline_job:
+            pipeline_job.enter(stage)
+
+    def _concurrent_progress_line(self):
+        """Returns the shared progress printer state and the line reserved for the current worker"""
+        line = getattr(self._worker_state, 'progress_idx', None)
+        if line is None or self._shared_progress is None:
+            return None, None
+        return self._shared_progress, line
+
     def _build_format_filter(self, filter_spec):
         " Returns a function to filter the formats according to the filter_spec "
 
@@ -2225,6 +2657,7 @@ def _check_formats(self, formats):
             else:
                 self.to_screen('[info] Unable to download format {}. Skipping...'.format(f['format_id']))
 
+    @traced('format', 'select_formats')
     def _select_formats(self, formats, selector):
         return list(selector({
             'formats': formats,
@@ -2257,6 +2690,7 @@ def can_merge():
                 else 'bestvideo+bestaudio/best' if compat
                 else 'bestvideo*+bestaudio/best')
 
+    @traced('format', 'build_format_selector')
     def build_format_selector(self, format_spec):
         def syntax_error(note, start):
             message = (
@@ -3236,7 +3670,8 @@ def dl(self, name, info, subtitle=False, test=False):
         new_info = self._copy_infodict(info)
         if new_info.get('http_headers') is None:
             new_info['http_headers'] = self._calc_headers(new_info)
-        return fd.download(name, new_info, subtitle)
+        with trace_span(f'{fd.FD_NAME} download', 'download', id=info.get('id'), format_id=info.get('format_id')):
+            return fd.download(name, new_info, subtitle)
 
     def existing_file(self, filepaths, *, default_overwrite=True):
         existing_files = list(filter(os.path.exists, orderedSet(filepaths)))
@@ -3274,7 +3709,14 @@ def replace_info_dict(new_info):
 
         new_info, _ = self.pre_process(info_dict, 'video')
         replace_info_dict(new_info)
-        self._num_downloads += 1
+        with self._download_lock:
+            # Concurrent workers must not start more downloads than allowed
+            if self._num_downloads >= float(self.params.get('max_downloads') or 'inf'):
+                info_dict['__write_download_archive'] = 'ignore'
+                raise MaxDownloadsReached
+            self._num_downloads += 1
+            if getattr(self._worker_state, 'active', False):
+                self._worker_state.num_downloads = self._num_downloads
 
         # info_dict['_filename'] needs to be set for backward compatibility
         info_dict['_filename'] = full_filename = self.prepare_filename(info_dict, warn=True)
@@ -3398,6 +3840,7 @@ def _write_link_file(link_type):
             info_dict['__write_download_archive'] = self.params.get('force_write_download_archive')
         else:
             # Download
+            self._enter_pipeline_stage('download')
             info_dict.setdefault('__postprocessors', [])
             try:
 
@@ -3413,12 +3856,17 @@ def existing_video_file(*filepaths):
                 fd, success = None, True
                 if info_dict.get('protocol') or info_dict.get('url'):
                     fd = get_suitable_downloader(info_dict, self.params, to_stdout=temp_filename == '-')
-                    if fd != FFmpegFD and 'no-direct-merge' not in self.params['compat_opts'] and (
+                    if 'no-direct-merge' not in self.params['compat_opts'] and (
                             info_dict.get('section_start') or info_dict.get('section_end')):
-                        msg = ('This format cannot be partially downloaded' if FFmpegFD.available()
-                               else 'You have requested downloading the video partially, but ffmpeg is not installed')
-                        self.report_error(f'{msg}. Aborting')
-                        return
+                        # Without a downloader for all the formats, they are downloaded separately
+                        section_fds = [fd] if fd or not info_dict.get('requested_formats') else [
+                            get_suitable_downloader({**info_dict, **f}, self.params, to_stdout=temp_filename == '-')
+                            for f in info_dict['requested_formats']]
+                        if not all(getattr(section_fd, 'SUPPORTS_SECTIONS', False) for section_fd in section_fds):
+                            msg = ('This format cannot be partially downloaded' if FFmpegFD.available()
+                                   else 'You have requested downloading the video partially, but ffmpeg is not installed')
+                            self.report_error(f'{msg}. Aborting')
+                            return
 
                 if info_dict.get('requested_formats') is not None:
                     old_ext = info_dict['ext']
@@ -3535,6 +3983,7 @@ def correct_ext(filename, ext=new_ext):
 
             self._raise_pending_errors(info_dict)
             if success and full_filename != '-':
+                self._enter_pipeline_stage('post_process')
 
                 def fixup():
                     do_fixup = True
@@ -3641,9 +4090,15 @@ def download(self, url_list):
                 and self.params.get('max_downloads') != 1):
             raise SameFileError(outtmpl)
 
-        for url in url_list:
-            self.__download_wrapper(self.extract_info)(
-                url, force_generic_extractor=self.params.get('force_generic_extractor', False))
+        # --break-per-input needs the counters of each input to be independent
+        allow_concurrency = len(url_list) > 1 and not self.params.get('break_per_url')
+        for _ in self._run_jobs((
+            (url, functools.partial(
+                self.__download_wrapper(self.extract_info), url,
+                force_generic_extractor=self.params.get('force_generic_extractor', False)))
+            for url in url_list
+        ), allow_concurrency=allow_concurrency):
+            pass
 
         return self._download_retcode
 
@@ -3795,7 +4250,7 @@ def _make_archive_id(self, info_dict):
             if not url:
                 return
             # Try to find matching extractor for the URL and take its ie_key
-            for ie_key, ie in self._ies.items():
+            for ie_key, ie in self._suitable_extractors(url):
                 if ie.suitable(url):
                     extractor = ie_key
                     break
@@ -3819,9 +4274,6 @@ def record_download_archive(self, info_dict):
         assert vid_id
 
         self.write_debug(f'Adding to archive: {vid_id}')
-        if is_path_like(fn):
-            with locked_file(fn, 'a', encoding='utf-8') as archive_file:
-                archive_file.write(vid_id + '\n')
         self.archive.add(vid_id)
 
     @staticmethod
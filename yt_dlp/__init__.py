@@ -212,6 +212,10 @@ def validate_minmax(min_val, max_val, min_name, max_name=None):
     validate_positive('autonumber start', opts.autonumber_start)
     validate_positive('autonumber size', opts.autonumber_size, True)
     validate_positive('concurrent fragments', opts.concurrent_fragment_downloads, True)
+    validate_positive('HTTP connections', opts.http_connections, True)
+    validate(opts.hedge_percentile is None or 0 < opts.hedge_percentile < 100,
+             'hedge percentile', opts.hedge_percentile)
+    validate_positive('concurrent videos', opts.concurrent_video_downloads, True)
     validate_positive('playlist start', opts.playliststart, True)
     if opts.playlistend != -1:
         validate_minmax(opts.playliststart, opts.playlistend, 'playlist start', 'playlist end')
@@ -221,6 +225,7 @@ def validate_minmax(min_val, max_val, min_name, max_name=None):
     validate_positive('requests sleep interval', opts.sleep_interval_requests)
     validate_positive('sleep interval', opts.sleep_interval)
     validate_positive('max sleep interval', opts.max_sleep_interval)
+    validate_positive('extract cache max age', opts.extract_cache_max_age, True)
     if opts.sleep_interval is None:
         validate(
             opts.max_sleep_interval is None, 'min sleep interval',
@@ -315,6 +320,9 @@ def validate_bytes(name, value, strict_positive=False):
     opts.max_filesize = validate_bytes('max filesize', opts.max_filesize)
     opts.buffersize = validate_bytes('buffer size', opts.buffersize, True)
     opts.http_chunk_size = validate_bytes('http chunk size', opts.http_chunk_size)
+    opts.fragment_memory_limit = validate_bytes('fragment memory limit', opts.fragment_memory_limit, True)
+    opts.fragment_coalesce_size = validate_bytes('fragment coalesce size', opts.fragment_coalesce_size, True)
+    opts.cache_max_size = validate_bytes('cache max size', opts.cache_max_size, True)
 
     # Output templates
     def validate_outtmpl(tmpl, msg):
@@ -464,9 +472,16 @@ def metadataparser_actions(f):
 
     if opts.download_archive is not None:
         opts.download_archive = expand_path(opts.download_archive)
+    for archive_opt in ('download_archive_import', 'download_archive_export'):
+        if getattr(opts, archive_opt) is not None:
+            validate(opts.download_archive is not None, f'--{archive_opt.replace("_", "-")}',
+                     msg='{name} requires --download-archive')
+            setattr(opts, archive_opt, expand_path(getattr(opts, archive_opt)))
 
     if opts.ffmpeg_location is not None:
         opts.ffmpeg_location = expand_path(opts.ffmpeg_location)
+    if opts.trace_file is not None:
+        opts.trace_file = expand_path(opts.trace_file)
 
     if opts.user_agent is not None:
         opts.headers.setdefault('User-Agent', opts.user_agent)
@@ -854,10 +869,19 @@ def parse_options(argv=None):
         'file_access_retries': opts.file_access_retries,
         'fragment_retries': opts.fragment_retries,
         'extractor_retries': opts.extractor_retries,
+        'extract_cache': opts.extract_cache,
+        'extract_cache_max_age': opts.extract_cache_max_age,
         'retry_sleep_functions': opts.retry_sleep,
         'skip_unavailable_fragments': opts.skip_unavailable_fragments,
         'keep_fragments': opts.keep_fragments,
+        'fragment_memory_limit': opts.fragment_memory_limit,
+        'fragment_coalesce_size': opts.fragment_coalesce_size,
         'concurrent_fragment_downloads': opts.concurrent_fragment_downloads,
+        'adaptive_fragment_concurrency': opts.adaptive_fragment_concurrency,
+        'http_connections': opts.http_connections,
+        'hedge_percentile': opts.hedge_percentile,
+        'concurrent_video_downloads': opts.concurrent_video_downloads,
+        'pipelined_downloads': opts.pipelined_downloads,
         'buffersize': opts.buffersize,
         'noresizebuffer': opts.noresizebuffer,
         'http_chunk_size': opts.http_chunk_size,
@@ -911,9 +935,15 @@ def parse_options(argv=None):
         'max_views': opts.max_views,
         'daterange': opts.date,
         'cachedir': opts.cachedir,
+        'cache_backend': opts.cache_backend,
+        'cache_max_size': opts.cache_max_size,
+        'cache_stats': opts.cache_stats,
         'youtube_print_sig_code': opts.youtube_print_sig_code,
         'age_limit': opts.age_limit,
         'download_archive': opts.download_archive,
+        'download_archive_backend': opts.download_archive_backend,
+        'download_archive_import': opts.download_archive_import,
+        'download_archive_export': opts.download_archive_export,
         'break_on_existing': opts.break_on_existing,
         'break_on_reject': opts.break_on_reject,
         'break_per_url': opts.break_per_url,
@@ -929,6 +959,7 @@ def parse_options(argv=None):
         'socket_timeout': opts.socket_timeout,
         'bidi_workaround': opts.bidi_workaround,
         'debug_printtraffic': opts.debug_printtraffic,
+        'trace_file': opts.trace_file,
         'prefer_ffmpeg': opts.prefer_ffmpeg,
         'include_ads': opts.include_ads,
         'default_search': opts.default_search,
@@ -1002,8 +1033,9 @@ def _real_main(argv=None):
         _load_all_plugins()
 
     with YoutubeDL(ydl_opts) as ydl:
-        pre_process = opts.update_self or opts.rm_cachedir
-        actual_use = all_urls or opts.load_info_filename
+        pre_process = (opts.update_self or opts.rm_cachedir or opts.cache_stats
+                       or opts.download_archive_import or opts.download_archive_export)
+        actual_use = all_urls or opts.load_info_filename or opts.serve
 
         if opts.rm_cachedir:
             ydl.cache.remove()
@@ -1089,7 +1121,12 @@ def make_row(target, handler):
 
         parser.destroy()
         try:
-            if opts.load_info_filename is not None:
+            if opts.serve:
+                if all_urls:
+                    ydl.report_warning('URLs are ignored due to --serve')
+                from .server import serve
+                return serve(ydl, opts.serve, opts.serve_token)
+            elif opts.load_info_filename is not None:
                 if all_urls:
                     ydl.report_warning('URLs are ignored due to --load-info-json')
                 return ydl.download_with_info_file(expand_path(opts.load_info_filename))
@@ -1,4 +1,6 @@
 import base64
+import functools
+import struct
 from math import ceil
 
 from .compat import compat_ord
@@ -16,15 +18,15 @@ def aes_gcm_decrypt_and_verify_bytes(data, key, tag, nonce):
 else:
     def aes_cbc_decrypt_bytes(data, key, iv):
         """ Decrypt bytes with AES-CBC using native implementation since pycryptodome is unavailable """
-        return bytes(aes_cbc_decrypt(*map(list, (data, key, iv))))
+        return _native_aes_cbc_decrypt(data, key, iv)
 
     def aes_gcm_decrypt_and_verify_bytes(data, key, tag, nonce):
         """ Decrypt bytes with AES-GCM using native implementation since pycryptodome is unavailable """
-        return bytes(aes_gcm_decrypt_and_verify(*map(list, (data, key, tag, nonce))))
+        return _native_aes_gcm_decrypt_and_verify(data, key, tag, nonce)
 
 
 def aes_cbc_encrypt_bytes(data, key, iv, **kwargs):
-    return bytes(aes_cbc_encrypt(*map(list, (data, key, iv)), **kwargs))
+    return _native_aes_cbc_encrypt(data, key, iv, **kwargs)
 
 
 BLOCK_SIZE_BYTES = 16
@@ -531,6 +533,192 @@ def ghash(subkey, data):
     return last_y
 
 
+# The functions above work on lists of bytes and follow the specification step by step.
+# The native implementation of the *_bytes functions below is equivalent, but processes
+# the state as 32-bit words, combining SubBytes, ShiftRows and MixColumns into lookups
+# of precomputed tables ("T-tables"), and GHASH as lookups of a per-key table
+
+
+@functools.cache
+def _t_tables():
+    def mul(a, b):
+        return 0 if a == 0 else RIJNDAEL_EXP_TABLE[(RIJNDAEL_LOG_TABLE[a] + RIJNDAEL_LOG_TABLE[b]) % 0xFF]
+
+    def rotations(table):
+        return tuple(tuple((word >> n | word << (32 - n)) & 0xFFFFFFFF for word in table) for n in (0, 8, 16, 24))
+
+    return (
+        rotations([mul(s, 2) << 24 | s << 16 | s << 8 | mul(s, 3) for s in SBOX]),
+        rotations([mul(s, 14) << 24 | mul(s, 9) << 16 | mul(s, 13) << 8 | mul(s, 11) for s in SBOX_INV]))
+
+
+@functools.lru_cache(maxsize=16)
+def _block_cipher(key):
+    """
+    Block functions for a key
+
+    @param {bytes} key   16/24/32-Byte cipher key
+    @returns             (encrypt, decrypt) functions of the four 32-bit words of a block
+    """
+    (te0, te1, te2, te3), (td0, td1, td2, td3) = _t_tables()
+    sbox, sbox_inv = SBOX, SBOX_INV
+    expanded_key = bytes(key_expansion(list(key)))
+    ek = struct.unpack(f'>{len(expanded_key) // 4}I', expanded_key)
+    rounds = len(ek) // 4 - 1
+    # Round keys of the equivalent inverse cipher (FIPS-197, 5.3.5)
+    dk = list(ek[rounds * 4:])
+    for i in range(rounds * 4 - 4, 0, -4):
+        dk.extend(
+            td0[sbox[w >> 24]] ^ td1[sbox[w >> 16 & 255]] ^ td2[sbox[w >> 8 & 255]] ^ td3[sbox[w & 255]]
+            for w in ek[i:i + 4])
+    dk.extend(ek[:4])
+    last = rounds * 4
+
+    def encrypt(s0, s1, s2, s3):
+        s0, s1, s2, s3 = s0 ^ ek[0], s1 ^ ek[1], s2 ^ ek[2], s3 ^ ek[3]
+        for i in range(4, last, 4):
+            s0, s1, s2, s3 = (
+                te0[s0 >> 24] ^ te1[s1 >> 16 & 255] ^ te2[s2 >> 8 & 255] ^ te3[s3 & 255] ^ ek[i],
+                te0[s1 >> 24] ^ te1[s2 >> 16 & 255] ^ te2[s3 >> 8 & 255] ^ te3[s0 & 255] ^ ek[i + 1],
+                te0[s2 >> 24] ^ te1[s3 >> 16 & 255] ^ te2[s0 >> 8 & 255] ^ te3[s1 & 255] ^ ek[i + 2],
+                te0[s3 >> 24] ^ te1[s0 >> 16 & 255] ^ te2[s1 >> 8 & 255] ^ te3[s2 & 255] ^ ek[i + 3])
+        return (
+            (sbox[s0 >> 24] << 24 | sbox[s1 >> 16 & 255] << 16
+             | sbox[s2 >> 8 & 255] << 8 | sbox[s3 & 255]) ^ ek[last],
+            (sbox[s1 >> 24] << 24 | sbox[s2 >> 16 & 255] << 16
+             | sbox[s3 >> 8 & 255] << 8 | sbox[s0 & 255]) ^ ek[last + 1],
+            (sbox[s2 >> 24] << 24 | sbox[s3 >> 16 & 255] << 16
+             | sbox[s0 >> 8 & 255] << 8 | sbox[s1 & 255]) ^ ek[last + 2],
+            (sbox[s3 >> 24] << 24 | sbox[s0 >> 16 & 255] << 16
+             | sbox[s1 >> 8 & 255] << 8 | sbox[s2 & 255]) ^ ek[last + 3])
+
+    def decrypt(s0, s1, s2, s3):
+        s0, s1, s2, s3 = s0 ^ dk[0], s1 ^ dk[1], s2 ^ dk[2], s3 ^ dk[3]
+        for i in range(4, last, 4):
+            s0, s1, s2, s3 = (
+                td0[s0 >> 24] ^ td1[s3 >> 16 & 255] ^ td2[s2 >> 8 & 255] ^ td3[s1 & 255] ^ dk[i],
+                td0[s1 >> 24] ^ td1[s0 >> 16 & 255] ^ td2[s3 >> 8 & 255] ^ td3[s2 & 255] ^ dk[i + 1],
+                td0[s2 >> 24] ^ td1[s1 >> 16 & 255] ^ td2[s0 >> 8 & 255] ^ td3[s3 & 255] ^ dk[i + 2],
+                td0[s3 >> 24] ^ td1[s2 >> 16 & 255] ^ td2[s1 >> 8 & 255] ^ td3[s0 & 255] ^ dk[i + 3])
+        return (
+            (sbox_inv[s0 >> 24] << 24 | sbox_inv[s3 >> 16 & 255] << 16
+             | sbox_inv[s2 >> 8 & 255] << 8 | sbox_inv[s1 & 255]) ^ dk[last],
+            (sbox_inv[s1 >> 24] << 24 | sbox_inv[s0 >> 16 & 255] << 16
+             | sbox_inv[s3 >> 8 & 255] << 8 | sbox_inv[s2 & 255]) ^ dk[last + 1],
+            (sbox_inv[s2 >> 24] << 24 | sbox_inv[s1 >> 16 & 255] << 16
+             | sbox_inv[s0 >> 8 & 255] << 8 | sbox_inv[s3 & 255]) ^ dk[last + 2],
+            (sbox_inv[s3 >> 24] << 24 | sbox_inv[s2 >> 16 & 255] << 16
+             | sbox_inv[s1 >> 8 & 255] << 8 | sbox_inv[s0 & 255]) ^ dk[last + 3])
+
+    return encrypt, decrypt
+
+
+def _to_words(data):
+    """Unpack bytes as 32-bit words, zero-padding them to whole blocks"""
+    padding = -len(data) % BLOCK_SIZE_BYTES
+    if padding:
+        data = bytes(data) + bytes(padding)
+    return struct.unpack(f'>{len(data) // 4}I', memoryview(data))
+
+
+def _from_words(words, length=None):
+    return struct.pack(f'>{len(words)}I', *words)[:length]
+
+
+def _native_aes_cbc_decrypt(data, key, iv):
+    """Same as aes_cbc_decrypt, but on bytes"""
+    decrypt = _block_cipher(bytes(key))[1]
+    words = _to_words(data)
+    p0, p1, p2, p3 = _to_words(iv)
+    decrypted = []
+    for i in range(0, len(words), 4):
+        c0, c1, c2, c3 = words[i:i + 4]
+        d0, d1, d2, d3 = decrypt(c0, c1, c2, c3)
+        decrypted += (d0 ^ p0, d1 ^ p1, d2 ^ p2, d3 ^ p3)
+        p0, p1, p2, p3 = c0, c1, c2, c3
+    return _from_words(decrypted, len(data))
+
+
+def _native_aes_cbc_encrypt(data, key, iv, *, padding_mode='pkcs7'):
+    """Same as aes_cbc_encrypt, but on bytes"""
+    encrypt = _block_cipher(bytes(key))[0]
+    remainder = len(data) % BLOCK_SIZE_BYTES
+    if remainder:
+        data = bytes(data[:-remainder]) + bytes(pad_block(list(data[-remainder:]), padding_mode))
+    words = _to_words(data)
+    c0, c1, c2, c3 = _to_words(iv)
+    encrypted = []
+    for i in range(0, len(words), 4):
+        c0, c1, c2, c3 = encrypt(c0 ^ words[i], c1 ^ words[i + 1], c2 ^ words[i + 2], c3 ^ words[i + 3])
+        encrypted += (c0, c1, c2, c3)
+    return _from_words(encrypted)
+
+
+def _native_aes_ctr(data, encrypt, counter):
+    """Encrypt/decrypt with aes in counter mode, incrementing the last 32 bits of the counter block"""
+    words = _to_words(data)
+    c0, c1, c2, c3 = counter
+    result = []
+    for i in range(0, len(words), 4):
+        k0, k1, k2, k3 = encrypt(c0, c1, c2, c3)
+        result += (words[i] ^ k0, words[i + 1] ^ k1, words[i + 2] ^ k2, words[i + 3] ^ k3)
+        c3 = (c3 + 1) & 0xFFFFFFFF
+    return _from_words(result, len(data))
+
+
+def _ghash_function(subkey):
+    """
+    GHASH with a table of the products of the subkey with every byte value at every position
+
+    @param {int} subkey   Hash subkey as a 128-bit integer
+    @returns              Function of the bytes to hash (whole blocks) that returns the hash as an integer
+    """
+    # The product of subkey and x^i, for i in 0..127 (NIST SP 800-38D, Algorithm 1)
+    powers = []
+    for _ in range(128):
+        powers.append(subkey)
+        subkey = subkey >> 1 ^ (0xE1 << 120 if subkey & 1 else 0)
+    tables = []
+    for position in range(BLOCK_SIZE_BYTES):
+        table = [0] * 256
+        for bit in range(8):
+            power = powers[position * 8 + 7 - bit]
+            for low in range(1 << bit):
+                table[1 << bit | low] = table[low] ^ power
+        tables.append(table)
+
+    def ghash(data):
+        y = 0
+        for i in range(0, len(data), BLOCK_SIZE_BYTES):
+            x = y ^ int.from_bytes(data[i:i + BLOCK_SIZE_BYTES], 'big')
+            y = 0
+            for table, byte in zip(tables, x.to_bytes(BLOCK_SIZE_BYTES, 'big')):
+                y ^= table[byte]
+        return y
+
+    return ghash
+
+
+def _native_aes_gcm_decrypt_and_verify(data, key, tag, nonce):
+    """Same as aes_gcm_decrypt_and_verify, but on bytes"""
+    encrypt = _block_cipher(bytes(key))[0]
+    ghash = _ghash_function(int.from_bytes(_from_words(encrypt(0, 0, 0, 0)), 'big'))
+
+    if len(nonce) == 12:
+        j0 = _to_words(bytes(nonce) + b'\x00\x00\x00\x01')
+    else:
+        fill = (BLOCK_SIZE_BYTES - (len(nonce) % BLOCK_SIZE_BYTES)) % BLOCK_SIZE_BYTES + 8
+        j0 = _to_words(ghash(bytes(nonce) + bytes(fill) + (8 * len(nonce)).to_bytes(8, 'big')).to_bytes(16, 'big'))
+
+    decrypted_data = _native_aes_ctr(data, encrypt, (*j0[:3], (j0[3] + 1) & 0xFFFFFFFF))
+    pad_len = -len(data) % BLOCK_SIZE_BYTES
+    s_tag = ghash(bytes(data) + bytes(pad_len) + bytes(8) + (len(data) * 8).to_bytes(8, 'big'))
+    if bytes(tag) != _native_aes_ctr(s_tag.to_bytes(16, 'big'), encrypt, j0):
+        raise ValueError('Mismatching authentication tag')
+
+    return decrypted_data
+
+
 __all__ = [
     'aes_cbc_decrypt',
     'aes_cbc_decrypt_bytes',
@@ -0,0 +1,226 @@
+import atexit
+import contextlib
+import errno
+import os
+import threading
+import time
+
+from .dependencies import sqlite3
+from .utils import YoutubeDLError, locked_file
+
+
+class DownloadArchive:
+    """Base class for the download archive backends
+
+    A download archive is a persistent set of the archive IDs (see make_archive_id)
+    of all the videos that have been downloaded.
+    Subclasses must define __contains__, add and __iter__
+    """
+
+    def __init__(self, fn, ydl=None):
+        self.fn = fn
+        self._ydl = ydl
+
+    def write_debug(self, message):
+        if self._ydl:
+            self._ydl.write_debug(message)
+
+    def __bool__(self):
+        return True
+
+    def __contains__(self, vid_id):
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def add(self, vid_id):
+        """Record the ID in the archive"""
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def __iter__(self):
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def update(self, vid_ids):
+        for vid_id in vid_ids:
+            self.add(vid_id)
+
+    def flush(self):
+        """Make sure all the recorded IDs have been written to disk"""
+
+    def close(self):
+        self.flush()
+
+    def import_text(self, fn):
+        """Add the IDs from a text archive file. Returns the number of IDs read"""
+        with locked_file(fn, 'r', encoding='utf-8') as archive_file:
+            vid_ids = list(filter(None, map(str.strip, archive_file)))
+        self.update(vid_ids)
+        self.flush()
+        return len(vid_ids)
+
+    def export_text(self, fn):
+        """Write all the IDs to a text archive file. Returns the number of IDs written"""
+        count = 0
+        with locked_file(fn, 'w', encoding='utf-8') as archive_file:
+            for vid_id in self:
+                archive_file.write(vid_id + '\n')
+                count += 1
+        return count
+
+
+class TextDownloadArchive(DownloadArchive):
+    """The archive as a text file with one ID per line
+
+    The whole file is loaded into memory and new IDs are appended to it as they are added
+    """
+
+    def __init__(self, fn, ydl=None):
+        super().__init__(fn, ydl)
+        self._ids = set()
+        self.write_debug(f'Loading archive file {fn!r}')
+        try:
+            with locked_file(fn, 'r', encoding='utf-8') as archive_file:
+                for line in archive_file:
+                    self._ids.add(line.strip())
+        except OSError as ioe:
+            if ioe.errno != errno.ENOENT:
+                raise
+
+    def __bool__(self):
+        return bool(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, vid_id):
+        return vid_id in self._ids
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def add(self, vid_id):
+        with locked_file(self.fn, 'a', encoding='utf-8') as archive_file:
+            archive_file.write(vid_id + '\n')
+        self._ids.add(vid_id)
+
+    def update(self, vid_ids):
+        vid_ids = [vid_id for vid_id in vid_ids if vid_id not in self._ids]
+        if not vid_ids:
+            return
+        with locked_file(self.fn, 'a', encoding='utf-8') as archive_file:
+            archive_file.writelines(f'{vid_id}\n' for vid_id in vid_ids)
+        self._ids.update(vid_ids)
+
+
+class SQLiteDownloadArchive(DownloadArchive):
+    """The archive as an indexed SQLite database
+
+    Nothing is loaded into memory; membership is checked against the index.
+    New IDs are written in batches, and the database can be safely
+    shared between any number of concurrent processes
+    """
+
+    # Maximum number of IDs and time (in seconds) to hold before writing them
+    BATCH_SIZE = 100
+    BATCH_INTERVAL = 5
+    # Time to wait for other processes to finish writing
+    TIMEOUT = 30
+
+    def __init__(self, fn, ydl=None):
+        if not sqlite3:
+            raise YoutubeDLError(
+                'The sqlite download archive cannot be used without sqlite3 support. '
+                'Please use a Python interpreter compiled with sqlite3 support')
+        super().__init__(fn, ydl)
+        self.write_debug(f'Opening archive database {fn!r}')
+        self._lock = threading.Lock()
+        self._pending, self._last_write = {}, time.monotonic()
+        self._conn = sqlite3.connect(fn, timeout=self.TIMEOUT, isolation_level=None, check_same_thread=False)
+        try:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        except sqlite3.Error as e:
+            # e.g. on network filesystems; the default journal is still safe
+            self.write_debug(f'Unable to use WAL journal for archive database: {e}')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS archive (id TEXT PRIMARY KEY NOT NULL)')
+        # Do not lose the pending IDs if the YoutubeDL is never closed
+        atexit.register(self.close)
+
+    @staticmethod
+    def is_database(fn):
+        with contextlib.suppress(OSError), open(fn, 'rb') as f:
+            return f.read(16) == b'SQLite format 3\x00'
+        return False
+
+    def __contains__(self, vid_id):
+        with self._lock:
+            if vid_id in self._pending:
+                return True
+            return self._conn.execute('SELECT 1 FROM archive WHERE id = ?', (vid_id, )).fetchone() is not None
+
+    def __iter__(self):
+        self.flush()
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT rowid, id FROM archive WHERE rowid > ? ORDER BY rowid LIMIT 1000', (last_rowid, )).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            for _, vid_id in rows:
+                yield vid_id
+
+    def add(self, vid_id):
+        self.update((vid_id, ))
+
+    def update(self, vid_ids):
+        with self._lock:
+            self._pending.update(dict.fromkeys(vid_ids))
+            if (len(self._pending) >= self.BATCH_SIZE
+                    or time.monotonic() - self._last_write >= self.BATCH_INTERVAL):
+                self._write_pending()
+
+    def _write_pending(self):
+        self._last_write = time.monotonic()
+        if not self._pending:
+            return
+        self.write_debug(f'Writing {len(self._pending)} IDs to archive database')
+        with self._conn:
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO archive (id) VALUES (?)', ((vid_id, ) for vid_id in self._pending))
+        self._pending.clear()
+
+    def flush(self):
+        with self._lock:
+            self._write_pending()
+
+    def close(self):
+        with self._lock:
+            if self._conn is None:
+                return
+            self._write_pending()
+            self._conn.close()
+            self._conn = None
+        atexit.unregister(self.close)
+
+
+_BACKENDS = {
+    'text': TextDownloadArchive,
+    'sqlite': SQLiteDownloadArchive,
+}
+
+
+def open_download_archive(fn, ydl=None, backend=None):
+    """Open the download archive file with the given backend
+
+    @param backend  One of the keys of _BACKENDS, or a DownloadArchive subclass.
+                    If not given, sqlite is used for existing databases and for
+                    files with a .sqlite/.sqlite3/.db extension, else text
+    """
+    if backend is None:
+        ext = os.path.splitext(fn)[1].lower()
+        backend = 'sqlite' if ext in ('.sqlite', '.sqlite3', '.db') or SQLiteDownloadArchive.is_database(fn) else 'text'
+    if isinstance(backend, str):
+        if backend not in _BACKENDS:
+            raise ValueError(f'Unknown download archive backend {backend!r}')
+        backend = _BACKENDS[backend]
+    return backend(fn, ydl)
@@ -1,18 +1,405 @@
+import atexit
+import collections
 import contextlib
 import json
 import os
 import re
 import shutil
+import threading
+import time
 import traceback
 import urllib.parse
 
-from .utils import expand_path, traverse_obj, version_tuple, write_json_file
+from .dependencies import sqlite3
+from .utils import YoutubeDLError, expand_path, format_bytes, version_tuple, write_json_file
 from .version import __version__
 
 
+class CacheBackend:
+    """Base class for the cache backends
+
+    A backend stores the entries of the cache by section and key. Each entry is the
+    JSON-serializable dict built by Cache, and its size is that of its JSON encoding.
+    When max_size (in bytes) is given, the least recently used entries are evicted to stay under it.
+    Entries are evicted down to EVICT_RATIO of max_size, so that the next entries can be stored without evicting.
+    Subclasses must define get, put, delete, usage and clear, and should define stamp and touch
+    """
+
+    EVICT_RATIO = 0.9
+
+    def __init__(self, root, ydl, max_size=None):
+        self.root, self._ydl, self.max_size = root, ydl, max_size
+        self.evictions = 0
+
+    def __str__(self):
+        return self.root
+
+    def get(self, section, key):
+        """@returns     The entry, or None if there is none"""
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def put(self, section, key, entry):
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def stamp(self, section, key):
+        """Return a value that changes whenever the entry is written, such as its modification time
+
+        Cache keeps the entries it has loaded in memory for as long as their stamp is unchanged.
+        @returns    The stamp, or None if there is no entry or it cannot be stamped
+        """
+        return None
+
+    def touch(self, section, key):
+        """Record that the entry was used without reading it, e.g. when it was kept in memory
+
+        This must not change its stamp
+        """
+
+    def delete(self, section, key):
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def usage(self):
+        """@returns     The number of entries and their total size"""
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def clear(self):
+        """Delete all the entries"""
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def close(self):
+        pass
+
+
+class DirectoryCacheBackend(CacheBackend):
+    """The cache as a directory with one JSON file per entry
+
+    Files are replaced atomically, so concurrent processes never read a partial entry.
+    The modification time and size of a file are its stamp. When max_size is set, loading
+    an entry updates its access time, which is then used to find the least recently used entries.
+    The total size is then scanned once and kept up to date with the entries written by this
+    instance; it is scanned again only to evict entries, which also counts those of other processes
+    """
+
+    def __init__(self, root, ydl, max_size=None):
+        super().__init__(root, ydl, max_size)
+        self._lock = threading.Lock()
+        self._size = None
+
+    def _get_cache_fn(self, section, key):
+        key = urllib.parse.quote(key, safe='').replace('%', ',')  # encode non-ascii characters
+        return os.path.join(self.root, section, f'{key}.json')
+
+    def get(self, section, key):
+        cache_fn = self._get_cache_fn(section, key)
+        with contextlib.suppress(OSError):
+            try:
+                with open(cache_fn, encoding='utf-8') as cachef:
+                    self._ydl.write_debug(f'Loading {section}.{key} from cache')
+                    entry = json.load(cachef)
+                self.touch(section, key)
+                return entry
+            except (ValueError, KeyError):
+                try:
+                    file_size = os.path.getsize(cache_fn)
+                except OSError as oe:
+                    file_size = str(oe)
+                self._ydl.report_warning(f'Cache retrieval from {cache_fn} failed ({file_size})')
+
+    def _file_size(self, fn):
+        try:
+            return os.path.getsize(fn)
+        except OSError:
+            return 0
+
+    def put(self, section, key, entry):
+        fn = self._get_cache_fn(section, key)
+        os.makedirs(os.path.dirname(fn), exist_ok=True)
+        old_size = self.max_size and self._file_size(fn)
+        write_json_file(entry, fn)
+        if not self.max_size:
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = self.usage()[1]
+            else:
+                self._size += self._file_size(fn) - old_size
+            if self._size > self.max_size:
+                self._evict()
+
+    def delete(self, section, key):
+        fn = self._get_cache_fn(section, key)
+        size = self._file_size(fn) if self._size is not None else 0
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(fn)
+            with self._lock:
+                if self._size is not None:
+                    self._size -= size
+
+    def stamp(self, section, key):
+        with contextlib.suppress(OSError):
+            stat = os.stat(self._get_cache_fn(section, key))
+            return stat.st_mtime_ns, stat.st_size
+
+    def touch(self, section, key):
+        if not self.max_size:
+            return
+        cache_fn = self._get_cache_fn(section, key)
+        with contextlib.suppress(OSError):
+            os.utime(cache_fn, ns=(time.time_ns(), os.stat(cache_fn).st_mtime_ns))
+
+    def _files(self):
+        with contextlib.suppress(FileNotFoundError), os.scandir(self.root) as sections:
+            for section in sections:
+                if not section.is_dir():
+                    continue
+                with os.scandir(section.path) as entries:
+                    for entry in entries:
+                        if entry.name.endswith('.json') and entry.is_file():
+                            with contextlib.suppress(FileNotFoundError):
+                                yield entry.path, entry.stat()
+
+    def _evict(self):
+        files = sorted(self._files(), key=lambda f: max(f[1].st_atime, f[1].st_mtime))
+        total = sum(stat.st_size for _, stat in files)
+        for fn, stat in files:
+            if total <= self.max_size * self.EVICT_RATIO:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(fn)
+                self.evictions += 1
+            total -= stat.st_size
+        self._size = total
+
+    def usage(self):
+        sizes = [stat.st_size for _, stat in self._files()]
+        return len(sizes), sum(sizes)
+
+    def clear(self):
+        if os.path.exists(self.root):
+            shutil.rmtree(self.root)
+        with self._lock:
+            self._size = None
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """The cache as a single SQLite database in the cache directory
+
+    Each entry is read and written in a single transaction, so the database
+    can be safely shared between any number of concurrent processes.
+    The time at which an entry was written is its stamp. When max_size is set, the total size
+    is summed once and kept up to date with the entries written by this instance; it is summed
+    again only to evict entries, which also counts those of other processes
+    """
+
+    FILENAME = 'cache.sqlite3'
+    # Time to wait for other processes to finish writing
+    TIMEOUT = 30
+
+    def __init__(self, root, ydl, max_size=None):
+        if not sqlite3:
+            raise YoutubeDLError(
+                'The sqlite cache cannot be used without sqlite3 support. '
+                'Please use a Python interpreter compiled with sqlite3 support')
+        super().__init__(root, ydl, max_size)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._size = None
+
+    def __str__(self):
+        return os.path.join(self.root, self.FILENAME)
+
+    @property
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(self.root, exist_ok=True)
+            self._ydl.write_debug(f'Opening cache database {self}')
+            self._conn = sqlite3.connect(
+                str(self), timeout=self.TIMEOUT, isolation_level=None, check_same_thread=False)
+            try:
+                self._conn.execute('PRAGMA journal_mode=WAL')
+            except sqlite3.Error as e:
+                # e.g. on network filesystems; the default journal is still safe
+                self._ydl.write_debug(f'Unable to use WAL journal for cache database: {e}')
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS cache (
+                section TEXT NOT NULL, key TEXT NOT NULL, entry TEXT NOT NULL,
+                size INTEGER NOT NULL, written REAL NOT NULL, accessed REAL NOT NULL,
+                PRIMARY KEY (section, key))''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+            # Do not leave the WAL behind if the YoutubeDL is never closed
+            atexit.register(self.close)
+        return self._conn
+
+    def get(self, section, key):
+        with self._lock:
+            row = self._db.execute(
+                'SELECT entry FROM cache WHERE section = ? AND key = ?', (section, key)).fetchone()
+            if row:
+                self._touch(section, key)
+        if row:
+            self._ydl.write_debug(f'Loading {section}.{key} from cache')
+            return json.loads(row[0])
+
+    def put(self, section, key, entry):
+        entry = json.dumps(entry, ensure_ascii=False)
+        size = len(entry.encode())
+        with self._lock, self._db:
+            self._db.execute('BEGIN IMMEDIATE')
+            if self.max_size:
+                old_size = self._db.execute(
+                    'SELECT size FROM cache WHERE section = ? AND key = ?', (section, key)).fetchone()
+            self._db.execute(
+                'INSERT OR REPLACE INTO cache (section, key, entry, size, written, accessed) VALUES (?, ?, ?, ?, ?, ?)',
+                (section, key, entry, size, time.time(), time.time()))
+            if not self.max_size:
+                return
+            if self._size is None:
+                self._size = self._db.execute('SELECT SUM(size) FROM cache').fetchone()[0]
+            else:
+                self._size += size - (old_size[0] if old_size else 0)
+            if self._size > self.max_size:
+                self._evict()
+
+    def touch(self, section, key):
+        with self._lock:
+            self._touch(section, key)
+
+    def _touch(self, section, key):
+        if self.max_size:
+            self._db.execute(
+                'UPDATE cache SET accessed = ? WHERE section = ? AND key = ?', (time.time(), section, key))
+
+    def _evict(self):
+        self._size = self._db.execute('SELECT SUM(size) FROM cache').fetchone()[0]
+        evicted = []
+        for rowid, size in self._db.execute('SELECT rowid, size FROM cache ORDER BY accessed, rowid'):
+            if self._size <= self.max_size * self.EVICT_RATIO:
+                break
+            evicted.append((rowid, ))
+            self._size -= size
+        self._db.executemany('DELETE FROM cache WHERE rowid = ?', evicted)
+        self.evictions += len(evicted)
+
+    def delete(self, section, key):
+        with self._lock, self._db:
+            self._db.execute('BEGIN IMMEDIATE')
+            row = self._db.execute(
+                'SELECT size FROM cache WHERE section = ? AND key = ?', (section, key)).fetchone()
+            self._db.execute('DELETE FROM cache WHERE section = ? AND key = ?', (section, key))
+            if row and self._size is not None:
+                self._size -= row[0]
+
+    def stamp(self, section, key):
+        with self._lock:
+            row = self._db.execute(
+                'SELECT written, size FROM cache WHERE section = ? AND key = ?', (section, key)).fetchone()
+        return row and tuple(row)
+
+    def usage(self):
+        with self._lock:
+            count, size = self._db.execute('SELECT COUNT(*), SUM(size) FROM cache').fetchone()
+        return count, size or 0
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM cache')
+            self._size = None
+
+    def close(self):
+        with self._lock:
+            if self._conn is None:
+                return
+            self._conn.close()
+            self._conn = None
+        atexit.unregister(self.close)
+
+
+class MemoryCacheBackend(CacheBackend):
+    """The cache in memory, for the lifetime of the YoutubeDL instance"""
+
+    def __init__(self, root, ydl, max_size=None):
+        super().__init__(root, ydl, max_size)
+        self._lock = threading.Lock()
+        self._entries, self._size = collections.OrderedDict(), 0
+
+    def __str__(self):
+        return 'memory'
+
+    def get(self, section, key):
+        with self._lock:
+            if (section, key) not in self._entries:
+                return None
+            self._entries.move_to_end((section, key))
+            # Copy, so that the caller cannot modify the cached entry
+            return json.loads(self._entries[section, key][0])
+
+    def put(self, section, key, entry):
+        entry = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._remove(section, key)
+            self._entries[section, key] = entry, len(entry.encode())
+            self._size += self._entries[section, key][1]
+            if not self.max_size or self._size <= self.max_size:
+                return
+            while self._size > self.max_size * self.EVICT_RATIO:
+                self._size -= self._entries.popitem(last=False)[1][1]
+                self.evictions += 1
+
+    def _remove(self, section, key):
+        if (section, key) in self._entries:
+            self._size -= self._entries.pop((section, key))[1]
+
+    def delete(self, section, key):
+        with self._lock:
+            self._remove(section, key)
+
+    def usage(self):
+        return len(self._entries), self._size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+_BACKENDS = {
+    'dir': DirectoryCacheBackend,
+    'sqlite': SQLiteCacheBackend,
+    'memory': MemoryCacheBackend,
+}
+
+
+def _copy(data):
+    """Copy JSON data, faster than copy.deepcopy"""
+    if isinstance(data, dict):
+        return {key: _copy(value) if isinstance(value, (dict, list)) else value for key, value in data.items()}
+    elif isinstance(data, list):
+        return [_copy(value) if isinstance(value, (dict, list)) else value for value in data]
+    return data
+
+
 class Cache:
+    """The persistent cache, in sections of JSON-serializable data by key
+
+    Loaded entries are also kept in memory, in front of the backend. They are used for as long as
+    the stamp of the entry in the backend does not change, and until invalidate is called
+    """
+
+    # Maximum number of entries to keep in memory
+    MEMORY_SIZE = 1000
+
     def __init__(self, ydl):
         self._ydl = ydl
+        self._backend = None
+        self._stats = collections.Counter()
+        self._lock = threading.Lock()
+        self._memory = collections.OrderedDict()
+        self.generation = 0
+
+    def invalidate(self):
+        """Forget the entries kept in memory"""
+        with self._lock:
+            self._memory.clear()
+            self.generation += 1
 
     def _get_root_dir(self):
         res = self._ydl.params.get('cachedir')
@@ -21,32 +408,47 @@ def _get_root_dir(self):
             res = os.path.join(cache_root, 'yt-dlp')
         return expand_path(res)
 
-    def _get_cache_fn(self, section, key, dtype):
-        assert re.match(r'^[\w.-]+$', section), f'invalid section {section!r}'
-        key = urllib.parse.quote(key, safe='').replace('%', ',')  # encode non-ascii characters
-        return os.path.join(self._get_root_dir(), section, f'{key}.{dtype}')
+    @property
+    def backend(self):
+        if self._backend is None:
+            backend = self._ydl.params.get('cache_backend') or 'dir'
+            if isinstance(backend, str):
+                if backend not in _BACKENDS:
+                    raise ValueError(f'Unknown cache backend {backend!r}')
+                backend = _BACKENDS[backend]
+            self._backend = backend(self._get_root_dir(), self._ydl, self._ydl.params.get('cache_max_size'))
+        return self._backend
 
     @property
     def enabled(self):
         return self._ydl.params.get('cachedir') is not False
 
-    def store(self, section, key, data, dtype='json'):
+    def store(self, section, key, data, dtype='json', *, ttl=None):
+        """Store the JSON-serializable data
+
+        @param ttl  Number of seconds after which the entry expires
+        """
         assert dtype in ('json',)
+        assert re.match(r'^[\w.-]+$', section), f'invalid section {section!r}'
 
         if not self.enabled:
             return
 
-        fn = self._get_cache_fn(section, key, dtype)
+        entry = {'yt-dlp_version': __version__, 'data': data}
+        if ttl is not None:
+            entry['expires'] = time.time() + ttl
+        with self._lock:
+            self._memory.pop((section, key), None)
         try:
-            os.makedirs(os.path.dirname(fn), exist_ok=True)
             self._ydl.write_debug(f'Saving {section}.{key} to cache')
-            write_json_file({'yt-dlp_version': __version__, 'data': data}, fn)
+            self.backend.put(section, key, entry)
+            self._stats['stores'] += 1
         except Exception:
             tb = traceback.format_exc()
-            self._ydl.report_warning(f'Writing cache to {fn!r} failed: {tb}')
+            self._ydl.report_warning(f'Writing {section}.{key} to cache {self.backend} failed: {tb}')
 
     def _validate(self, data, min_ver):
-        version = traverse_obj(data, 'yt-dlp_version')
+        version = data.get('yt-dlp_version') if isinstance(data, dict) else None
         if not version:  # Backward compatibility
             data, version = {'data': data}, '2022.08.19'
         if not min_ver or version_tuple(version) >= version_tuple(min_ver):
@@ -55,30 +457,96 @@ def _validate(self, data, min_ver):
 
     def load(self, section, key, dtype='json', default=None, *, min_ver=None):
         assert dtype in ('json',)
+        assert re.match(r'^[\w.-]+$', section), f'invalid section {section!r}'
 
         if not self.enabled:
             return default
 
-        cache_fn = self._get_cache_fn(section, key, dtype)
-        with contextlib.suppress(OSError):
-            try:
-                with open(cache_fn, encoding='utf-8') as cachef:
-                    self._ydl.write_debug(f'Loading {section}.{key} from cache')
-                    return self._validate(json.load(cachef), min_ver)
-            except (ValueError, KeyError):
-                try:
-                    file_size = os.path.getsize(cache_fn)
-                except OSError as oe:
-                    file_size = str(oe)
-                self._ydl.report_warning(f'Cache retrieval from {cache_fn} failed ({file_size})')
+        try:
+            entry = self._get(section, key)
+        except Exception:
+            tb = traceback.format_exc()
+            self._ydl.report_warning(f'Reading {section}.{key} from cache {self.backend} failed: {tb}')
+            entry = None
 
-        return default
+        if entry is None:
+            self._stats['misses'] += 1
+            return default
+        elif isinstance(entry, dict) and entry.get('expires') and entry['expires'] <= time.time():
+            self._ydl.write_debug(f'Discarding expired cache of {section}.{key}')
+            self._stats['expired'] += 1
+            self._discard(section, key)
+            return default
+
+        try:
+            # The caller may modify the data, but not the entry kept in memory
+            data = _copy(self._validate(entry, min_ver))
+        except (ValueError, KeyError):
+            self._ydl.report_warning(f'Discarding invalid cache of {section}.{key} from cache {self.backend}')
+            self._stats['misses'] += 1
+            self._discard(section, key)
+            return default
+        self._stats['hits' if data is not None else 'misses'] += 1
+        return default if data is None else data
+
+    def _discard(self, section, key):
+        with self._lock:
+            self._memory.pop((section, key), None)
+        with contextlib.suppress(Exception):
+            self.backend.delete(section, key)
+
+    def _get(self, section, key):
+        # Stamp before reading, so that a concurrent write can only make the stamp outdated
+        stamp = self.backend.stamp(section, key)
+        if stamp is None:
+            return self.backend.get(section, key)
+        stamp = (self.generation, stamp)
+        with self._lock:
+            cached = self._memory.get((section, key))
+            hit = cached is not None and cached[0] == stamp
+            if hit:
+                self._memory.move_to_end((section, key))
+                self._stats['memory hits'] += 1
+        if hit:
+            # The backend evicts the least recently used entries
+            self.backend.touch(section, key)
+            return cached[1]
+        entry = self.backend.get(section, key)
+        if entry is not None:
+            with self._lock:
+                self._memory[section, key] = stamp, entry
+                self._memory.move_to_end((section, key))
+                while len(self._memory) > self.MEMORY_SIZE:
+                    self._memory.popitem(last=False)
+        return entry
+
+    def report_stats(self):
+        if not self.enabled:
+            self._ydl.to_screen('[cache] Cache is disabled')
+            return
+        count, size = self.backend.usage()
+        self._ydl.to_screen(
+            f'[cache] {count} entries ({format_bytes(size)}) in {self.backend}; '
+            f'{self._stats["hits"]} hits ({self._stats["memory hits"]} in memory), '
+            f'{self._stats["misses"]} misses, {self._stats["expired"]} expired, '
+            f'{self._stats["stores"]} stores, {self.backend.evictions} evictions')
+
+    def close(self):
+        if self._backend is not None:
+            self._backend.close()
 
     def remove(self):
+        self.invalidate()
         if not self.enabled:
             self._ydl.to_screen('Cache is disabled (Did you combine --no-cache-dir and --rm-cache-dir?)')
             return
 
+        if isinstance(self.backend, MemoryCacheBackend):
+            self._ydl.to_screen('Removing all entries from memory cache')
+            self.backend.clear()
+            return
+
+        self.close()
         cachedir = self._get_root_dir()
         if not any((term in cachedir) for term in ('cache', 'tmp')):
             raise Exception(f'Not removing directory {cachedir} - this does not look like a cache dir')
@@ -73,6 +73,9 @@ class FileDownloader:
     http_chunk_size:    Size of a chunk for chunk-based HTTP downloading. May be
                         useful for bypassing bandwidth throttling imposed by
                         a webserver (experimental)
+    http_connections:   Number of connections to download a single HTTP file with
+    hedge_percentile:   Duplicate the requests that are slower than this percentile
+                        of the recent latencies of the download
     progress_template:  See YoutubeDL.py
     retry_sleep_functions: See YoutubeDL.py
 
@@ -80,6 +83,8 @@ class FileDownloader:
     """
 
     _TEST_FILE_SIZE = 10241
+    # Whether the section_start and section_end of the info dict are honored
+    SUPPORTS_SECTIONS = False
     params = None
 
     def __init__(self, ydl, params):
@@ -292,19 +297,34 @@ def report_destination(self, filename):
         self.to_screen('[download] Destination: ' + filename)
 
     def _prepare_multiline_status(self, lines=1):
+        # When several videos are downloaded concurrently, they share a single printer
+        shared, self._progress_line = self.ydl._concurrent_progress_line()
+        if shared is None or self.params.get('noprogress'):
+            self._progress_line = None
+            self._multiline = self._make_multiline_printer(lines)
+            return
+        with shared.lock:
+            if shared.printer is None:
+                shared.printer = self._make_multiline_printer(shared.lines)
+        self._multiline = shared.printer
+
+    def _make_multiline_printer(self, lines):
         if self.params.get('noprogress'):
-            self._multiline = QuietMultilinePrinter()
+            multiline = QuietMultilinePrinter()
         elif self.ydl.params.get('logger'):
-            self._multiline = MultilineLogger(self.ydl.params['logger'], lines)
+            multiline = MultilineLogger(self.ydl.params['logger'], lines)
         elif self.params.get('progress_with_newline'):
-            self._multiline = BreaklineStatusPrinter(self.ydl._out_files.out, lines)
+            multiline = BreaklineStatusPrinter(self.ydl._out_files.out, lines)
         else:
-            self._multiline = MultilinePrinter(self.ydl._out_files.out, lines, not self.params.get('quiet'))
-        self._multiline.allow_colors = self.ydl._allow_colors.out and self.ydl._allow_colors.out != 'no_color'
-        self._multiline._HAVE_FULLCAP = self.ydl._allow_colors.out
+            multiline = MultilinePrinter(self.ydl._out_files.out, lines, not self.params.get('quiet'))
+        multiline.allow_colors = self.ydl._allow_colors.out and self.ydl._allow_colors.out != 'no_color'
+        multiline._HAVE_FULLCAP = self.ydl._allow_colors.out
+        return multiline
 
     def _finish_multiline_status(self):
-        self._multiline.end()
+        # A shared printer is ended by YoutubeDL once all the workers have finished
+        if self._progress_line is None:
+            self._multiline.end()
 
     ProgressStyles = Namespace(
         downloaded_bytes='light blue',
@@ -331,7 +351,7 @@ def _report_progress_status(self, s, default_template):
         progress_template = self.params.get('progress_template', {})
         self._multiline.print_at_line(self.ydl.evaluate_outtmpl(
             progress_template.get('download') or '[download] %(progress._default_template)s',
-            progress_dict), s.get('progress_idx') or 0)
+            progress_dict), (s.get('progress_idx') or 0) if self._progress_line is None else self._progress_line)
         self.to_console_title(self.ydl.evaluate_outtmpl(
             progress_template.get('download-title') or 'yt-dlp %(progress._default_template)s',
             progress_dict), _ProgressState.from_dict(s), s.get('_percent'))
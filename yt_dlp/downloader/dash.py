@@ -1,9 +1,12 @@
+import functools
 import time
 import urllib.parse
 
 from . import get_suitable_downloader
 from .fragment import FragmentFD
-from ..utils import update_url_query, urljoin
+from ..compat import compat_etree_fromstring
+from ..networking.exceptions import network_exceptions
+from ..utils import RetryManager, base_url, parse_duration, update_url_query, urljoin
 
 
 class DashSegmentsFD(FragmentFD):
@@ -13,21 +16,42 @@ class DashSegmentsFD(FragmentFD):
     """
 
     FD_NAME = 'dashsegments'
+    SUPPORTS_SECTIONS = True
 
     def real_download(self, filename, info_dict):
         if 'http_dash_segments_generator' in info_dict['protocol'].split('+'):
             real_downloader = None  # No external FD can support --live-from-start
+        elif info_dict.get('is_live'):
+            real_downloader = None  # The fragments are only known as the manifest is refreshed
         else:
-            if info_dict.get('is_live'):
-                self.report_error('Live DASH videos are not supported')
             real_downloader = get_suitable_downloader(
                 info_dict, self.params, None, protocol='dash_frag_urls', to_stdout=(filename == '-'))
 
         real_start = time.time()
 
         requested_formats = [{**info_dict, **fmt} for fmt in info_dict.get('requested_formats', [])]
-        args = []
+        if real_downloader and any(fragment.get('byte_range') for fmt in requested_formats or [info_dict]
+                                   for fragment in fmt['fragments']):
+            real_downloader = None  # The byte ranges cannot be passed to the external FD
+        formats, sections = [], []
         for fmt in requested_formats or [info_dict]:
+            if fmt.get('is_live') and not callable(fmt['fragments']):
+                if fmt.get('manifest_url'):
+                    fmt = {**fmt, 'fragments': functools.partial(self._live_fragments, fmt)}
+                else:
+                    self.report_warning(
+                        'The live stream manifest cannot be refreshed since its URL is unknown; '
+                        'only the fragments that are currently in it will be downloaded')
+            elif (fmt.get('section_start') or fmt.get('section_end')) and not callable(fmt['fragments']):
+                fragments, section_offset = self._select_section_fragments(fmt['fragments'], fmt)
+                if fragments is None:
+                    return self._download_section_with_ffmpeg(filename, info_dict)
+                fmt = {**fmt, 'fragments': fragments}
+                sections.append((fmt.get('filepath') or filename, fmt, section_offset))
+            formats.append(fmt)
+
+        args = []
+        for fmt in formats:
             try:
                 fragment_count = 1 if self.params.get('test') else len(fmt['fragments'])
             except TypeError:
@@ -56,11 +80,15 @@ def real_download(self, filename, info_dict):
                     f'[{self.FD_NAME}] Fragment downloads will be delegated to {real_downloader.get_basename()}')
                 info_dict['fragments'] = list(fragments_to_download)
                 fd = real_downloader(self.ydl, self.params)
-                return fd.real_download(filename, info_dict)
+                if not fd.real_download(filename, info_dict):
+                    return False
+                return not sections or self._trim_section(filename, *sections[0][1:])
 
             args.append([ctx, fragments_to_download, fmt])
 
-        return self.download_and_append_fragments_multiple(*args, is_fatal=lambda idx: idx == 0)
+        if not self.download_and_append_fragments_multiple(*args, is_fatal=lambda idx: idx == 0):
+            return False
+        return all(self._trim_section(*section) for section in sections)
 
     def _resolve_fragments(self, fragments, ctx):
         fragments = fragments(ctx) if callable(fragments) else fragments
@@ -87,4 +115,83 @@ def _get_fragments(self, fmt, ctx, extra_query):
                 'fragment_count': fragment.get('fragment_count'),
                 'index': i,
                 'url': fragment_url,
+                'byte_range': fragment.get('byte_range'),
             }
+
+    def _live_fragments(self, fmt, ctx):
+        """Yields the fragments of a live stream, refreshing the dynamic MPD manifest
+
+        The fragments of the matching representation in each period are compared
+        by their URL and byte range, which are unique with both $Number$ and $Time$
+        templates and with the byte ranges of a SegmentList.
+        The recording starts 3 segments from the live edge and stops when
+        the manifest becomes static or is no longer updated
+        """
+        ie = self.ydl.get_info_extractor('Generic')
+        mpd_url = fmt['manifest_url']
+        seen = None
+        last_update = time.monotonic()
+        while True:
+            load_time = time.monotonic()
+            for retry in RetryManager(self.params.get('retries'), self.report_retry, fatal=False):
+                try:
+                    urlh = self.ydl.urlopen(self._prepare_url(fmt, mpd_url))
+                    mpd_doc = compat_etree_fromstring(urlh.read())
+                except network_exceptions as err:
+                    retry.error = err
+            if retry.error:
+                self.report_warning(
+                    f'Unable to refresh the live stream manifest: {retry.error}; stopping the recording')
+                return
+            mpd_url = urlh.url
+
+            fragments = []
+            for period in ie._parse_mpd_periods(mpd_doc, mpd_base_url=base_url(mpd_url), mpd_url=mpd_url):
+                period_fmt = self._match_dash_format(fmt, period['formats'])
+                if period_fmt is None:
+                    self.report_warning(f'Unable to find the format in period {period["id"]} of the manifest')
+                    continue
+                fragments.extend({
+                    'url': fragment.get('url') or urljoin(period_fmt['fragment_base_url'], fragment['path']),
+                    'byte_range': fragment.get('byte_range'),
+                    'duration': fragment.get('duration'),
+                } for fragment in period_fmt.get('fragments') or [])
+
+            def key(fragment):
+                byte_range = fragment['byte_range'] or {}
+                return fragment['url'], byte_range.get('start'), byte_range.get('end')
+
+            new_fragments = [fragment for fragment in fragments if key(fragment) not in (seen or ())]
+            if seen is None:
+                # The initialization segments, which have no duration, are always needed
+                live_edge = [key(fragment) for fragment in fragments if fragment['duration']][-3:]
+                new_fragments = [
+                    fragment for fragment in fragments if not fragment['duration'] or key(fragment) in live_edge]
+            for fragment in new_fragments:
+                yield {'url': fragment['url'], 'byte_range': fragment['byte_range']}
+            seen = set(map(key, fragments))
+
+            if mpd_doc.get('type') != 'dynamic':
+                return
+            segment_duration = next(
+                (fragment['duration'] for fragment in reversed(fragments) if fragment['duration']), None)
+            update_period = parse_duration(mpd_doc.get('minimumUpdatePeriod')) or segment_duration or 2
+            now = time.monotonic()
+            if new_fragments:
+                last_update = now
+            elif now - last_update > 6 * max(update_period, segment_duration or 0):
+                self.report_warning('The live stream manifest has not been updated; stopping the recording')
+                return
+            else:
+                update_period = min(update_period, segment_duration or update_period) / 2
+            time.sleep(max(0, load_time + update_period - now))
+
+    @staticmethod
+    def _match_dash_format(fmt, formats):
+        """Returns the representation that is the same as the format, or else the closest in bitrate of its type"""
+        same_type = [
+            f for f in formats if f.get('fragments') is not None
+            and all((f.get(key) == 'none') == (fmt.get(key) == 'none') for key in ('vcodec', 'acodec'))]
+        same = [f for f in same_type if all(f.get(key) == fmt.get(key) for key in (
+            'ext', 'vcodec', 'acodec', 'width', 'height', 'fps', 'asr', 'language'))]
+        return min(same or same_type, key=lambda f: abs((f.get('tbr') or 0) - (fmt.get('tbr') or 0)), default=None)
@@ -454,6 +454,7 @@ def _make_cmd(self, tmpfilename, info_dict):
 class FFmpegFD(ExternalFD):
     SUPPORTED_PROTOCOLS = ('http', 'https', 'ftp', 'ftps', 'm3u8', 'm3u8_native', 'rtsp', 'rtmp', 'rtmp_ffmpeg', 'mms', 'http_dash_segments')
     SUPPORTED_FEATURES = (Features.TO_STDOUT, Features.MULTIPLE_FORMATS)
+    SUPPORTS_SECTIONS = True
 
     @classmethod
     def available(cls, path=None):
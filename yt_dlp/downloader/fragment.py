@@ -1,19 +1,23 @@
 import concurrent.futures
 import contextlib
+import io
 import json
 import math
 import os
 import struct
+import threading
 import time
 
 from .common import FileDownloader
-from .http import HttpFD
+from .http import CancelEvent, HttpFD, LatencyHedger, _HedgeCancelled
 from ..aes import aes_cbc_decrypt_bytes, unpad_pkcs7
 from ..networking import Request
 from ..networking.exceptions import HTTPError, IncompleteRead
-from ..utils import DownloadError, RetryManager, traverse_obj
+from ..postprocessor.ffmpeg import FFmpegPostProcessor, FFmpegPostProcessorError
+from ..utils import DownloadError, RetryManager, format_bytes, prepend_extension, traverse_obj
 from ..utils.networking import HTTPHeaderDict
 from ..utils.progress import ProgressCalculator
+from ..utils.tracing import traced
 
 
 class HttpQuietDownloader(HttpFD):
@@ -23,6 +27,175 @@ def to_screen(self, *args, **kargs):
     to_console_title = to_screen
 
 
+class HttpMemoryDownloader(HttpQuietDownloader):
+    """Downloads fragments into memory buffers instead of temporary files
+
+    The memory is reserved against memory_limit as the data arrives, and is held
+    until the fragment is released, so that the fragments being downloaded and
+    those waiting to be appended never take more than memory_limit bytes.
+    A fragment that would exceed the limit continues to be downloaded to a file
+    """
+
+    def __init__(self, ydl, params, memory_limit):
+        # The buffer is written to like stdout: there is no file to resume from, and retries resume from the buffer
+        super().__init__(ydl, {**params, 'continuedl': False, 'xattr_set_filesize': False})
+        self.memory_limit = memory_limit
+        self._memory_used = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def download_to_memory(self, info_dict, filename):
+        """Download to a buffer, or to filename once the memory limit is reached
+
+        Returns (content, None) with len(content) bytes reserved, (None, filename) or (None, None) on failure
+        """
+        buffer = self._local.buffer = _FragmentBuffer(self, filename)
+        success = False
+        try:
+            success, _ = self.download('-', info_dict)
+            return buffer.finish() if success else (None, None)
+        finally:
+            del self._local.buffer
+            if not success:
+                buffer.discard()
+
+    def sanitize_open(self, filename, open_mode):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            return super().sanitize_open(filename, open_mode)
+        if open_mode == 'wb':
+            buffer.truncate()
+        return buffer, filename
+
+    def reserve_memory(self, size):
+        """Account size bytes against the limit. Returns False if it would be exceeded"""
+        with self._lock:
+            if self._memory_used + size > self.memory_limit:
+                return False
+            self._memory_used += size
+            return True
+
+    def release_memory(self, size):
+        with self._lock:
+            self._memory_used -= size
+
+
+class _FragmentBuffer:
+    """The stream of a fragment downloaded by HttpMemoryDownloader
+
+    Each block is reserved before it is buffered. Once the limit is reached, the
+    buffered data and the rest of the fragment are written to the .part file of filename
+    """
+
+    def __init__(self, dl, filename):
+        self._dl, self._filename = dl, filename
+        self._buffer, self._reserved = io.BytesIO(), 0
+        self._file = self._tmpfilename = None
+
+    def write(self, data):
+        if self._file is None:
+            if self._dl.reserve_memory(len(data)):
+                self._reserved += len(data)
+                return self._buffer.write(data)
+            self._dl.write_debug(f'Fragment memory limit reached; writing {self._filename} to disk')
+            self._file, self._tmpfilename = FileDownloader.sanitize_open(
+                self._dl, self._dl.temp_name(self._filename), 'wb')
+            self._file.write(self._buffer.getvalue())
+            self._release()
+        return self._file.write(data)
+
+    def _release(self):
+        self._dl.release_memory(self._reserved)
+        self._buffer, self._reserved = io.BytesIO(), 0
+
+    def truncate(self):
+        self._release()
+        if self._file is not None:
+            self._file.seek(0)
+            self._file.truncate()
+
+    def finish(self):
+        if self._file is None:
+            return self._buffer.getvalue(), None
+        self._file.close()
+        self._dl.try_rename(self._tmpfilename, self._dl.undo_temp_name(self._tmpfilename))
+        return None, self._dl.undo_temp_name(self._tmpfilename)
+
+    def discard(self):
+        self._release()
+        if self._file is not None:
+            self._file.close()
+            self._dl.try_remove(self._tmpfilename)
+
+
+class AdaptiveConcurrency:
+    """Adapts the number of concurrent fragment downloads between 1 and max_workers
+
+    The limit is adjusted after each window of as many completed fragments as the
+    current limit (additive increase, multiplicative decrease): it is increased by one
+    if the throughput of the window did not drop, and decreased by one otherwise.
+    A failed fragment (e.g. HTTP 429) halves the limit and holds it for a window
+    """
+
+    def __init__(self, max_workers, log=None):
+        self.max_workers = max_workers
+        self.limit = 1
+        self._log = log
+        self._active = 0
+        self._throughput = None
+        self._cond = threading.Condition()
+        self._start_window()
+
+    def _start_window(self, errors=0):
+        self._window_start = time.monotonic()
+        self._window_bytes = self._window_fragments = self._window_latency = 0
+        self._window_errors = errors
+
+    def _set_limit(self, limit, reason):
+        if limit != self.limit and self._log:
+            self._log(f'Fragment concurrency {self.limit} -> {limit} ({reason})')
+        self.limit = limit
+        self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Context manager that waits until there are less than limit active fragment downloads"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify()
+
+    def fragment_done(self, size, latency):
+        with self._cond:
+            self._window_bytes += size
+            self._window_latency += latency
+            self._window_fragments += 1
+            if self._window_fragments < self.limit:
+                return
+            throughput = self._window_bytes / max(time.monotonic() - self._window_start, 1e-6)
+            reason = (f'{format_bytes(throughput)}/s, '
+                      f'{self._window_latency / self._window_fragments * 1000:.0f}ms per fragment')
+            # A window with errors has already lowered the limit in fragment_failed
+            if not self._window_errors:
+                if self._throughput is None or throughput >= self._throughput * 0.95:
+                    self._set_limit(min(self.limit + 1, self.max_workers), reason)
+                else:
+                    self._set_limit(max(self.limit - 1, 1), reason)
+            self._throughput = throughput
+            self._start_window()
+
+    def fragment_failed(self):
+        with self._cond:
+            if not self._window_errors:
+                self._set_limit(max(self.limit // 2, 1), 'fragment failed')
+                self._start_window(errors=1)
+
+
 class FragmentFD(FileDownloader):
     """
     A base file downloader class for fragmented media (e.g. f4m/m3u8 manifests).
@@ -36,6 +209,15 @@ class FragmentFD(FileDownloader):
     keep_fragments:     Keep downloaded fragments on disk after downloading is
                         finished
     concurrent_fragment_downloads:  The number of threads to use for native hls and dash downloads
+    adaptive_fragment_concurrency:  Adapt the number of concurrent fragment downloads between
+                        1 and concurrent_fragment_downloads to the throughput and errors
+    fragment_memory_limit:  Download fragments into memory, holding at most this many
+                        bytes of them at once. Fragments over the limit and all
+                        fragments when keep_fragments is set are written to disk
+    fragment_coalesce_size:  Merge the fragments that are adjacent byte ranges of the
+                        same URL into requests of up to this many bytes
+    hedge_percentile:   Download a fragment a second time when it is slower than this
+                        percentile of the recent fragments (with concurrent downloads)
     _no_ytdl_file:      Don't use .ytdl file
 
     For each incomplete fragment download yt-dlp keeps on disk a special
@@ -109,19 +291,30 @@ def _write_ytdl_file(self, ctx):
             frag_index_stream.close()
 
     def _download_fragment(self, ctx, frag_url, info_dict, headers=None, request_data=None):
-        fragment_filename = '%s-Frag%d' % (ctx['tmpfilename'], ctx['fragment_index'])
+        attempt = ctx.get('attempt') or {}
+        fragment_filename = '%s-Frag%d%s' % (
+            ctx['tmpfilename'], ctx['fragment_index'], '-hedge' if attempt.get('hedge') else '')
         fragment_info_dict = {
             'url': frag_url,
             'http_headers': headers or info_dict.get('http_headers'),
             'request_data': request_data,
             'ctx_id': ctx.get('ctx_id'),
+            'coalesced_fragments': ctx.get('coalesced_fragments'),
+            'hedge_cancel': attempt.get('cancel'),
         }
         frag_resume_len = 0
-        if ctx['dl'].params.get('continuedl', True):
+        if self.params.get('continuedl', True):
             frag_resume_len = self.filesize_or_none(self.temp_name(fragment_filename))
         fragment_info_dict['frag_resume_len'] = ctx['frag_resume_len'] = frag_resume_len
 
-        success, _ = ctx['dl'].download(fragment_filename, fragment_info_dict)
+        if isinstance(ctx['dl'], HttpMemoryDownloader) and not frag_resume_len:
+            return self._download_fragment_to_memory(ctx, fragment_filename, fragment_info_dict)
+
+        try:
+            success, _ = ctx['dl'].download(fragment_filename, fragment_info_dict)
+        except _HedgeCancelled:
+            self.try_remove(self.temp_name(fragment_filename))
+            raise
         if not success:
             return False
         if fragment_info_dict.get('filetime'):
@@ -129,7 +322,21 @@ def _download_fragment(self, ctx, frag_url, info_dict, headers=None, request_dat
         ctx['fragment_filename_sanitized'] = fragment_filename
         return True
 
+    def _download_fragment_to_memory(self, ctx, fragment_filename, fragment_info_dict):
+        frag_content, frag_filename = ctx['dl'].download_to_memory(fragment_info_dict, fragment_filename)
+        if frag_content is not None:
+            ctx['fragment_content'] = frag_content
+        elif frag_filename:
+            ctx['fragment_filename_sanitized'] = frag_filename
+        else:
+            return False
+        return True
+
     def _read_fragment(self, ctx):
+        frag_content = ctx.pop('fragment_content', None)
+        if frag_content is not None:
+            ctx['dl'].release_memory(len(frag_content))
+            return frag_content
         if not ctx.get('fragment_filename_sanitized'):
             return None
         try:
@@ -143,6 +350,14 @@ def _read_fragment(self, ctx):
         down.close()
         return frag_content
 
+    def _discard_fragment(self, ctx, result):
+        """Release the content of a fragment download whose result is not used"""
+        _, _, frag_filename, frag_content = result
+        if frag_content is not None:
+            ctx['dl'].release_memory(len(frag_content))
+        elif frag_filename:
+            self.try_remove(frag_filename)
+
     def _append_fragment(self, ctx, frag_content):
         try:
             ctx['dest_stream'].write(frag_content)
@@ -150,9 +365,9 @@ def _append_fragment(self, ctx, frag_content):
         finally:
             if self.__do_ytdl_file(ctx):
                 self._write_ytdl_file(ctx)
-            if not self.params.get('keep_fragments', False):
-                self.try_remove(ctx['fragment_filename_sanitized'])
-            del ctx['fragment_filename_sanitized']
+            frag_filename = ctx.pop('fragment_filename_sanitized', None)
+            if frag_filename and not self.params.get('keep_fragments', False):
+                self.try_remove(frag_filename)
 
     def _prepare_frag_download(self, ctx):
         if not ctx.setdefault('live', False):
@@ -164,14 +379,20 @@ def _prepare_frag_download(self, ctx):
             total_frags_str = 'unknown (live)'
         self.to_screen(f'[{self.FD_NAME}] Total fragments: {total_frags_str}')
         self.report_destination(ctx['filename'])
-        dl = HttpQuietDownloader(self.ydl, {
+        dl_params = {
             **self.params,
             'noprogress': True,
             'test': False,
             'sleep_interval': 0,
             'max_sleep_interval': 0,
             'sleep_interval_subtitles': 0,
-        })
+            'http_connections': 1,
+        }
+        memory_limit = self.params.get('fragment_memory_limit')
+        if memory_limit and not self.params.get('keep_fragments', False):
+            dl = HttpMemoryDownloader(self.ydl, dl_params, memory_limit)
+        else:
+            dl = HttpQuietDownloader(self.ydl, dl_params)
         tmpfilename = self.temp_name(ctx['filename'])
         open_mode = 'wb'
 
@@ -240,6 +461,9 @@ def _start_frag_download(self, ctx, info_dict):
         progress = ProgressCalculator(resume_len)
 
         def frag_progress_hook(s):
+            hedge_cancel = s['info_dict'].get('hedge_cancel')
+            if hedge_cancel and hedge_cancel.is_set():
+                raise _HedgeCancelled
             if s['status'] not in ('downloading', 'finished'):
                 return
 
@@ -251,6 +475,10 @@ def frag_progress_hook(s):
 
             state['max_progress'] = ctx.get('max_progress')
             state['progress_idx'] = ctx.get('progress_idx')
+            if ctx.get('concurrency'):
+                state['fragment_concurrency'] = ctx['concurrency'].limit
+            if ctx.get('hedger'):
+                state['hedged_requests'] = ctx['hedger'].hedged
 
             state['elapsed'] = progress.elapsed
             frag_total_bytes = s.get('total_bytes') or 0
@@ -268,7 +496,7 @@ def frag_progress_hook(s):
                 progress.update(s.get('downloaded_bytes'))
 
             if s['status'] == 'finished':
-                state['fragment_index'] += 1
+                state['fragment_index'] += s['fragment_info_dict'].get('coalesced_fragments') or 1
                 ctx['fragment_index'] = state['fragment_index']
                 progress.thread_reset()
 
@@ -280,6 +508,13 @@ def frag_progress_hook(s):
 
         ctx['dl'].add_progress_hook(frag_progress_hook)
 
+        def report_fragments_buffered(count):
+            if state.get('fragments_buffered') != count:
+                state['fragments_buffered'] = count
+                self._hook_progress(state, info_dict)
+
+        ctx['report_fragments_buffered'] = report_fragments_buffered
+
         return ctx['started']
 
     def _finish_frag_download(self, ctx, info_dict):
@@ -287,6 +522,9 @@ def _finish_frag_download(self, ctx, info_dict):
         if self.__do_ytdl_file(ctx):
             self.try_remove(self.ytdl_filename(ctx['filename']))
         elapsed = time.time() - ctx['started']
+        if ctx.get('hedger') and ctx['hedger'].hedged:
+            self.to_screen(f'[{self.FD_NAME}] Hedged {ctx["hedger"].hedged} slow fragment downloads, '
+                           f'{ctx["hedger"].won} of which completed first')
 
         to_file = ctx['tmpfilename'] != '-'
         if to_file:
@@ -338,13 +576,86 @@ def _prepare_external_frag_download(self, ctx):
             'fragment_index': 0,
         })
 
+    @staticmethod
+    def _select_section_fragments(fragments, info_dict):
+        """Selects the fragments that overlap the section_start and section_end of the info dict
+
+        The initialization fragments are kept for the selected fragments that follow them.
+        They are those marked with is_map, and those without a duration key that either come
+        first or precede a fragment with a duration, such as the initialization of a DASH period
+
+        @returns (fragments, time at which the first selected fragment starts),
+                 or (None, None) if the duration of a fragment is unknown
+        """
+        start, end = info_dict.get('section_start') or 0, info_dict.get('section_end') or math.inf
+        selected, init_fragment, offset, elapsed = [], None, None, 0
+        for i, fragment in enumerate(fragments):
+            if fragment.get('is_map') or ('duration' not in fragment and (
+                    i == 0 or (i + 1 < len(fragments) and 'duration' in fragments[i + 1]))):
+                if offset is None:
+                    init_fragment = fragment
+                elif elapsed < end:
+                    selected.append(fragment)
+                continue
+            if fragment.get('duration') is None:
+                return None, None
+            if elapsed < end and elapsed + fragment['duration'] > start:
+                if offset is None:
+                    offset = elapsed
+                    if init_fragment:
+                        selected.append(init_fragment)
+                selected.append(fragment)
+            elapsed += fragment['duration']
+        return selected, offset or 0
+
+    def _download_section_with_ffmpeg(self, filename, info_dict):
+        """Downloads the section with ffmpeg, when the fragments of the section cannot be selected"""
+        from .external import FFmpegFD
+
+        if not FFmpegFD.can_download(info_dict):
+            self.report_error('The section cannot be downloaded since the fragment durations are unknown')
+            return False
+        fd = FFmpegFD(self.ydl, self.params)
+        self.report_warning(
+            f'The fragment durations are unknown; the section download will be delegated to {fd.get_basename()}')
+        return fd.real_download(filename, info_dict)
+
+    def _trim_section(self, filename, info_dict, offset):
+        """Cuts the downloaded fragments to the section, if ffmpeg is available
+
+        @param offset   Time at which the first downloaded fragment starts
+        """
+        start, end = info_dict.get('section_start') or 0, info_dict.get('section_end')
+        if filename == '-' or (start <= offset and not end):
+            return True
+        ffpp = FFmpegPostProcessor(downloader=self)
+        if not ffpp.available:
+            self.report_warning('ffmpeg is not installed; the section will be cut at the fragment boundaries')
+            return True
+        args = ['-ss', str(start - offset)] if start > offset else []
+        if end:
+            args += ['-t', str(end - max(start, offset))]
+        temp_filename = prepend_extension(filename, 'temp')
+        self.to_screen(f'[{self.FD_NAME}] Cutting the section from the downloaded fragments')
+        try:
+            ffpp.real_run_ffmpeg([(filename, args)], [(temp_filename, [
+                '-map', '0', *([] if self.params.get('force_keyframes_at_cuts') else ['-c', 'copy'])])])
+        except FFmpegPostProcessorError as err:
+            self.report_error(f'Unable to cut the section: {err}')
+            return False
+        os.replace(temp_filename, filename)
+        return True
+
     def decrypter(self, info_dict):
         _key_cache = {}
+        _key_lock = threading.Lock()
 
         def _get_key(url):
-            if url not in _key_cache:
-                _key_cache[url] = self.ydl.urlopen(self._prepare_url(info_dict, url)).read()
-            return _key_cache[url]
+            # Fragments are decrypted by the workers, which must not all fetch the key
+            with _key_lock:
+                if url not in _key_cache:
+                    _key_cache[url] = self.ydl.urlopen(self._prepare_url(info_dict, url)).read()
+                return _key_cache[url]
 
         def decrypt_fragment(fragment, frag_content):
             if frag_content is None:
@@ -364,6 +675,144 @@ def decrypt_fragment(fragment, frag_content):
 
         return decrypt_fragment
 
+    # Largest gap between two byte ranges that is downloaded to merge them
+    _COALESCE_MAX_GAP = 64 * 1024
+
+    @classmethod
+    def _coalesce_fragments(cls, fragments, max_size):
+        """Merge the fragments that are adjacent byte ranges of the same URL into larger requests
+
+        The merged fragments span at most max_size bytes. Small gaps between the ranges are
+        downloaded and discarded. The original fragments are kept in the 'coalesced' list
+        """
+        group = []
+
+        def merged():
+            if len(group) == 1:
+                return group[0]
+            return {
+                **group[0],
+                'byte_range': {'start': group[0]['byte_range']['start'], 'end': group[-1]['byte_range']['end']},
+                'coalesced': group,
+            }
+
+        for fragment in fragments:
+            byte_range = fragment.get('byte_range')
+            if group and byte_range and fragment['url'] == group[-1]['url']:
+                last_end = group[-1]['byte_range']['end']
+                if (0 <= byte_range['start'] - last_end <= cls._COALESCE_MAX_GAP
+                        and byte_range['end'] - group[0]['byte_range']['start'] <= max_size):
+                    group.append(fragment)
+                    continue
+            if group:
+                yield merged()
+                group = []
+            if byte_range:
+                group.append(fragment)
+            else:
+                yield fragment
+        if group:
+            yield merged()
+
+    @staticmethod
+    def _split_coalesced_fragment(fragment, frag_content):
+        """Yields the original fragments with their part of the content of a merged fragment"""
+        if 'coalesced' not in fragment:
+            yield fragment, frag_content
+            return
+        base = fragment['byte_range']['start']
+        for sub in fragment['coalesced']:
+            yield sub, frag_content and frag_content[sub['byte_range']['start'] - base:sub['byte_range']['end'] - base]
+
+    # How many fragments per worker may be downloaded ahead of the first incomplete one
+    _REORDER_WINDOW_FACTOR = 4
+
+    def _map_fragments_in_order(self, ctx, pool, func, fragments, window, hedge_pool=None):
+        """Like pool.map, but with at most window fragments submitted ahead of the first incomplete one
+
+        The workers keep downloading while a slow fragment is pending, and the results are
+        yielded as soon as the earlier ones are done. The number of completed fragments
+        waiting for an earlier one is reported to the progress hooks as fragments_buffered
+
+        func is called with the fragment and a dict that describes the attempt to download it.
+        With ctx['hedger'], a fragment that is slower than its threshold is downloaded a second
+        time with hedge_pool. The first download to complete is used, and the other is cancelled
+        """
+        fragments = iter(fragments)
+        pending, completed, attempts = {}, {}, {}
+        next_idx = submitted = 0
+        exhausted = False
+        hedger = ctx.get('hedger') if hedge_pool else None
+
+        def submit(executor, idx, fragment, hedge=False):
+            attempt = {'cancel': CancelEvent(), 'start': None, 'hedge': hedge}
+            attempts.setdefault(idx, []).append(attempt)
+            pending[executor.submit(func, fragment, attempt)] = idx, fragment, attempt
+
+        def discard(future):
+            if not future.cancelled() and not future.exception():
+                self._discard_fragment(ctx, future.result())
+
+        def collect(done):
+            for future in done:
+                if future not in pending:
+                    continue
+                idx, _, attempt = pending.pop(future)
+                if attempt['hedge'] and (future.exception() or not any(future.result()[2:])):
+                    # A failed hedge leaves the fragment to the original download
+                    continue
+                completed[idx] = future.result()
+                if attempt['hedge']:
+                    hedger.won += 1
+                # The other download of the fragment is cancelled, even if it is stalled waiting for data
+                for other_future, (other_idx, _, other) in list(pending.items()):
+                    if other_idx == idx:
+                        other['cancel'].set()
+                        del pending[other_future]
+                        other_future.add_done_callback(discard)
+                attempts.pop(idx, None)
+            ctx['report_fragments_buffered'](len(completed) - (next_idx in completed))
+
+        def hedge_slow_fragments(threshold):
+            now = time.monotonic()
+            for idx, fragment, attempt in list(pending.values()):
+                if (not attempt['hedge'] and attempt['start'] is not None
+                        and len(attempts[idx]) == 1 and now - attempt['start'] > threshold):
+                    hedger.hedged += 1
+                    submit(hedge_pool, idx, fragment, hedge=True)
+
+        try:
+            while True:
+                # The completed fragments are yielded before getting the next one,
+                # since the fragments of a live stream are only known as it advances
+                collect([future for future in pending if future.done()])
+                if next_idx in completed:
+                    result = completed.pop(next_idx)
+                    next_idx += 1
+                    ctx['report_fragments_buffered'](len(completed))
+                    yield result
+                    continue
+                if not exhausted and submitted - next_idx < window:
+                    fragment = next(fragments, None)
+                    if fragment is not None:
+                        submit(pool, submitted, fragment)
+                        submitted += 1
+                        continue
+                    exhausted = True
+                if not pending:
+                    return
+                threshold = hedger and hedger.threshold
+                if threshold is not None:
+                    hedge_slow_fragments(threshold)
+                done, _ = concurrent.futures.wait(
+                    pending, timeout=None if threshold is None else max(threshold / 4, 0.01),
+                    return_when=concurrent.futures.FIRST_COMPLETED)
+                collect(done)
+        finally:
+            for future, (_, _, attempt) in pending.items():
+                future.cancel()
+                attempt['cancel'].set()
+
     def download_and_append_fragments_multiple(self, *args, **kwargs):
         """
         @params (ctx1, fragments1, info_dict1), (ctx2, fragments2, info_dict2), ...
@@ -436,11 +885,13 @@ def download_and_append_fragments(
         if not self.params.get('skip_unavailable_fragments', True):
             is_fatal = lambda _: True
 
+        @traced('download', 'download_fragment', args=lambda fragment, ctx: {'frag_index': fragment['frag_index']})
         def download_fragment(fragment, ctx):
             if not interrupt_trigger[0]:
                 return
 
             frag_index = ctx['fragment_index'] = fragment['frag_index']
+            ctx['coalesced_fragments'] = len(fragment.get('coalesced') or ()) or 1
             ctx['last_error'] = None
             headers = HTTPHeaderDict(info_dict.get('http_headers'))
             byte_range = fragment.get('byte_range')
@@ -453,6 +904,8 @@ def download_fragment(fragment, ctx):
             def error_callback(err, count, retries):
                 if fatal and count > retries:
                     ctx['dest_stream'].close()
+                if ctx.get('concurrency'):
+                    ctx['concurrency'].fragment_failed()
                 self.report_retry(err, count, retries, frag_index, fatal)
                 ctx['last_error'] = err
 
@@ -480,39 +933,112 @@ def append_fragment(frag_content, frag_index, ctx):
                 return False
             return True
 
+        def append_fragments(fragment, frag_content, ctx, decrypt):
+            for sub, sub_content in self._split_coalesced_fragment(fragment, frag_content):
+                ctx['fragment_index'] = sub['frag_index']
+                if not append_fragment(
+                        decrypt_fragment(sub, sub_content) if decrypt else sub_content, sub['frag_index'], ctx):
+                    return False
+            return True
+
         decrypt_fragment = self.decrypter(info_dict)
+        coalesce_size = self.params.get('fragment_coalesce_size')
+        if coalesce_size and not ctx['live']:
+            fragments = self._coalesce_fragments(fragments, coalesce_size)
 
         max_workers = math.ceil(
             self.params.get('concurrent_fragment_downloads', 1) / ctx.get('max_progress', 1))
+        if max_workers > 1 and self.params.get('adaptive_fragment_concurrency'):
+            ctx['concurrency'] = AdaptiveConcurrency(
+                max_workers, lambda msg: self.write_debug(f'[{self.FD_NAME}] {msg}'))
+        hedge_percentile = self.params.get('hedge_percentile')
+        if max_workers > 1 and hedge_percentile:
+            ctx['hedger'] = LatencyHedger(hedge_percentile)
         if max_workers > 1:
-            def _download_fragment(fragment):
-                ctx_copy = ctx.copy()
-                download_fragment(fragment, ctx_copy)
-                return fragment, fragment['frag_index'], ctx_copy.get('fragment_filename_sanitized')
+            def decrypted_by_worker(fragment, frag_content):
+                # The coalesced fragments are decrypted when split, and kept fragment files stay encrypted
+                return ('coalesced' not in fragment
+                        and traverse_obj(fragment, ('decrypt_info', 'METHOD')) == 'AES-128'
+                        and (frag_content is not None or not self.params.get('keep_fragments', False)))
 
+            def _download_fragment(fragment, attempt):
+                ctx_copy = ctx.copy()
+                ctx_copy['attempt'] = attempt
+                try:
+                    if not ctx.get('concurrency') or attempt['hedge']:
+                        attempt['start'] = time.monotonic()
+                        download_fragment(fragment, ctx_copy)
+                    else:
+                        with ctx['concurrency'].slot():
+                            start = attempt['start'] = time.monotonic()
+                            download_fragment(fragment, ctx_copy)
+                            frag_content = ctx_copy.get('fragment_content')
+                            if frag_content is None and ctx_copy.get('fragment_filename_sanitized'):
+                                frag_size = self.filesize_or_none(ctx_copy['fragment_filename_sanitized'])
+                            else:
+                                frag_size = len(frag_content or b'')
+                            ctx['concurrency'].fragment_done(frag_size, time.monotonic() - start)
+                except _HedgeCancelled:
+                    return fragment, fragment['frag_index'], None, None
+                if ctx.get('hedger') and (
+                        ctx_copy.get('fragment_content') is not None or ctx_copy.get('fragment_filename_sanitized')):
+                    ctx['hedger'].record(time.monotonic() - attempt['start'])
+                frag_content = ctx_copy.get('fragment_content')
+                frag_filename = ctx_copy.get('fragment_filename_sanitized')
+                if not decrypted_by_worker(fragment, frag_content):
+                    return fragment, fragment['frag_index'], frag_filename, frag_content
+                if frag_content is not None:
+                    # Decrypt in the workers, so that it overlaps with the other downloads. The plaintext
+                    # takes over the memory reserved for the encrypted content, which is only larger by the padding
+                    decrypted = decrypt_fragment(fragment, frag_content)
+                    ctx['dl'].release_memory(len(frag_content) - len(decrypted))
+                    ctx_copy['fragment_content'] = decrypted
+                elif frag_filename:
+                    # The plaintext is written to another file, since a complete fragment file
+                    # is reused as is when the download is resumed
+                    with open(frag_filename, 'rb') as f:
+                        decrypted = decrypt_fragment(fragment, f.read())
+                    dest, ctx_copy['fragment_filename_sanitized'] = self.sanitize_open(
+                        f'{frag_filename}-decrypted', 'wb')
+                    with dest:
+                        dest.write(decrypted)
+                    self.try_remove(frag_filename)
+                return (fragment, fragment['frag_index'], ctx_copy.get('fragment_filename_sanitized'),
+                        ctx_copy.get('fragment_content'))
+
+            hedge_pool = ctx.get('hedger') and concurrent.futures.ThreadPoolExecutor(max_workers)
             with tpe or concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
                 try:
-                    for fragment, frag_index, frag_filename in pool.map(_download_fragment, fragments):
+                    for fragment, frag_index, frag_filename, frag_content in self._map_fragments_in_order(
+                            ctx, pool, _download_fragment, fragments, max_workers * self._REORDER_WINDOW_FACTOR,
+                            hedge_pool):
                         ctx.update({
                             'fragment_filename_sanitized': frag_filename,
+                            'fragment_content': frag_content,
                             'fragment_index': frag_index,
                         })
-                        if not append_fragment(decrypt_fragment(fragment, self._read_fragment(ctx)), frag_index, ctx):
+                        if not append_fragments(fragment, self._read_fragment(ctx), ctx,
+                                                decrypt=not decrypted_by_worker(fragment, frag_content)):
                             return False
                 except KeyboardInterrupt:
                     self._finish_multiline_status()
-                    self.report_error(
-                        'Interrupted by user. Waiting for all threads to shutdown...', is_error=False, tb=False)
-                    pool.shutdown(wait=False)
-                    raise
+                    if info_dict.get('is_live'):
+                        pool.shutdown(wait=False, cancel_futures=True)
+                    else:
+                        self.report_error(
+                            'Interrupted by user. Waiting for all threads to shutdown...', is_error=False, tb=False)
+                        pool.shutdown(wait=False)
+                        raise
+                finally:
+                    if hedge_pool:
+                        hedge_pool.shutdown(wait=False, cancel_futures=True)
         else:
             for fragment in fragments:
                 if not interrupt_trigger[0]:
                     break
                 try:
                     download_fragment(fragment, ctx)
-                    result = append_fragment(
-                        decrypt_fragment(fragment, self._read_fragment(ctx)), fragment['frag_index'], ctx)
+                    result = append_fragments(fragment, self._read_fragment(ctx), ctx, decrypt=True)
                 except KeyboardInterrupt:
                     if info_dict.get('is_live'):
                         break
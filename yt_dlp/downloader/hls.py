@@ -1,6 +1,7 @@
 import binascii
 import io
 import re
+import time
 import urllib.parse
 
 from . import get_suitable_downloader
@@ -8,8 +9,11 @@
 from .fragment import FragmentFD
 from .. import webvtt
 from ..dependencies import Cryptodome
+from ..networking.exceptions import network_exceptions
 from ..utils import (
+    RetryManager,
     bug_reports_message,
+    float_or_none,
     parse_m3u8_attributes,
     remove_start,
     traverse_obj,
@@ -27,6 +31,7 @@ class HlsFD(FragmentFD):
     """
 
     FD_NAME = 'hlsnative'
+    SUPPORTS_SECTIONS = True
 
     @staticmethod
     def _has_drm(manifest):  # TODO: https://github.com/yt-dlp/yt-dlp/pull/5039
@@ -64,7 +69,6 @@ def can_download(cls, manifest, info_dict, allow_unplayable_formats=False):
             ]
 
         def check_results():
-            yield not info_dict.get('is_live')
             for feature in UNSUPPORTED_FEATURES:
                 yield not re.search(feature, manifest)
             if not allow_unplayable_formats:
@@ -99,11 +103,14 @@ def real_download(self, filename, info_dict):
                 can_download, message = False, 'The stream has AES-128 encryption and pycryptodomex is not available'
             elif no_crypto:
                 message = ('The stream has AES-128 encryption and neither ffmpeg nor pycryptodomex are available; '
-                           'Decryption will be performed natively, but will be extremely slow')
-            elif info_dict.get('extractor_key') == 'Generic' and re.search(r'(?m)#EXT-X-MEDIA-SEQUENCE:(?!0$)', s):
+                           'Decryption will be performed natively, but will be slower')
+            elif (info_dict.get('extractor_key') == 'Generic' and not info_dict.get('is_live')
+                    and re.search(r'(?m)#EXT-X-MEDIA-SEQUENCE:(?!0$)', s)):
+                # Live streams are only recorded natively when they are known to be live
                 install_ffmpeg = '' if has_ffmpeg else 'install ffmpeg and '
-                message = ('Live HLS streams are not supported by the native downloader. If this is a livestream, '
-                           f'please {install_ffmpeg}add "--downloader ffmpeg --hls-use-mpegts" to your command')
+                message = ('If this is a livestream, only the fragments that are currently in the playlist '
+                           f'will be downloaded; please {install_ffmpeg}add "--downloader ffmpeg --hls-use-mpegts" '
+                           'to your command')
         if not can_download:
             if self._has_drm(s) and not self.params.get('allow_unplayable_formats'):
                 if info_dict.get('has_drm') and self.params.get('test'):
@@ -120,9 +127,11 @@ def real_download(self, filename, info_dict):
         elif message:
             self.report_warning(message)
 
+        is_live = bool(info_dict.get('is_live'))
         is_webvtt = info_dict['ext'] == 'vtt'
-        if is_webvtt:
-            real_downloader = None  # Packing the fragments is not currently supported for external downloader
+        if is_webvtt or is_live:
+            # Packing the fragments and live streams are not currently supported for external downloader
+            real_downloader = None
         else:
             real_downloader = get_suitable_downloader(
                 info_dict, self.params, None, protocol='m3u8_frag_urls', to_stdout=(filename == '-'))
@@ -139,8 +148,6 @@ def is_ad_fragment_end(s):
             return ((s.startswith('#ANVATO-SEGMENT-INFO') and 'type=master' in s)
                     or (s.startswith('#UPLYNK-SEGMENT') and s.endswith(',segment')))
 
-        fragments = []
-
         media_frags = 0
         ad_frags = 0
         ad_frag_next = False
@@ -159,29 +166,13 @@ def is_ad_fragment_end(s):
                 continue
             media_frags += 1
 
-        ctx = {
-            'filename': filename,
-            'total_frags': media_frags,
-            'ad_frags': ad_frags,
-        }
-
-        if real_downloader:
-            self._prepare_external_frag_download(ctx)
-        else:
-            self._prepare_and_start_frag_download(ctx, info_dict)
-
-        extra_state = ctx.setdefault('extra_state', {})
-
-        format_index = info_dict.get('format_index')
+        format_index = None if is_live else info_dict.get('format_index')
         extra_segment_query = None
         if extra_param_to_segment_url := info_dict.get('extra_param_to_segment_url'):
             extra_segment_query = urllib.parse.parse_qs(extra_param_to_segment_url)
         extra_key_query = None
         if extra_param_to_key_url := info_dict.get('extra_param_to_key_url'):
             extra_key_query = urllib.parse.parse_qs(extra_param_to_key_url)
-        i = 0
-        media_sequence = 0
-        decrypt_info = {'METHOD': 'NONE'}
         external_aes_key = traverse_obj(info_dict, ('hls_aes', 'key'))
         if external_aes_key:
             external_aes_key = binascii.unhexlify(remove_start(external_aes_key, '0x'))
@@ -189,111 +180,222 @@ def is_ad_fragment_end(s):
         external_aes_iv = traverse_obj(info_dict, ('hls_aes', 'iv'))
         if external_aes_iv:
             external_aes_iv = binascii.unhexlify(remove_start(external_aes_iv, '0x').zfill(32))
-        byte_range = {}
-        byte_range_offset = 0
-        discontinuity_count = 0
-        frag_index = 0
-        ad_frag_next = False
-        for line in s.splitlines():
-            line = line.strip()
-            if line:
-                if not line.startswith('#'):
-                    if format_index and discontinuity_count != format_index:
-                        continue
-                    if ad_frag_next:
-                        continue
-                    frag_index += 1
-                    if frag_index <= ctx['fragment_index']:
-                        continue
-                    frag_url = urljoin(man_url, line)
-                    if extra_segment_query:
-                        frag_url = update_url_query(frag_url, extra_segment_query)
-
-                    fragments.append({
-                        'frag_index': frag_index,
-                        'url': frag_url,
-                        'decrypt_info': decrypt_info,
-                        'byte_range': byte_range,
-                        'media_sequence': media_sequence,
-                    })
-                    media_sequence += 1
-
-                    # If the byte_range is truthy, reset it after appending a fragment that uses it
-                    if byte_range:
-                        byte_range_offset = byte_range['end']
-                        byte_range = {}
-
-                elif line.startswith('#EXT-X-MAP'):
-                    if format_index and discontinuity_count != format_index:
-                        continue
-                    if frag_index > 0:
-                        self.report_error(
-                            'Initialization fragment found after media fragments, unable to download')
-                        return False
-                    frag_index += 1
-                    map_info = parse_m3u8_attributes(line[11:])
-                    frag_url = urljoin(man_url, map_info.get('URI'))
-                    if extra_segment_query:
-                        frag_url = update_url_query(frag_url, extra_segment_query)
 
-                    map_byte_range = {}
-
-                    if map_info.get('BYTERANGE'):
-                        splitted_byte_range = map_info.get('BYTERANGE').split('@')
-                        sub_range_start = int(splitted_byte_range[1]) if len(splitted_byte_range) == 2 else 0
-                        map_byte_range = {
+        def parse_fragments(s):
+            """Returns the fragments of the media playlist, or None on error
+
+            The initialization fragments are marked with is_map. For live streams, as
+            mandated by the specification, they do not take a media sequence number.
+            Since the playlist is a sliding window, they may follow media fragments.
+            The partial segments of Low-Latency HLS are listed in the parts of each fragment,
+            and those of the segment that is still being produced in a final fragment
+            marked with is_pending, along with the preload_hint of the next part
+            """
+            fragments = []
+            i = 0
+            media_sequence = 0
+            decrypt_info = {'METHOD': 'NONE'}
+            byte_range = {}
+            byte_range_offset = 0
+            discontinuity_count = 0
+            frag_index = 0
+            ad_frag_next = False
+            duration = None
+            parts = []
+            part_byte_range_offset = 0
+            preload_hint = None
+            for line in s.splitlines():
+                line = line.strip()
+                if line:
+                    if not line.startswith('#'):
+                        segment_parts, parts = parts, []
+                        segment_duration, duration = duration, None
+                        if format_index and discontinuity_count != format_index:
+                            continue
+                        if ad_frag_next:
+                            continue
+                        frag_index += 1
+                        frag_url = urljoin(man_url, line)
+                        if extra_segment_query:
+                            frag_url = update_url_query(frag_url, extra_segment_query)
+
+                        fragments.append({
+                            'frag_index': frag_index,
+                            'url': frag_url,
+                            'decrypt_info': decrypt_info,
+                            'byte_range': byte_range,
+                            'media_sequence': media_sequence,
+                            'duration': segment_duration,
+                        })
+                        if is_live:
+                            fragments[-1]['parts'] = segment_parts
+                        media_sequence += 1
+
+                        # If the byte_range is truthy, reset it after appending a fragment that uses it
+                        if byte_range:
+                            byte_range_offset = byte_range['end']
+                            byte_range = {}
+
+                    elif line.startswith('#EXT-X-MAP'):
+                        if format_index and discontinuity_count != format_index:
+                            continue
+                        if frag_index > 0 and not is_live:
+                            self.report_error(
+                                'Initialization fragment found after media fragments, unable to download')
+                            return None
+                        frag_index += 1
+                        map_info = parse_m3u8_attributes(line[11:])
+                        frag_url = urljoin(man_url, map_info.get('URI'))
+                        if extra_segment_query:
+                            frag_url = update_url_query(frag_url, extra_segment_query)
+
+                        map_byte_range = {}
+
+                        if map_info.get('BYTERANGE'):
+                            splitted_byte_range = map_info.get('BYTERANGE').split('@')
+                            sub_range_start = int(splitted_byte_range[1]) if len(splitted_byte_range) == 2 else 0
+                            map_byte_range = {
+                                'start': sub_range_start,
+                                'end': sub_range_start + int(splitted_byte_range[0]),
+                            }
+
+                        fragments.append({
+                            'frag_index': frag_index,
+                            'url': frag_url,
+                            'decrypt_info': decrypt_info,
+                            'byte_range': map_byte_range,
+                            'media_sequence': media_sequence,
+                            'is_map': True,
+                        })
+                        if not is_live:
+                            media_sequence += 1
+
+                    elif line.startswith('#EXT-X-KEY'):
+                        decrypt_url = decrypt_info.get('URI')
+                        decrypt_info = parse_m3u8_attributes(line[11:])
+                        if decrypt_info['METHOD'] == 'AES-128':
+                            if external_aes_iv:
+                                decrypt_info['IV'] = external_aes_iv
+                            elif 'IV' in decrypt_info:
+                                decrypt_info['IV'] = binascii.unhexlify(decrypt_info['IV'][2:].zfill(32))
+                            if external_aes_key:
+                                decrypt_info['KEY'] = external_aes_key
+                            else:
+                                decrypt_info['URI'] = urljoin(man_url, decrypt_info['URI'])
+                                if extra_key_query or extra_segment_query:
+                                    # Fall back to extra_segment_query to key for backwards compat
+                                    decrypt_info['URI'] = update_url_query(
+                                        decrypt_info['URI'], extra_key_query or extra_segment_query)
+                                if decrypt_url != decrypt_info['URI']:
+                                    decrypt_info['KEY'] = None
+
+                    elif line.startswith('#EXT-X-MEDIA-SEQUENCE'):
+                        media_sequence = int(line[22:])
+                    elif line.startswith('#EXTINF:'):
+                        duration = float_or_none(line[8:].split(',')[0])
+                    elif line.startswith('#EXT-X-SKIP'):
+                        # The segments skipped by a playlist delta update are not listed
+                        media_sequence += int(parse_m3u8_attributes(line[12:])['SKIPPED-SEGMENTS'])
+                    elif is_live and line.startswith('#EXT-X-PART:'):
+                        part_info = parse_m3u8_attributes(line[12:])
+                        part_byte_range = {}
+                        if part_info.get('BYTERANGE'):
+                            splitted_byte_range = part_info['BYTERANGE'].split('@')
+                            sub_range_start = (
+                                int(splitted_byte_range[1]) if len(splitted_byte_range) == 2
+                                else part_byte_range_offset)
+                            part_byte_range = {
+                                'start': sub_range_start,
+                                'end': sub_range_start + int(splitted_byte_range[0]),
+                            }
+                            part_byte_range_offset = part_byte_range['end']
+                        frag_url = urljoin(man_url, part_info['URI'])
+                        if extra_segment_query:
+                            frag_url = update_url_query(frag_url, extra_segment_query)
+                        parts.append({
+                            'url': frag_url,
+                            'decrypt_info': decrypt_info,
+                            'byte_range': part_byte_range,
+                            'media_sequence': media_sequence,
+                        })
+                    elif is_live and line.startswith('#EXT-X-PRELOAD-HINT:'):
+                        hint_info = parse_m3u8_attributes(line[20:])
+                        # The hinted parts of unknown length are not supported
+                        if hint_info.get('TYPE') != 'PART' or (
+                                'BYTERANGE-START' in hint_info and 'BYTERANGE-LENGTH' not in hint_info):
+                            continue
+                        frag_url = urljoin(man_url, hint_info['URI'])
+                        if extra_segment_query:
+                            frag_url = update_url_query(frag_url, extra_segment_query)
+                        hint_start = int(hint_info.get('BYTERANGE-START', 0))
+                        preload_hint = {
+                            'url': frag_url,
+                            'decrypt_info': decrypt_info,
+                            'byte_range': {
+                                'start': hint_start,
+                                'end': hint_start + int(hint_info['BYTERANGE-LENGTH']),
+                            } if 'BYTERANGE-LENGTH' in hint_info else {},
+                            'media_sequence': media_sequence,
+                        }
+                    elif line.startswith('#EXT-X-BYTERANGE'):
+                        splitted_byte_range = line[17:].split('@')
+                        sub_range_start = (
+                            int(splitted_byte_range[1]) if len(splitted_byte_range) == 2 else byte_range_offset)
+                        byte_range = {
                             'start': sub_range_start,
                             'end': sub_range_start + int(splitted_byte_range[0]),
                         }
+                    elif is_ad_fragment_start(line):
+                        ad_frag_next = True
+                    elif is_ad_fragment_end(line):
+                        ad_frag_next = False
+                    elif line.startswith('#EXT-X-DISCONTINUITY'):
+                        discontinuity_count += 1
+                    i += 1
+            if parts or preload_hint:
+                fragments.append({
+                    'media_sequence': media_sequence,
+                    'parts': parts,
+                    'preload_hint': preload_hint,
+                    'is_pending': True,
+                })
+            return fragments
+
+        section_offset = None
+        if is_live:
+            fragments = self._live_fragments(s, man_url, info_dict, parse_fragments)
+        else:
+            fragments = parse_fragments(s)
+            if fragments is None:
+                return False
+            if info_dict.get('section_start') or info_dict.get('section_end'):
+                fragments, section_offset = self._select_section_fragments(fragments, info_dict)
+                if fragments is None:
+                    return self._download_section_with_ffmpeg(filename, info_dict)
+                for frag_index, fragment in enumerate(fragments, 1):
+                    fragment['frag_index'] = frag_index
+                media_frags = sum('duration' in fragment for fragment in fragments)
 
-                    fragments.append({
-                        'frag_index': frag_index,
-                        'url': frag_url,
-                        'decrypt_info': decrypt_info,
-                        'byte_range': map_byte_range,
-                        'media_sequence': media_sequence,
-                    })
-                    media_sequence += 1
-
-                elif line.startswith('#EXT-X-KEY'):
-                    decrypt_url = decrypt_info.get('URI')
-                    decrypt_info = parse_m3u8_attributes(line[11:])
-                    if decrypt_info['METHOD'] == 'AES-128':
-                        if external_aes_iv:
-                            decrypt_info['IV'] = external_aes_iv
-                        elif 'IV' in decrypt_info:
-                            decrypt_info['IV'] = binascii.unhexlify(decrypt_info['IV'][2:].zfill(32))
-                        if external_aes_key:
-                            decrypt_info['KEY'] = external_aes_key
-                        else:
-                            decrypt_info['URI'] = urljoin(man_url, decrypt_info['URI'])
-                            if extra_key_query or extra_segment_query:
-                                # Fall back to extra_segment_query to key for backwards compat
-                                decrypt_info['URI'] = update_url_query(
-                                    decrypt_info['URI'], extra_key_query or extra_segment_query)
-                            if decrypt_url != decrypt_info['URI']:
-                                decrypt_info['KEY'] = None
-
-                elif line.startswith('#EXT-X-MEDIA-SEQUENCE'):
-                    media_sequence = int(line[22:])
-                elif line.startswith('#EXT-X-BYTERANGE'):
-                    splitted_byte_range = line[17:].split('@')
-                    sub_range_start = int(splitted_byte_range[1]) if len(splitted_byte_range) == 2 else byte_range_offset
-                    byte_range = {
-                        'start': sub_range_start,
-                        'end': sub_range_start + int(splitted_byte_range[0]),
-                    }
-                elif is_ad_fragment_start(line):
-                    ad_frag_next = True
-                elif is_ad_fragment_end(line):
-                    ad_frag_next = False
-                elif line.startswith('#EXT-X-DISCONTINUITY'):
-                    discontinuity_count += 1
-                i += 1
+        ctx = {
+            'filename': filename,
+            'total_frags': None if is_live else media_frags,
+            'ad_frags': ad_frags,
+            'live': is_live,
+        }
+
+        if real_downloader:
+            self._prepare_external_frag_download(ctx)
+        else:
+            self._prepare_and_start_frag_download(ctx, info_dict)
+
+        extra_state = ctx.setdefault('extra_state', {})
+
+        if not is_live:
+            fragments = [fragment for fragment in fragments if fragment['frag_index'] > ctx['fragment_index']]
 
         # We only download the first fragment during the test
         if self.params.get('test', False):
-            fragments = [fragments[0] if fragments else None]
+            fragments = [next(iter(fragments), None)]
 
         if real_downloader:
             info_dict['fragments'] = fragments
@@ -301,7 +403,9 @@ def is_ad_fragment_end(s):
             # TODO: Make progress updates work without hooking twice
             # for ph in self._progress_hooks:
             #     fd.add_progress_hook(ph)
-            return fd.real_download(filename, info_dict)
+            if not fd.real_download(filename, info_dict):
+                return False
+            return section_offset is None or self._trim_section(filename, info_dict, section_offset)
 
         if is_webvtt:
             def pack_fragment(frag_content, frag_index):
@@ -393,10 +497,122 @@ def fin_fragments():
 
                 return output.getvalue().encode()
 
-            if len(fragments) == 1:
+            if not is_live and len(fragments) == 1:
                 self.download_and_append_fragments(ctx, fragments, info_dict)
             else:
                 self.download_and_append_fragments(
                     ctx, fragments, info_dict, pack_func=pack_fragment, finish_func=fin_fragments)
         else:
-            return self.download_and_append_fragments(ctx, fragments, info_dict)
+            if not self.download_and_append_fragments(ctx, fragments, info_dict):
+                return False
+            return section_offset is None or self._trim_section(filename, info_dict, section_offset)
+
+    def _live_fragments(self, s, man_url, info_dict, parse_fragments):
+        """Yields the fragments of a live stream, reloading the media playlist as it advances
+
+        The fragments are matched across reloads by their media sequence number.
+        The playlist is reloaded after a target duration when it had new fragments
+        and after half of it otherwise, as suggested by RFC 8216, section 6.3.4.
+
+        If the server supports blocking playlist reloads, the reload requests wait for
+        the next segment instead. For Low-Latency HLS, the parts of the segment that is
+        being produced and the hinted next part are downloaded as they become available,
+        and the reloads only return the playlist delta when the server can skip segments
+        """
+        frag_index = 0
+        last_sequence = None
+        last_map = None
+        # The parts that were downloaded from the segments that are not complete
+        parts_done = set()
+        encrypted = False
+        last_update = time.monotonic()
+
+        def part_key(part):
+            return part['url'], part['byte_range'].get('start'), part['byte_range'].get('end')
+
+        while True:
+            load_time = time.monotonic()
+            fragments = parse_fragments(s)
+            if fragments is None:
+                return
+            server_control = parse_m3u8_attributes(traverse_obj(
+                re.search(r'(?m)^#EXT-X-SERVER-CONTROL:(.+)$', s), 1) or '')
+            can_block = server_control.get('CAN-BLOCK-RELOAD') == 'YES'
+            # Parts of encrypted segments cannot be decrypted separately,
+            # and skipped segments could hide their key
+            encrypted = encrypted or any(
+                traverse_obj(fragment, ('decrypt_info', 'METHOD')) not in (None, 'NONE') for fragment in fragments)
+            use_parts = can_block and not encrypted and '#EXT-X-PART-INF' in s
+            media_fragments = [
+                fragment for fragment in fragments if not fragment.get('is_map') and not fragment.get('is_pending')]
+            if (last_sequence is not None and media_fragments
+                    and media_fragments[-1]['media_sequence'] < last_sequence):
+                self.report_warning('The media sequence of the live stream went back; restarting from the playlist')
+                last_sequence = None
+                parts_done.clear()
+            has_new = False
+            current_map = None
+            for fragment in fragments:
+                if fragment.get('is_map'):
+                    current_map = fragment
+                    continue
+                if last_sequence is not None and fragment['media_sequence'] <= last_sequence:
+                    continue
+                parts = fragment.get('parts') or []
+                if fragment.get('is_pending'):
+                    new_fragments = [part for part in parts if part_key(part) not in parts_done] if use_parts else []
+                    if use_parts and fragment['preload_hint'] and part_key(fragment['preload_hint']) not in parts_done:
+                        new_fragments.append(fragment['preload_hint'])
+                elif any(part_key(part) in parts_done for part in parts):
+                    # The segment was already being downloaded by parts
+                    new_fragments = [part for part in parts if part_key(part) not in parts_done]
+                else:
+                    new_fragments = [fragment]
+                for new_fragment in new_fragments:
+                    if current_map and (current_map['url'], current_map['byte_range']) != last_map:
+                        last_map = (current_map['url'], current_map['byte_range'])
+                        frag_index += 1
+                        yield {**current_map, 'frag_index': frag_index}
+                    if new_fragment is not fragment:
+                        parts_done.add(part_key(new_fragment))
+                    frag_index += 1
+                    yield {**new_fragment, 'frag_index': frag_index}
+                    has_new = True
+                if not fragment.get('is_pending'):
+                    last_sequence = fragment['media_sequence']
+                    parts_done.difference_update(map(part_key, parts))
+
+            if re.search(r'(?m)^#EXT-X-ENDLIST\s*$', s):
+                return
+            mobj = re.search(r'(?m)^#EXT-X-TARGETDURATION:\s*([\d.]+)', s)
+            target_duration = float(mobj.group(1)) if mobj else 10
+            now = time.monotonic()
+            if has_new:
+                last_update = now
+            elif now - last_update > 6 * target_duration:
+                self.report_warning('The live stream playlist has not been updated; stopping the recording')
+                return
+
+            query = {}
+            if can_block and media_fragments:
+                # Delivery directives of RFC 8216bis, section 6.2.5
+                pending = fragments[-1] if fragments[-1].get('is_pending') else None
+                query['_HLS_msn'] = media_fragments[-1]['media_sequence'] + 1
+                if use_parts:
+                    query['_HLS_part'] = len(pending['parts']) if pending else 0
+                if server_control.get('CAN-SKIP-UNTIL') and not encrypted:
+                    query['_HLS_skip'] = 'YES'
+                delay = 0 if has_new else target_duration / 2
+            else:
+                delay = target_duration if has_new else target_duration / 2
+            time.sleep(max(0, load_time + delay - now))
+
+            for retry in RetryManager(self.params.get('retries'), self.report_retry, fatal=False):
+                try:
+                    s = self.ydl.urlopen(self._prepare_url(
+                        info_dict, update_url_query(man_url, query))).read().decode('utf-8', 'ignore')
+                except network_exceptions as err:
+                    retry.error = err
+            if retry.error:
+                self.report_warning(f'Unable to reload the live stream playlist: {retry.error}; stopping the recording')
+                return
@@ -1,5 +1,12 @@
+import collections
+import concurrent.futures
+import contextlib
+import json
+import math
 import os
 import random
+import socket
+import threading
 import time
 
 from .common import FileDownloader
@@ -18,12 +25,123 @@
     int_or_none,
     parse_http_range,
     try_call,
+    write_json_file,
     write_xattr,
 )
 from ..utils.networking import HTTPHeaderDict
 
 
+class _HedgeCancelled(Exception):
+    """Raised in the download of a fragment when the other download of the fragment completed first"""
+
+
+def _abort_response(response):
+    """Close the response, also interrupting a read that is blocked waiting for data
+
+    Closing the response alone does not wake up a thread that is blocked reading from its socket
+    """
+    def find_socket(obj, depth):
+        if isinstance(obj, socket.socket):
+            return obj
+        for attr in ('fp', '_fp', 'raw', '_sock') if depth else ():
+            with contextlib.suppress(Exception):
+                child = getattr(obj, attr, None)
+                if child is not None and (sock := find_socket(child, depth - 1)):
+                    return sock
+
+    sock = find_socket(response, 8)
+    if sock:
+        with contextlib.suppress(OSError):
+            sock.shutdown(socket.SHUT_RDWR)
+    with contextlib.suppress(Exception):
+        response.close()
+
+
+class CancelEvent:
+    """An event that cancels a download when it is set
+
+    Setting it aborts the response attached by the downloader, so that a request
+    that is stalled waiting for data is cancelled immediately
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._set, self._response = False, None
+
+    def is_set(self):
+        return self._set
+
+    def set(self):
+        with self._lock:
+            self._set, response, self._response = True, self._response, None
+        if response:
+            _abort_response(response)
+
+    def attach(self, response):
+        with self._lock:
+            if not self._set:
+                self._response = response
+                return
+        _abort_response(response)
+
+
+class LatencyHedger:
+    """Decides when a slow request is duplicated ("hedged") to cut the tail latency
+
+    A request is hedged once it has been waiting for longer than the given percentile
+    of the recent latencies of the download. hedged counts the duplicate requests,
+    and won those that completed before the original request
+    """
+
+    _MIN_SAMPLES = 8
+
+    def __init__(self, percentile):
+        self.percentile = percentile
+        self.hedged = self.won = 0
+        self._latencies = collections.deque(maxlen=256)
+        self._lock = threading.Lock()
+
+    def record(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+
+    @property
+    def threshold(self):
+        """The latency over which a request is hedged, or None until enough latencies were recorded"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < self._MIN_SAMPLES:
+            return None
+        return latencies[min(int(len(latencies) * self.percentile / 100), len(latencies) - 1)]
+
+
+class _Segment:
+    """A range of the file that is downloaded by one connection at a time
+
+    The connection downloads from pos until end, which is lowered when the range is split.
+    A hedge is a second connection that downloads the same range as its partner;
+    the first one to complete the range stops the other
+    """
+
+    def __init__(self, pos, end, owned=False, partner=None):
+        self.pos, self.end, self.owned = pos, end, owned
+        self.partner, self.is_hedge = partner, partner is not None
+        self.waiting_since = self.response = None
+
+    @property
+    def remaining(self):
+        return self.end - self.pos
+
+    @property
+    def missing(self):
+        """The number of bytes of the range that neither connection has downloaded"""
+        return max(self.end - max(self.pos, self.partner.pos if self.partner else 0), 0)
+
+
 class HttpFD(FileDownloader):
+    # Ranges are not split into parts smaller than this
+    _MIN_SEGMENT_SIZE = 1024 * 1024
+
     def real_download(self, filename, info_dict):
         url = info_dict['url']
         request_data = info_dict.get('request_data', None)
@@ -62,6 +180,21 @@ class DownloadContext(dict):
 
         ctx.is_resume = ctx.resume_len > 0
 
+        connections = self.params.get('http_connections') or 1
+        # The preallocated file of an interrupted segmented download can not be resumed otherwise
+        if ((connections > 1 or (ctx.is_resume and os.path.isfile(self.ytdl_filename(filename))))
+                and filename != '-' and not is_test and req_start is None and req_end is None
+                and (info_dict.get('filesize') or math.inf) >= 2 * self._MIN_SEGMENT_SIZE):
+            result = self._download_segmented(filename, info_dict, headers, chunk_size, connections)
+            if result is not None:
+                return result
+        if ctx.is_resume and os.path.isfile(self.ytdl_filename(filename)):
+            # The file was preallocated by a segmented download, so its size is not what was downloaded
+            self.report_warning('Unable to resume the segmented download. Restarting from the beginning ...')
+            self.try_remove(ctx.tmpfilename)
+            self.try_remove(self.ytdl_filename(filename))
+            ctx.resume_len, ctx.is_resume = 0, False
+
         class SucceedDownload(Exception):
             pass
 
@@ -116,6 +249,8 @@ def establish_connection():
             # Establish connection
             try:
                 ctx.data = self.ydl.urlopen(request)
+                if info_dict.get('hedge_cancel'):
+                    info_dict['hedge_cancel'].attach(ctx.data)
                 # When trying to resume, Content-Range HTTP header of response has to be checked
                 # to match the value of requested Range HTTP header. This is due to a webservers
                 # that don't support resuming and serve a whole file with no Content-Range
@@ -235,6 +370,8 @@ def download():
 
             def retry(e):
                 close_stream()
+                if info_dict.get('hedge_cancel') and info_dict['hedge_cancel'].is_set():
+                    raise _HedgeCancelled
                 if ctx.tmpfilename == '-':
                     ctx.resume_len = byte_counter
                 else:
@@ -364,6 +501,9 @@ def retry(e):
 
         for retry in RetryManager(self.params.get('retries'), self.report_retry):
             try:
+                # The response of a cancelled download is aborted, which fails the read
+                if info_dict.get('hedge_cancel') and info_dict['hedge_cancel'].is_set():
+                    raise _HedgeCancelled
                 establish_connection()
                 return download()
             except RetryDownload as err:
@@ -379,3 +519,259 @@ def retry(e):
                 close_stream()
                 raise
         return False
+
+    def _read_segments(self, filename, total):
+        """Returns the ranges that remain to be downloaded according to the .ytdl file, or None"""
+        try:
+            with open(self.ytdl_filename(filename), encoding='utf-8') as f:
+                state = json.load(f)['downloader']
+            if state['total_bytes'] == total:
+                return [_Segment(start, end) for start, end in state['ranges']]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def _write_segments(self, filename, total, segments):
+        write_json_file({'downloader': {
+            'total_bytes': total,
+            'ranges': [[segment.end - segment.missing, segment.end] for segment in segments if segment.missing],
+        }}, self.ytdl_filename(filename))
+
+    def _download_segmented(self, filename, info_dict, headers, chunk_size, connections):
+        """Download the file over parallel connections that each fetch a range of it
+
+        The file is preallocated and each connection writes its range in place. When a connection
+        is done, it takes over half of the largest remaining range, so that the slow ranges are
+        shared with the idle connections. The remaining ranges are kept in the .ytdl file
+        to resume the download
+
+        @returns    Whether the download succeeded, or None if the server does not support ranges
+        """
+        url, request_data = info_dict['url'], info_dict.get('request_data')
+
+        def open_range(start, end):
+            return self.ydl.urlopen(Request(url, request_data, HTTPHeaderDict(headers, {
+                'Range': f'bytes={start}-{end - 1}',
+            })))
+
+        try:
+            with open_range(0, 1) as response:
+                range_start, _, total = parse_http_range(response.headers.get('Content-Range'))
+                last_modified = response.headers.get('Last-Modified')
+                content_encoding = response.headers.get('Content-Encoding')
+        except (HTTPError, TransportError) as err:
+            self.write_debug(f'Unable to request a range; downloading with a single connection: {err}')
+            return None
+        if range_start != 0 or not total or content_encoding or total < 2 * self._MIN_SEGMENT_SIZE:
+            return None
+
+        min_data_len = self.params.get('min_filesize')
+        max_data_len = self.params.get('max_filesize')
+        if min_data_len is not None and total < min_data_len:
+            self.to_screen(
+                f'\r[download] File is smaller than min-filesize ({total} bytes < {min_data_len} bytes). Aborting.')
+            return False
+        if max_data_len is not None and total > max_data_len:
+            self.to_screen(
+                f'\r[download] File is larger than max-filesize ({total} bytes > {max_data_len} bytes). Aborting.')
+            return False
+
+        tmpfilename = self.temp_name(filename)
+        segments = None
+        if self.params.get('continuedl', True) and os.path.isfile(tmpfilename):
+            if os.path.isfile(self.ytdl_filename(filename)):
+                segments = self._read_segments(filename, total)
+                if segments is None:
+                    self.report_warning('.ytdl file is corrupt. Restarting from the beginning ...')
+            else:
+                # The file was partially downloaded with a single connection
+                resume_len = os.path.getsize(tmpfilename)
+                if resume_len >= total:
+                    return None
+                segments = [_Segment(resume_len, total)]
+        if segments is None:
+            segments = [_Segment(0, total)]
+            open_mode = 'wb'
+        else:
+            open_mode = 'ab'
+        resume_len = total - sum(segment.remaining for segment in segments)
+        if resume_len:
+            self.report_resuming_byte(resume_len)
+
+        try:
+            stream, tmpfilename = self.sanitize_open(tmpfilename, open_mode)
+            with stream:
+                stream.truncate(total)
+        except OSError as err:
+            self.report_error(f'unable to open for writing: {err}')
+            return False
+        filename = self.undo_temp_name(tmpfilename)
+        self.report_destination(filename)
+        self.write_debug(f'Downloading {total} bytes with {connections} connections')
+
+        lock, stop = threading.Lock(), threading.Event()
+        state = {'saved': time.monotonic()}
+        start = time.time()
+        hedge_percentile = self.params.get('hedge_percentile')
+        hedger = LatencyHedger(hedge_percentile) if hedge_percentile else None
+
+        def split_largest():
+            largest = max(segments, key=lambda segment: segment.remaining if not segment.partner else 0)
+            if largest.remaining < 2 * self._MIN_SEGMENT_SIZE or largest.partner:
+                return None
+            split = largest.pos + largest.remaining // 2
+            segment = _Segment(split, largest.end)
+            largest.end = split
+            segments.append(segment)
+            return segment
+
+        def hedge_slowest():
+            # Once nothing is left to split, the connections that are stuck waiting for data are hedged
+            threshold = hedger and hedger.threshold
+            if threshold is None:
+                return None
+            now = time.monotonic()
+            for segment in segments:
+                if (segment.owned and segment.remaining > 0 and not segment.partner
+                        and segment.waiting_since is not None and now - segment.waiting_since > threshold):
+                    hedger.hedged += 1
+                    segment.partner = _Segment(segment.pos, segment.end, owned=True, partner=segment)
+                    return segment.partner
+            return None
+
+        def next_segment():
+            with lock:
+                segment = next((
+                    segment for segment in segments if not segment.owned and segment.remaining > 0), None)
+                segment = segment or split_largest() or hedge_slowest()
+                if segment:
+                    segment.owned = True
+                return segment
+
+        def segment_done(segment):
+            with lock:
+                if segment.partner and segment.remaining <= 0:
+                    # The range is complete; stop the other connection, even if it is stuck waiting for data
+                    segment.partner.end = min(segment.partner.end, segment.partner.pos)
+                    if segment.partner.response:
+                        _abort_response(segment.partner.response)
+                    if segment.is_hedge:
+                        hedger.won += 1
+
+        while sum(segment.remaining > 0 for segment in segments) < connections and split_largest():
+            pass
+
+        def report_progress():
+            with lock:
+                downloaded = total - sum(segment.missing for segment in segments)
+                now = time.time()
+                self._hook_progress({
+                    'status': 'downloading',
+                    'downloaded_bytes': downloaded,
+                    'total_bytes': total,
+                    'tmpfilename': tmpfilename,
+                    'filename': filename,
+                    'eta': self.calc_eta(start, now, total - resume_len, downloaded - resume_len),
+                    'speed': self.calc_speed(start, now, downloaded - resume_len),
+                    'elapsed': now - start,
+                    'ctx_id': info_dict.get('ctx_id'),
+                    'hedged_requests': hedger and hedger.hedged,
+                }, info_dict)
+                if time.monotonic() - state['saved'] > 1:
+                    state['saved'] = time.monotonic()
+                    self._write_segments(filename, total, segments)
+            # Apply rate limit
+            self.slow_down(start, now, downloaded - resume_len)
+
+        def wait_for(segment, func, *args):
+            segment.waiting_since = time.monotonic()
+            try:
+                return func(*args)
+            finally:
+                if hedger:
+                    hedger.record(time.monotonic() - segment.waiting_since)
+                segment.waiting_since = None
+
+        def download_segment(segment, stream):
+            block_size = self.params.get('buffersize', 1024)
+            for retry in RetryManager(self.params.get('retries'), self.report_retry):
+                try:
+                    while segment.remaining > 0 and not stop.is_set():
+                        request_end = min(segment.end, segment.pos + chunk_size) if chunk_size else segment.end
+                        with wait_for(segment, open_range, segment.pos, request_end) as data:
+                            segment.response = data
+                            if parse_http_range(data.headers.get('Content-Range'))[0] != segment.pos:
+                                self.report_error(f'The server did not return the requested range of {url}')
+                                return False
+                            stream.seek(segment.pos)
+                            while segment.pos < min(segment.end, request_end) and not stop.is_set():
+                                before = time.time()
+                                data_block = wait_for(segment, data.read, block_size)
+                                if not data_block:
+                                    raise ContentTooShortError(segment.pos, min(segment.end, request_end))
+                                if not self.params.get('noresizebuffer', False):
+                                    block_size = self.best_block_size(time.time() - before, len(data_block))
+                                # The end of the range is lowered when it is split. Overlapping writes
+                                # near the split and of hedges have the same content, so they are harmless
+                                data_block = data_block[:max(segment.end - segment.pos, 0)]
+                                stream.write(data_block)
+                                # Only record the progress that was written out
+                                stream.flush()
+                                segment.pos += len(data_block)
+                                report_progress()
+                except Exception as err:
+                    if segment.remaining <= 0:
+                        # The response was closed since the other connection completed the range
+                        break
+                    if isinstance(err, HTTPError) and (err.status < 500 or err.status >= 600):
+                        raise
+                    if not isinstance(err, (HTTPError, TransportError, ContentTooShortError)):
+                        raise
+                    retry.error = err
+                finally:
+                    segment.response = None
+            return segment.remaining <= 0 or stop.is_set()
+
+        def worker():
+            # Each connection writes in place with its own file object
+            with open(tmpfilename, 'r+b') as stream:
+                while not stop.is_set():
+                    segment = next_segment()
+                    if segment is None:
+                        if not hedger or not any(segment.missing for segment in segments):
+                            return True
+                        # Wait for a connection to be slow enough to hedge
+                        stop.wait(max((hedger.threshold or 0) / 4, 0.05))
+                        continue
+                    if not download_segment(segment, stream):
+                        return False
+                    segment_done(segment)
+            return True
+
+        with concurrent.futures.ThreadPoolExecutor(connections) as pool:
+            futures = [pool.submit(worker) for _ in range(connections)]
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    if not future.result():
+                        return False
+            finally:
+                stop.set()
+                if any(segment.missing for segment in segments):
+                    self._write_segments(filename, total, segments)
+                else:
+                    self.try_remove(self.ytdl_filename(filename))
+
+        if hedger and hedger.hedged:
+            self.to_screen(f'[download] Hedged {hedger.hedged} slow connections, {hedger.won} of which completed first')
+        self.try_rename(tmpfilename, filename)
+        if self.params.get('updatetime'):
+            info_dict['filetime'] = self.try_utime(filename, last_modified)
+        self._hook_progress({
+            'downloaded_bytes': total,
+            'total_bytes': total,
+            'filename': filename,
+            'status': 'finished',
+            'elapsed': time.time() - start,
+            'ctx_id': info_dict.get('ctx_id'),
+        }, info_dict)
+        return True
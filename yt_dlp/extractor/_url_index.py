@@ -0,0 +1,293 @@
+"""Index of the extractors by the hosts of the URLs they are suitable for
+
+Instead of trying the _VALID_URL of every extractor in order, the hosts that a
+_VALID_URL can match are derived from the regex, so that only the extractors
+indexed under the host of a URL (and those that could not be indexed) need to be tried.
+The hosts of the built-in extractors are precomputed in lazy_extractors
+"""
+import bisect
+import collections
+import heapq
+import itertools
+
+try:
+    import re._parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+from .common import InfoExtractor
+from ..utils import variadic
+
+# Characters that can end the host of a URL
+_TERMINATORS = frozenset('/?#:&')
+# Limit on the number of alternatives that are followed for each regex
+_MAX_FORKS = 4096
+
+_SLASH, _COLON = (sre_parse.LITERAL, ord('/')), (sre_parse.LITERAL, ord(':'))
+_ATOMIC_GROUP = getattr(sre_parse, 'ATOMIC_GROUP', None)  # Python 3.11+
+_POSSESSIVE_REPEAT = getattr(sre_parse, 'POSSESSIVE_REPEAT', None)
+_REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, _POSSESSIVE_REPEAT)
+
+_CATEGORIES = {
+    sre_parse.CATEGORY_DIGIT: str.isdigit,
+    sre_parse.CATEGORY_NOT_DIGIT: lambda c: not c.isdigit(),
+    sre_parse.CATEGORY_SPACE: str.isspace,
+    sre_parse.CATEGORY_NOT_SPACE: lambda c: not c.isspace(),
+    sre_parse.CATEGORY_WORD: lambda c: c.isalnum() or c == '_',
+    sre_parse.CATEGORY_NOT_WORD: lambda c: not (c.isalnum() or c == '_'),
+}
+
+
+class _Unindexable(Exception):
+    pass
+
+
+def _can_match_char(op, av, char):
+    """Whether a single character node can match the (non-alphabetic) char"""
+    if op is sre_parse.LITERAL:
+        return chr(av) == char
+    elif op is sre_parse.NOT_LITERAL:
+        return chr(av) != char
+    elif op is sre_parse.ANY:
+        return True
+    elif op is sre_parse.RANGE:
+        return av[0] <= ord(char) <= av[1]
+    elif op is sre_parse.CATEGORY:
+        return _CATEGORIES.get(av, lambda _: True)(char)
+    elif op is sre_parse.IN:
+        if av and av[0][0] is sre_parse.NEGATE:
+            return not any(_can_match_char(*item, char) for item in av[1:])
+        return any(_can_match_char(*item, char) for item in av)
+    raise _Unindexable
+
+
+def _matchable_chars(nodes, chars=_TERMINATORS):
+    """@returns which of chars any of the nodes can match"""
+    matchable = set()
+    for op, av in nodes:
+        if op in (sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.ANY, sre_parse.IN):
+            matchable.update(char for char in chars if _can_match_char(op, av, char))
+        elif op in _REPEATS:
+            matchable |= _matchable_chars(av[2], chars)
+        elif op is sre_parse.SUBPATTERN:
+            matchable |= _matchable_chars(av[-1], chars)
+        elif op is _ATOMIC_GROUP:
+            matchable |= _matchable_chars(av, chars)
+        elif op is sre_parse.BRANCH:
+            for alternative in av[1]:
+                matchable |= _matchable_chars(alternative, chars)
+        elif op not in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            # Backreferences etc.
+            matchable.update(chars)
+    return matchable
+
+
+def _is_terminator(op, av):
+    """Whether the node can only match at the end of a host"""
+    if op is sre_parse.AT:
+        return av in (sre_parse.AT_END, sre_parse.AT_END_STRING)
+    elif op is sre_parse.ASSERT:
+        direction, nodes = av
+        return direction == 1 and _starts_with_terminator(nodes)
+    elif op is sre_parse.BRANCH:
+        return all(map(_starts_with_terminator, av[1]))
+    elif op is sre_parse.SUBPATTERN:
+        return _starts_with_terminator(av[-1])
+    elif op is _ATOMIC_GROUP:
+        return _starts_with_terminator(av)
+    elif op in _REPEATS:
+        return av[0] > 0 and _starts_with_terminator(av[2])
+    elif op is sre_parse.LITERAL:
+        return chr(av) in _TERMINATORS
+    elif op is sre_parse.IN:
+        return all(item_op is sre_parse.LITERAL and chr(item_av) in _TERMINATORS for item_op, item_av in av)
+    return False
+
+
+def _starts_with_terminator(nodes):
+    return bool(nodes) and _is_terminator(*nodes[0])
+
+
+def _host_keys(pattern):
+    """@returns the set of keys for the regex; see url_hosts"""
+    keys, forks = set(), [list(sre_parse.parse(pattern))]
+    for _ in range(_MAX_FORKS):
+        if not forks:
+            return keys
+        nodes = forks.pop()
+        try:
+            keys.add(_follow(nodes, forks))
+        except _Unindexable:
+            keys.add(_prefix_key(nodes))
+    raise _Unindexable
+
+
+def _follow(nodes, forks):
+    """Walk a sequence of regex nodes up to the end of the host, adding the other alternatives to forks"""
+    i, prefix, host = 0, [], None  # host is None until "://" is found
+    while True:
+        if i >= len(nodes):
+            # The regex can match URLs that continue with any host
+            raise _Unindexable
+        op, av = nodes[i]
+
+        # Expand groups and alternatives
+        if op is sre_parse.SUBPATTERN or op is _ATOMIC_GROUP:
+            nodes = [*nodes[:i], *(av[-1] if op is sre_parse.SUBPATTERN else av), *nodes[i + 1:]]
+            continue
+        elif op is sre_parse.BRANCH and not _is_terminator(op, av):
+            forks.extend([*nodes[:i], *alternative, *nodes[i + 1:]] for alternative in av[1][1:])
+            nodes = [*nodes[:i], *av[1][0], *nodes[i + 1:]]
+            continue
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[1] == 1:
+            if av[0] == 0:
+                forks.append([*nodes[:i], *nodes[i + 1:]])
+            nodes = [*nodes[:i], *av[2], *nodes[i + 1:]]
+            continue
+        elif op in _REPEATS and av[0] == 0:
+            forks.append([*nodes[:i], *nodes[i + 1:]])
+            nodes = [*nodes[:i], (op, (1, *av[1:])), *nodes[i + 1:]]
+            continue
+
+        if host is not None:
+            if _is_terminator(op, av):
+                return _host_key(host)
+            host.append((op, av))
+        elif nodes[i:i + 3] == [_COLON, _SLASH, _SLASH] or (not prefix and nodes[i:i + 2] == [_SLASH, _SLASH]):
+            # "://" after the scheme, or "//" of a protocol-relative URL
+            if ':' in _matchable_chars(prefix):
+                raise _Unindexable
+            host = []
+            i += 3 if prefix else 2
+            continue
+        elif _is_terminator(op, av):
+            # There is no scheme; the host starts at the beginning of the URL
+            return _host_key(prefix)
+        else:
+            prefix.append((op, av))
+        i += 1
+
+
+def _host_key(host):
+    host = [(op, av) for op, av in host if op not in (sre_parse.AT, sre_parse.ASSERT_NOT)
+            and not (op is sre_parse.ASSERT and av[0] == -1)]
+    literals = list(itertools.takewhile(lambda node: node[0] is sre_parse.LITERAL, reversed(host)))
+    key = ''.join(chr(av) for _, av in reversed(literals)).lower()
+    if len(literals) != len(host):
+        # Only the labels that are entirely literal are known
+        key = key.partition('.')[2]
+    if not key or key.startswith('^'):
+        raise _Unindexable
+    return key
+
+
+def _prefix_key(nodes):
+    """@returns the literal text that all URLs matching the nodes start with, as a key"""
+    prefix, nodes = [], list(nodes)
+    while nodes:
+        op, av = nodes.pop(0)
+        if op is sre_parse.SUBPATTERN:
+            nodes[:0] = av[-1]
+        elif op is sre_parse.LITERAL:
+            prefix.append(chr(av))
+        else:
+            break
+    prefix = ''.join(prefix).lower()
+    # URLs with a common scheme are not worth indexing by their prefix
+    if not prefix or prefix.startswith(('http', '/')) or 'http'.startswith(prefix):
+        raise _Unindexable
+    return f'^{prefix}'
+
+
+def url_hosts(valid_url):
+    """Find the hosts of the URLs that a _VALID_URL can match
+
+    @returns    A frozenset of keys. A URL can only match if its host (lowercased,
+                optionally without the port) is a key or ends with "." + key,
+                or if the key is "^" + a prefix of the (lowercased) URL.
+                None if this cannot be determined
+    """
+    if valid_url is False:
+        return frozenset()
+    elif not valid_url:
+        return None
+    try:
+        return frozenset(itertools.chain.from_iterable(map(_host_keys, variadic(valid_url))))
+    except (_Unindexable, RecursionError, sre_parse.error):
+        return None
+
+
+_url_hosts_cache = {}
+
+
+def extractor_url_hosts(ie):
+    """url_hosts of an extractor class or instance, or None if it overrides the URL matching"""
+    ie = ie if isinstance(ie, type) else type(ie)
+    if '_URL_HOSTS' in ie.__dict__:  # Precomputed in lazy_extractors
+        hosts = ie.__dict__['_URL_HOSTS']
+        return hosts if hosts is None else frozenset(hosts)
+    if (ie.suitable.__func__ is not InfoExtractor.suitable.__func__
+            or ie._match_valid_url.__func__ is not InfoExtractor._match_valid_url.__func__):
+        return None
+    valid_url = ie._VALID_URL
+    cache_key = valid_url if valid_url is False else tuple(variadic(valid_url))
+    if cache_key not in _url_hosts_cache:
+        _url_hosts_cache[cache_key] = url_hosts(valid_url)
+    return _url_hosts_cache[cache_key]
+
+
+class ExtractorURLIndex:
+    """Find the extractors that may be suitable for a URL
+
+    The candidates are yielded in the same order as the extractors were given,
+    so that the first suitable one is the same as without the index
+    """
+
+    def __init__(self, ies):
+        """@param ies   Iterable of (ie_key, ie)"""
+        self._ies = list(ies)
+        self._hosts, self._prefixes = collections.defaultdict(list), collections.defaultdict(list)
+        self._wildcards = []
+        for idx, (_, ie) in enumerate(self._ies):
+            hosts = extractor_url_hosts(ie)
+            if hosts is None:
+                self._wildcards.append(idx)
+                continue
+            for key in hosts:
+                if key.startswith('^'):
+                    self._prefixes[key[1:]].append(idx)
+                else:
+                    self._hosts[key].append(idx)
+        self._max_host_len = max(map(len, self._hosts), default=0)
+        self._prefix_lengths = sorted({len(prefix) for prefix in self._prefixes})
+
+    def _host_candidates(self, url):
+        """All the parts of the url that may be (a suffix of) the host matched by a regex
+
+        A regex can match many different parts of a malformed URL as its host, so rather
+        than parsing the host, every part of the URL that starts at the beginning of the
+        URL or host or after a "." and ends before a terminator is considered
+        """
+        starts = [0, *(idx + 1 for idx, char in enumerate(url) if char == '.')]
+        scheme_end = url.find('://')
+        if scheme_end >= 0:
+            bisect.insort(starts, scheme_end + 3)
+        elif url.startswith('//'):
+            bisect.insort(starts, 2)
+        ends = [idx for idx, char in enumerate(url) if char in _TERMINATORS or char == '\n']
+        ends.append(len(url))
+        for end in ends:
+            first, last = bisect.bisect_left(starts, end - self._max_host_len), bisect.bisect_left(starts, end)
+            for start in starts[first:last]:
+                yield url[start:end]
+
+    def candidates(self, url):
+        """Yield the (ie_key, ie) that may be suitable for the url, in order"""
+        url = url.lower()
+        matched = set()
+        for host in self._host_candidates(url):
+            matched.update(self._hosts.get(host, ()))
+        for length in self._prefix_lengths:
+            matched.update(self._prefixes.get(url[:length], ()))
+        for idx in heapq.merge(sorted(matched), self._wildcards):
+            yield self._ies[idx]
@@ -103,6 +103,7 @@
 )
 from ..utils._utils import _request_dump_filename
 from ..utils.jslib import devalue
+from ..utils.tracing import trace_span
 
 
 class InfoExtractor:
@@ -204,6 +205,9 @@ class InfoExtractor:
                                             fragment_base_url
                                  * "duration" (optional, int or float)
                                  * "filesize" (optional, int)
+                                 * "byte_range" (optional, dict) - "start" and
+                                            "end" (exclusive) byte offsets of the
+                                            fragment within the URL
                     * hls_media_playlist_data
                                  The M3U8 media playlist data as a string.
                                  Only use if the data must be modified during extraction and
@@ -906,7 +910,9 @@ def _request_webpage(self, url_or_request, video_id, note=None, errnote=None, fa
             self.report_warning(f'{message}; if you encounter errors, then {info_msg}', only_once=True)
 
         try:
-            return self._downloader.urlopen(self._create_request(url_or_request, data, headers, query, extensions))
+            url = url_or_request.url if isinstance(url_or_request, Request) else url_or_request
+            with trace_span('_request_webpage', 'network', url=url, ie=self.IE_NAME):
+                return self._downloader.urlopen(self._create_request(url_or_request, data, headers, query, extensions))
         except network_exceptions as err:
             if isinstance(err, HTTPError):
                 if self.__can_accept_status_code(err, expected_status):
@@ -2861,10 +2867,18 @@ def extract_common(source):
                 if segment_duration:
                     ms_info['segment_duration'] = float(segment_duration)
 
+            def parse_byte_range(byte_range):
+                # The ranges are inclusive, e.g. "0-499" for the first 500 bytes
+                start, _, end = byte_range.partition('-')
+                return {'start': int(start), 'end': int(end) + 1}
+
             def extract_Initialization(source):
                 initialization = source.find(_add_ns('Initialization'))
                 if initialization is not None:
-                    ms_info['initialization_url'] = initialization.attrib['sourceURL']
+                    # Without @sourceURL, the range applies to the BaseURL
+                    ms_info['initialization_url'] = initialization.get('sourceURL')
+                    if initialization.get('range'):
+                        ms_info['initialization_range'] = parse_byte_range(initialization.get('range'))
 
             segment_list = element.find(_add_ns('SegmentList'))
             if segment_list is not None:
@@ -2872,7 +2886,11 @@ def extract_Initialization(source):
                 extract_Initialization(segment_list)
                 segment_urls_e = segment_list.findall(_add_ns('SegmentURL'))
                 if segment_urls_e:
-                    ms_info['segment_urls'] = [segment.attrib['media'] for segment in segment_urls_e]
+                    ms_info['segment_urls'] = [segment.get('media') for segment in segment_urls_e]
+                    if any(segment.get('mediaRange') for segment in segment_urls_e):
+                        ms_info['segment_ranges'] = [
+                            segment.get('mediaRange') and parse_byte_range(segment.get('mediaRange'))
+                            for segment in segment_urls_e]
             else:
                 segment_template = element.find(_add_ns('SegmentTemplate'))
                 if segment_template is not None:
@@ -2888,6 +2906,10 @@ def extract_Initialization(source):
             return ms_info
 
         mpd_duration = parse_duration(mpd_doc.get('mediaPresentationDuration'))
+        # The segments of dynamic manifests without SegmentTimeline are only known from the clock
+        availability_start_time = (
+            parse_iso8601(mpd_doc.get('availabilityStartTime')) if mpd_doc.get('type') == 'dynamic' else None)
+        time_shift_buffer_depth = parse_duration(mpd_doc.get('timeShiftBufferDepth'))
         stream_numbers = collections.defaultdict(int)
         for period_idx, period in enumerate(mpd_doc.findall(_add_ns('Period'))):
             period_entry = {
@@ -2896,6 +2918,8 @@ def extract_Initialization(source):
                 'subtitles': collections.defaultdict(list),
             }
             period_duration = parse_duration(period.get('duration')) or mpd_duration
+            period_start = parse_duration(period.get('start')) or 0
+            is_live_period = availability_start_time is not None and not period_duration
             period_ms_info = extract_multisegment_info(period, {
                 'start_number': 1,
                 'timescale': 1,
@@ -3031,6 +3055,15 @@ def prepare_template(template_name, identifiers):
                     def location_key(location):
                         return 'url' if re.match(r'https?://', location) else 'path'
 
+                    def segment_fragment(segment_index):
+                        # SegmentURL without @media addresses a byte range of the BaseURL
+                        segment_uri = representation_ms_info['segment_urls'][segment_index] or base_url
+                        fragment = {location_key(segment_uri): segment_uri}
+                        byte_range = traverse_obj(representation_ms_info, ('segment_ranges', segment_index))
+                        if byte_range:
+                            fragment['byte_range'] = byte_range
+                        return fragment
+
                     if 'segment_urls' not in representation_ms_info and 'media' in representation_ms_info:
 
                         media_template = prepare_template('media', ('Number', 'Bandwidth', 'Time'))
@@ -3042,7 +3075,17 @@ def location_key(location):
                             segment_duration = None
                             if 'total_number' not in representation_ms_info and 'segment_duration' in representation_ms_info:
                                 segment_duration = float_or_none(representation_ms_info['segment_duration'], representation_ms_info['timescale'])
-                                representation_ms_info['total_number'] = math.ceil(float_or_none(period_duration, segment_duration, default=0))
+                                if is_live_period:
+                                    # The available segments of a live stream are those that ended
+                                    # within the time shift buffer [1, 5.3.9.5.3]
+                                    available_number = math.floor(
+                                        (time.time() - availability_start_time - period_start) / segment_duration)
+                                    first_number = max(0, available_number - math.ceil(
+                                        time_shift_buffer_depth / segment_duration)) if time_shift_buffer_depth else 0
+                                    representation_ms_info['start_number'] += first_number
+                                    representation_ms_info['total_number'] = max(0, available_number - first_number)
+                                else:
+                                    representation_ms_info['total_number'] = math.ceil(float_or_none(period_duration, segment_duration, default=0))
                             representation_ms_info['fragments'] = [{
                                 media_location_key: media_template % {
                                     'Number': segment_number,
@@ -3092,9 +3135,8 @@ def add_segment_url():
                         for s in representation_ms_info['s']:
                             duration = float_or_none(s['d'], timescale)
                             for _ in range(s.get('r', 0) + 1):
-                                segment_uri = representation_ms_info['segment_urls'][segment_index]
                                 fragments.append({
-                                    location_key(segment_uri): segment_uri,
+                                    **segment_fragment(segment_index),
                                     'duration': duration,
                                 })
                                 segment_index += 1
@@ -3107,10 +3149,8 @@ def add_segment_url():
                         segment_duration = float_or_none(
                             representation_ms_info['segment_duration'],
                             representation_ms_info['timescale']) if 'segment_duration' in representation_ms_info else None
-                        for segment_url in representation_ms_info['segment_urls']:
-                            fragment = {
-                                location_key(segment_url): segment_url,
-                            }
+                        for segment_index in range(len(representation_ms_info['segment_urls'])):
+                            fragment = segment_fragment(segment_index)
                             if segment_duration:
                                 fragment['duration'] = segment_duration
                             fragments.append(fragment)
@@ -3128,10 +3168,12 @@ def add_segment_url():
                             'protocol': 'http_dash_segments' if mime_type != 'image/jpeg' else 'mhtml',
                         })
                         if 'initialization_url' in representation_ms_info:
-                            initialization_url = representation_ms_info['initialization_url']
+                            initialization_url = representation_ms_info['initialization_url'] or base_url
                             if not f.get('url'):
                                 f['url'] = initialization_url
                             f['fragments'].append({location_key(initialization_url): initialization_url})
+                            if 'initialization_range' in representation_ms_info:
+                                f['fragments'][-1]['byte_range'] = representation_ms_info['initialization_range']
                         f['fragments'].extend(representation_ms_info['fragments'])
                         if not period_duration:
                             period_duration = try_get(
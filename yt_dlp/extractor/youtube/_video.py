@@ -1802,6 +1802,7 @@ class YoutubeIE(YoutubeBaseInfoExtractor):
     }
     _INVERSE_PLAYER_JS_VARIANT_MAP = {v: k for k, v in _PLAYER_JS_VARIANT_MAP.items()}
     _NSIG_FUNC_CACHE_ID = 'nsig func'
+    _NSIG_RESULTS_CACHE_SIZE = 1000
     _DUMMY_STRING = 'dlp_wins'
 
     @classmethod
@@ -1817,6 +1818,8 @@ def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._code_cache = {}
         self._player_cache = {}
+        self._new_nsig_results = {}
+        self._nsig_close_hook_added = False
         self._pot_director = None
 
     def _real_initialize(self):
@@ -2184,6 +2187,35 @@ def _store_player_data_to_cache(self, name, player_url, data):
             self.cache.store(*cache_id, data)
             self._player_cache[cache_id] = data
 
+    def _remember_nsig_result(self, results, s, ret):
+        # Like the cache, only the most recently used results are kept in memory
+        results.pop(s, None)
+        results[s] = ret
+        for old_s in list(itertools.islice(results, max(len(results) - self._NSIG_RESULTS_CACHE_SIZE, 0))):
+            del results[old_s]
+
+    def _store_nsig_result(self, player_url, s, ret):
+        # The new results are written to the cache after each video, and when the YoutubeDL is closed
+        cache_id = ('youtube-nsig-results', self._player_js_cache_key(player_url))
+        if not isinstance(ret, Exception):
+            if not self._nsig_close_hook_added:
+                self._downloader.add_close_hook(self._write_nsig_results)
+                self._nsig_close_hook_added = True
+            self._remember_nsig_result(self._new_nsig_results.setdefault(cache_id, {}), s, ret)
+        self._remember_nsig_result(self._player_cache.setdefault(cache_id, {}), s, ret)
+
+    def _write_nsig_results(self):
+        for cache_id, new_results in self._new_nsig_results.items():
+            # Merge with the results that other processes may have stored in the meantime.
+            # Since the cache file is replaced atomically, a concurrent write can at worst lose some results
+            results = self.cache.load(*cache_id, min_ver='2025.03.31') or {}
+            for s in new_results:
+                results.pop(s, None)
+            results.update(new_results)
+            self.cache.store(*cache_id, dict(itertools.islice(
+                results.items(), max(len(results) - self._NSIG_RESULTS_CACHE_SIZE, 0), None)))
+        self._new_nsig_results.clear()
+
     def _decrypt_signature(self, s, video_id, player_url):
         """Turn the encrypted s field into a working signature"""
         extract_sig = self._cached(
@@ -2198,6 +2230,29 @@ def _decrypt_nsig(self, s, video_id, player_url):
             raise ExtractorError('Cannot decrypt nsig without player_url')
         player_url = urljoin('https://www.youtube.com', player_url)
 
+        # Recent results are cached to disk, so that they need no JS at all.
+        # The failures are only remembered in memory, so that they are not retried for each format
+        nsig_results = self._load_player_data_from_cache('nsig-results', player_url) or {}
+        if ret := nsig_results.get(s):
+            self._remember_nsig_result(nsig_results, s, ret)
+            if isinstance(ret, Exception):
+                raise ret
+            self.write_debug(f'Decrypted nsig {s} => {ret} from cache')
+            return ret
+
+        try:
+            ret = self._compute_nsig(s, video_id, player_url)
+        except ExtractorError as e:
+            self._store_nsig_result(player_url, s, e)
+            raise
+        except Exception as e:
+            e = ExtractorError(traceback.format_exc(), cause=e)
+            self._store_nsig_result(player_url, s, e)
+            raise e
+        self._store_nsig_result(player_url, s, ret)
+        return ret
+
+    def _compute_nsig(self, s, video_id, player_url):
         try:
             jsi, player_id, func_code = self._extract_n_function_code(video_id, player_url)
         except ExtractorError as e:
@@ -3443,9 +3498,8 @@ def build_fragments(f):
             query = parse_qs(fmt_url)
             if query.get('n'):
                 try:
-                    decrypt_nsig = self._cached(self._decrypt_nsig, 'nsig', query['n'][0])
                     fmt_url = update_url_query(fmt_url, {
-                        'n': decrypt_nsig(query['n'][0], video_id, player_url),
+                        'n': self._decrypt_nsig(query['n'][0], video_id, player_url),
                     })
                 except ExtractorError as e:
                     if player_url:
@@ -3727,6 +3781,8 @@ def _list_formats(self, video_id, microformats, video_details, player_responses,
                        else None)
         streaming_data = traverse_obj(player_responses, (..., 'streamingData'))
         *formats, subtitles = self._extract_formats_and_subtitles(streaming_data, video_id, player_url, live_status, duration)
+        # Don't keep the new nsig results only in memory, since the process may never be closed (e.g. --serve)
+        self._write_nsig_results()
         if all(f.get('has_drm') for f in formats):
             # If there are no formats that definitely don't have DRM, all have DRM
             for f in formats:
@@ -1,5 +1,6 @@
 import collections
 import contextlib
+import functools
 import itertools
 import json
 import math
@@ -16,6 +17,7 @@
     unified_timestamp,
     write_string,
 )
+from .utils.tracing import traced
 
 
 def _js_bit_op(op):
@@ -52,7 +54,10 @@ def _js_div(a, b):
 def _js_mod(a, b):
     if JS_Undefined in (a, b) or not b:
         return float('nan')
-    return (a or 0) % b
+    # The result takes the sign of the dividend, unlike in python
+    a = a or 0
+    result = a % b
+    return result - b if result and (result < 0) != (a < 0) else result
 
 
 def _js_exp(a, b):
@@ -383,12 +388,136 @@ def _index(self, obj, idx, allow_undefined=False):
                 return JS_Undefined
             raise self.Exception(f'Cannot get index {idx}', repr(obj), cause=e)
 
+    def _set_index(self, obj, idx, value, expr):
+        try:
+            obj[idx] = value
+        except Exception as e:
+            raise self.Exception(f'Cannot set index {idx}', expr, cause=e)
+        return value
+
     def _dump(self, obj, namespace):
         try:
             return json.dumps(obj)
         except TypeError:
             return self._named_object(namespace, obj)
 
+    def _get_object(self, variable, local_vars, nullish=False):
+        types = {
+            'String': str,
+            'Math': float,
+            'Array': list,
+        }
+        obj = local_vars.get(variable, types.get(variable, NO_DEFAULT))
+        if obj is NO_DEFAULT:
+            if variable not in self._objects:
+                try:
+                    self._objects[variable] = self.extract_object(variable, local_vars)
+                except self.Exception:
+                    if not nullish:
+                        raise
+            obj = self._objects.get(variable, JS_Undefined)
+        return obj
+
+    def _call_method(self, obj, member, argvals, expr, allow_recursion):
+        def assertion(cndn, msg):
+            """ assert, but without risk of getting optimized out """
+            if not cndn:
+                raise self.Exception(f'{member} {msg}', expr)
+
+        # Fixup prototype call
+        if isinstance(obj, type) and member.startswith('prototype.'):
+            new_member, _, func_prototype = member.partition('.')[2].partition('.')
+            assertion(argvals, 'takes one or more arguments')
+            assertion(isinstance(argvals[0], obj), f'needs binding to type {obj}')
+            if func_prototype == 'call':
+                obj, *argvals = argvals
+            elif func_prototype == 'apply':
+                assertion(len(argvals) == 2, 'takes two arguments')
+                obj, argvals = argvals
+                assertion(isinstance(argvals, list), 'second argument needs to be a list')
+            else:
+                raise self.Exception(f'Unsupported Function method {func_prototype}', expr)
+            member = new_member
+
+        if obj is str:
+            if member == 'fromCharCode':
+                assertion(argvals, 'takes one or more arguments')
+                return ''.join(map(chr, argvals))
+            raise self.Exception(f'Unsupported String method {member}', expr)
+        elif obj is float:
+            if member == 'pow':
+                assertion(len(argvals) == 2, 'takes two arguments')
+                return argvals[0] ** argvals[1]
+            raise self.Exception(f'Unsupported Math method {member}', expr)
+
+        if member == 'split':
+            assertion(argvals, 'takes one or more arguments')
+            assertion(len(argvals) == 1, 'with limit argument is not implemented')
+            return obj.split(argvals[0]) if argvals[0] else list(obj)
+        elif member == 'join':
+            assertion(isinstance(obj, list), 'must be applied on a list')
+            assertion(len(argvals) == 1, 'takes exactly one argument')
+            return argvals[0].join(obj)
+        elif member == 'reverse':
+            assertion(not argvals, 'does not take any arguments')
+            obj.reverse()
+            return obj
+        elif member == 'slice':
+            assertion(isinstance(obj, (list, str)), 'must be applied on a list or string')
+            assertion(len(argvals) <= 2, 'takes between 0 and 2 arguments')
+            return obj[slice(*argvals, None)]
+        elif member == 'splice':
+            assertion(isinstance(obj, list), 'must be applied on a list')
+            assertion(argvals, 'takes one or more arguments')
+            index, how_many = map(int, ([*argvals, len(obj)])[:2])
+            if index < 0:
+                index += len(obj)
+            add_items = argvals[2:]
+            res = []
+            for _ in range(index, min(index + how_many, len(obj))):
+                res.append(obj.pop(index))
+            for i, item in enumerate(add_items):
+                obj.insert(index + i, item)
+            return res
+        elif member == 'unshift':
+            assertion(isinstance(obj, list), 'must be applied on a list')
+            assertion(argvals, 'takes one or more arguments')
+            for item in reversed(argvals):
+                obj.insert(0, item)
+            return obj
+        elif member == 'pop':
+            assertion(isinstance(obj, list), 'must be applied on a list')
+            assertion(not argvals, 'does not take any arguments')
+            if not obj:
+                return
+            return obj.pop()
+        elif member == 'push':
+            assertion(argvals, 'takes one or more arguments')
+            obj.extend(argvals)
+            return obj
+        elif member == 'forEach':
+            assertion(argvals, 'takes one or more arguments')
+            assertion(len(argvals) <= 2, 'takes at-most 2 arguments')
+            f, this = ([*argvals, ''])[:2]
+            return [f((item, idx, obj), {'this': this}, allow_recursion) for idx, item in enumerate(obj)]
+        elif member == 'indexOf':
+            assertion(argvals, 'takes one or more arguments')
+            assertion(len(argvals) <= 2, 'takes at-most 2 arguments')
+            idx, start = ([*argvals, 0])[:2]
+            try:
+                return obj.index(idx, start)
+            except ValueError:
+                return -1
+        elif member == 'charCodeAt':
+            assertion(isinstance(obj, str), 'must be applied on a string')
+            assertion(len(argvals) == 1, 'takes exactly one argument')
+            idx = argvals[0] if isinstance(argvals[0], int) else 0
+            if idx >= len(obj):
+                return None
+            return ord(obj[idx])
+
+        return self._index(obj, member)(argvals, allow_recursion=allow_recursion)
+
     @Debugger.wrap_interpreter
     def interpret_statement(self, stmt, local_vars, allow_recursion=100, _is_var_declaration=False):
         if allow_recursion < 0:
@@ -624,9 +753,9 @@ def dict_item(key, val):
             if not isinstance(idx, (int, float)):
                 raise self.Exception(f'List index {idx} must be integer', expr)
             idx = int(idx)
-            left_val[idx] = self._operator(
-                m.group('op'), self._index(left_val, idx), m.group('expr'), expr, local_vars, allow_recursion)
-            return left_val[idx], should_return
+            return self._set_index(left_val, idx, self._operator(
+                m.group('op'), self._index(left_val, idx), m.group('expr'), expr, local_vars, allow_recursion),
+                expr), should_return
 
         for m in re.finditer(rf'''(?x)
                 (?P<pre_sign>\+\+|--)(?P<var1>{_NAME_RE})|
@@ -716,34 +845,13 @@ def dict_item(key, val):
             else:
                 arg_str, remaining = None, arg_str
 
-            def assertion(cndn, msg):
-                """ assert, but without risk of getting optimized out """
-                if not cndn:
-                    raise self.Exception(f'{member} {msg}', expr)
-
             def eval_method():
-                nonlocal member
-
                 if (variable, member) == ('console', 'debug'):
                     if Debugger.ENABLED:
                         Debugger.write(self.interpret_expression(f'[{arg_str}]', local_vars, allow_recursion))
                     return
 
-                types = {
-                    'String': str,
-                    'Math': float,
-                    'Array': list,
-                }
-                obj = local_vars.get(variable, types.get(variable, NO_DEFAULT))
-                if obj is NO_DEFAULT:
-                    if variable not in self._objects:
-                        try:
-                            self._objects[variable] = self.extract_object(variable, local_vars)
-                        except self.Exception:
-                            if not nullish:
-                                raise
-                    obj = self._objects.get(variable, JS_Undefined)
-
+                obj = self._get_object(variable, local_vars, nullish)
                 if nullish and obj is JS_Undefined:
                     return JS_Undefined
 
@@ -755,101 +863,7 @@ def eval_method():
                 argvals = [
                     self.interpret_expression(v, local_vars, allow_recursion)
                     for v in self._separate(arg_str)]
-
-                # Fixup prototype call
-                if isinstance(obj, type) and member.startswith('prototype.'):
-                    new_member, _, func_prototype = member.partition('.')[2].partition('.')
-                    assertion(argvals, 'takes one or more arguments')
-                    assertion(isinstance(argvals[0], obj), f'needs binding to type {obj}')
-                    if func_prototype == 'call':
-                        obj, *argvals = argvals
-                    elif func_prototype == 'apply':
-                        assertion(len(argvals) == 2, 'takes two arguments')
-                        obj, argvals = argvals
-                        assertion(isinstance(argvals, list), 'second argument needs to be a list')
-                    else:
-                        raise self.Exception(f'Unsupported Function method {func_prototype}', expr)
-                    member = new_member
-
-                if obj is str:
-                    if member == 'fromCharCode':
-                        assertion(argvals, 'takes one or more arguments')
-                        return ''.join(map(chr, argvals))
-                    raise self.Exception(f'Unsupported String method {member}', expr)
-                elif obj is float:
-                    if member == 'pow':
-                        assertion(len(argvals) == 2, 'takes two arguments')
-                        return argvals[0] ** argvals[1]
-                    raise self.Exception(f'Unsupported Math method {member}', expr)
-
-                if member == 'split':
-                    assertion(argvals, 'takes one or more arguments')
-                    assertion(len(argvals) == 1, 'with limit argument is not implemented')
-                    return obj.split(argvals[0]) if argvals[0] else list(obj)
-                elif member == 'join':
-                    assertion(isinstance(obj, list), 'must be applied on a list')
-                    assertion(len(argvals) == 1, 'takes exactly one argument')
-                    return argvals[0].join(obj)
-                elif member == 'reverse':
-                    assertion(not argvals, 'does not take any arguments')
-                    obj.reverse()
-                    return obj
-                elif member == 'slice':
-                    assertion(isinstance(obj, (list, str)), 'must be applied on a list or string')
-                    assertion(len(argvals) <= 2, 'takes between 0 and 2 arguments')
-                    return obj[slice(*argvals, None)]
-                elif member == 'splice':
-                    assertion(isinstance(obj, list), 'must be applied on a list')
-                    assertion(argvals, 'takes one or more arguments')
-                    index, how_many = map(int, ([*argvals, len(obj)])[:2])
-                    if index < 0:
-                        index += len(obj)
-                    add_items = argvals[2:]
-                    res = []
-                    for _ in range(index, min(index + how_many, len(obj))):
-                        res.append(obj.pop(index))
-                    for i, item in enumerate(add_items):
-                        obj.insert(index + i, item)
-                    return res
-                elif member == 'unshift':
-                    assertion(isinstance(obj, list), 'must be applied on a list')
-                    assertion(argvals, 'takes one or more arguments')
-                    for item in reversed(argvals):
-                        obj.insert(0, item)
-                    return obj
-                elif member == 'pop':
-                    assertion(isinstance(obj, list), 'must be applied on a list')
-                    assertion(not argvals, 'does not take any arguments')
-                    if not obj:
-                        return
-                    return obj.pop()
-                elif member == 'push':
-                    assertion(argvals, 'takes one or more arguments')
-                    obj.extend(argvals)
-                    return obj
-                elif member == 'forEach':
-                    assertion(argvals, 'takes one or more arguments')
-                    assertion(len(argvals) <= 2, 'takes at-most 2 arguments')
-                    f, this = ([*argvals, ''])[:2]
-                    return [f((item, idx, obj), {'this': this}, allow_recursion) for idx, item in enumerate(obj)]
-                elif member == 'indexOf':
-                    assertion(argvals, 'takes one or more arguments')
-                    assertion(len(argvals) <= 2, 'takes at-most 2 arguments')
-                    idx, start = ([*argvals, 0])[:2]
-                    try:
-                        return obj.index(idx, start)
-                    except ValueError:
-                        return -1
-                elif member == 'charCodeAt':
-                    assertion(isinstance(obj, str), 'must be applied on a string')
-                    assertion(len(argvals) == 1, 'takes exactly one argument')
-                    idx = argvals[0] if isinstance(argvals[0], int) else 0
-                    if idx >= len(obj):
-                        return None
-                    return ord(obj[idx])
-
-                idx = int(member) if isinstance(obj, list) else member
-                return obj[idx](argvals, allow_recursion=allow_recursion)
+                return self._call_method(obj, member, argvals, expr, allow_recursion)
 
             if remaining:
                 ret, should_abort = self.interpret_statement(
@@ -901,7 +915,7 @@ def extract_object(self, objname, *global_stack):
             argnames = f.group('args').split(',')
             name = remove_quotes(f.group('key'))
             obj[name] = function_with_repr(
-                self.build_function(argnames, f.group('code'), *global_stack), f'F<{name}>')
+                self._extract_function_from_code(argnames, f.group('code'), *global_stack), f'F<{name}>')
 
         return obj
 
@@ -922,12 +936,23 @@ def extract_function_code(self, funcname):
         code, _ = self._separate_at_paren(func_m.group('code'))
         return [x.strip() for x in func_m.group('args').split(',')], code
 
+    @traced('jsinterp', 'JSInterpreter.extract_function', args=lambda self, funcname, *_: {'name': funcname})
     def extract_function(self, funcname, *global_stack):
         return function_with_repr(
-            self.extract_function_from_code(*self.extract_function_code(funcname), *global_stack),
+            traced('jsinterp', f'F<{funcname}>')(
+                self._extract_function_from_code(*self.extract_function_code(funcname), *global_stack)),
             f'F<{funcname}>')
 
     def extract_function_from_code(self, argnames, code, *global_stack):
+        return traced('jsinterp', 'JS function')(self._extract_function_from_code(argnames, code, *global_stack))
+
+    def _extract_function_from_code(self, argnames, code, *global_stack):
+        body = _compile_function(code)
+        if body is not None:
+            return _bind_function(tuple(argnames), body, self, global_stack)
+        return self._interpret_function_from_code(argnames, code, *global_stack)
+
+    def _interpret_function_from_code(self, argnames, code, *global_stack):
         local_vars = {}
         while True:
             mobj = re.search(r'function\((?P<args>[^)]*)\)\s*{', code)
@@ -935,7 +960,7 @@ def extract_function_from_code(self, argnames, code, *global_stack):
                 break
             start, body_start = mobj.span()
             body, remaining = self._separate_at_paren(code[body_start - 1:])
-            name = self._named_object(local_vars, self.extract_function_from_code(
+            name = self._named_object(local_vars, self._interpret_function_from_code(
                 [x.strip() for x in mobj.group('args').split(',')],
                 body, local_vars, *global_stack))
             code = code[:start] + name + remaining
@@ -956,3 +981,789 @@ def resf(args, kwargs={}, allow_recursion=100):
             if should_abort:
                 return ret
         return resf
+
+
+# Parse-once front end: the body of a function is tokenized and parsed into a tree of closures,
+# which is shared by all interpreters. Syntax that is not supported is left to interpret_statement
+_TOKEN_RE = re.compile(r'''(?xs)
+    (?P<space>(?:\s+|//[^\n]*|/\*.*?\*/)+)|
+    (?P<num>0[xX][\da-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)|
+    (?P<name>[a-zA-Z_$][\w$]*)|
+    (?P<str>"(?:\\.|[^\\"\n])*"|'(?:\\.|[^\\'\n])*')|
+    (?P<op>
+        >>>=?|\.\.\.|[=!]==|\*\*=|<<=|>>=|&&=|\|\|=|\?\?=|\?\.(?!\d)|=>|[=!<>]=|&&|\|\||\?\?|\+\+|--|
+        [-+*/%&|^]=|\*\*|<<|>>|[{}()\[\];,<>+\-*/%&|^!~?:=.`])
+''')
+_REGEX_PREFIX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'new', 'delete', 'void', 'throw'}
+_RESERVED_WORDS = {
+    'async', 'await', 'break', 'case', 'catch', 'class', 'const', 'continue', 'debugger', 'default',
+    'delete', 'do', 'else', 'export', 'extends', 'finally', 'for', 'function', 'if', 'import', 'in',
+    'instanceof', 'let', 'return', 'super', 'switch', 'throw', 'try', 'typeof', 'var', 'while', 'with', 'yield',
+}
+_LITERALS = {
+    'true': True, 'false': False, 'null': None, 'undefined': JS_Undefined,
+    'NaN': float('nan'), 'Infinity': float('inf'),
+}
+_BINARY_PRECEDENCE = {
+    '??': 1, '||': 1, '&&': 2, '|': 3, '^': 4, '&': 5,
+    '===': 6, '!==': 6, '==': 6, '!=': 6,
+    '<=': 7, '>=': 7, '<': 7, '>': 7,
+    '>>': 8, '<<': 8, '+': 9, '-': 9, '*': 10, '%': 10, '/': 10, '**': 11,
+}
+_ASSIGN_OPERATORS = {'=', *(f'{op}=' for op in set(_OPERATORS) - _COMP_OPERATORS - {'?'})}
+_EOF = ('eof', None, -1, -1, True)
+
+# Completions of compiled statements, besides None and a tuple of the return value
+_BREAK, _CONTINUE = object(), object()
+
+
+def _tokenize(code):
+    """@returns     list of (kind, value, start, end, whether a newline precedes it)"""
+    tokens, pos, newline = [], 0, True
+    while pos < len(code):
+        mobj = _TOKEN_RE.match(code, pos)
+        if mobj and mobj.lastgroup == 'space':
+            newline = newline or '\n' in mobj.group()
+            pos = mobj.end()
+            continue
+        elif code[pos] == '/' and (not tokens or (
+                (tokens[-1][0] == 'op' and tokens[-1][1] not in (')', ']', '}', '++', '--'))
+                or (tokens[-1][0] == 'name' and tokens[-1][1] in _REGEX_PREFIX_KEYWORDS))):
+            end, in_group = pos + 1, False
+            while end < len(code) and (in_group or code[end] != '/'):
+                if code[end] == '\n':
+                    break
+                elif code[end] == '\\':
+                    end += 1
+                elif code[end] in '[]':
+                    in_group = code[end] == '['
+                end += 1
+            if end >= len(code) or code[end] != '/':
+                raise JSInterpreter.Exception('Unterminated regular expression', code[pos:])
+            flags, inner, end = 0, code[pos:end], end + 1
+            while end < len(code) and code[end] in JSInterpreter._RE_FLAGS:
+                flags |= JSInterpreter._RE_FLAGS[code[end]]
+                end += 1
+            # Like interpret_statement, regular expressions are not compiled
+            tokens.append(('regex', f'{inner}/{flags}', pos, end, newline))
+        elif mobj:
+            tokens.append((mobj.lastgroup, mobj.group(), pos, mobj.end(), newline))
+        else:
+            raise JSInterpreter.Exception(f'Unsupported character {code[pos]!r}', code[pos:])
+        pos, newline = tokens[-1][3], False
+    return tokens
+
+
+def _bind_function(argnames, body, jsi, global_stack):
+    def resf(args, kwargs={}, allow_recursion=100):
+        if allow_recursion < 0:
+            raise jsi.Exception('Recursion limit reached')
+        local_vars = dict(itertools.zip_longest(argnames, args, fillvalue=None))
+        local_vars.update(kwargs)
+        ret = body(jsi, LocalNameSpace(local_vars, *global_stack), allow_recursion - 1)
+        if ret is not None:
+            return ret[0]
+    return resf
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_function(code):
+    """Compile the body of a function, once per code
+
+    @returns    The compiled body, or None if it uses syntax that has to be interpreted
+    """
+    try:
+        return _Compiler(code).compile()
+    except JSInterpreter.Exception:
+        return None
+
+
+def _compile_binary(op, left, right, expr):
+    if _OPERATORS[op] is None:
+        operate = _compile_operator(op, right, expr)
+        return lambda jsi, scope, allow_recursion: operate(
+            left(jsi, scope, allow_recursion), jsi, scope, allow_recursion)
+    func = _OPERATORS[op]
+
+    def binary(jsi, scope, allow_recursion):
+        left_val, right_val = left(jsi, scope, allow_recursion), right(jsi, scope, allow_recursion)
+        try:
+            return func(left_val, right_val)
+        except Exception as e:
+            raise jsi.Exception(f'Failed to evaluate {left_val!r} {op} {right_val!r}', expr, cause=e)
+    return binary
+
+
+def _compile_operator(op, right, expr):
+    """@returns     func(left_val, jsi, scope, allow_recursion), like JSInterpreter._operator"""
+    if op in ('||', '&&'):
+        def operate(left_val, jsi, scope, allow_recursion):
+            if (op == '&&') ^ _js_ternary(left_val):
+                return left_val  # short circuiting
+            return right(jsi, scope, allow_recursion)
+    elif op == '??':
+        def operate(left_val, jsi, scope, allow_recursion):
+            if left_val not in (None, JS_Undefined):
+                return left_val
+            return right(jsi, scope, allow_recursion)
+    else:
+        func = _OPERATORS[op]
+
+        def operate(left_val, jsi, scope, allow_recursion):
+            right_val = right(jsi, scope, allow_recursion)
+            try:
+                return func(left_val, right_val)
+            except Exception as e:
+                raise jsi.Exception(f'Failed to evaluate {left_val!r} {op} {right_val!r}', expr, cause=e)
+    return operate
+
+
+class _Value:
+    """A compiled expression, which is a reference if it can be assigned to"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def assign(self, op, value, expr):
+        raise JSInterpreter.Exception('Invalid assignment', expr)
+
+    def update(self, op, prefix, expr):
+        raise JSInterpreter.Exception(f'Invalid operand of {op}', expr)
+
+    def call(self, argvals, expr):
+        func = self.value
+
+        def call(jsi, scope, allow_recursion):
+            return func(jsi, scope, allow_recursion)(
+                [arg(jsi, scope, allow_recursion) for arg in argvals], allow_recursion=allow_recursion)
+        return call
+
+
+class _Name(_Value):
+    def __init__(self, name):
+        def value(jsi, scope, allow_recursion):
+            for variables in scope.maps:
+                if name in variables:
+                    return variables[name]
+            jsi._undefined_varnames.add(name)
+            return JS_Undefined
+
+        super().__init__(value)
+        self.name = name
+
+    def assign(self, op, value, expr):
+        name = self.name
+        if op is not None:
+            operate = _compile_operator(op, value, expr)
+
+            def value(jsi, scope, allow_recursion):
+                return operate(scope.get(name), jsi, scope, allow_recursion)
+
+        def assign(jsi, scope, allow_recursion):
+            scope[name] = ret = value(jsi, scope, allow_recursion)
+            return ret
+        return assign
+
+    def update(self, op, prefix, expr):
+        name, delta = self.name, 1 if op == '++' else -1
+
+        def update(jsi, scope, allow_recursion):
+            ret = scope[name]
+            scope[name] += delta
+            return scope[name] if prefix else ret
+        return update
+
+    def call(self, argvals, expr):
+        name = self.name
+
+        def call(jsi, scope, allow_recursion):
+            args = [arg(jsi, scope, allow_recursion) for arg in argvals]
+            for variables in scope.maps:
+                if name in variables:
+                    return variables[name](args, allow_recursion=allow_recursion)
+            if name not in jsi._functions:
+                jsi._functions[name] = jsi.extract_function(name)
+            return jsi._functions[name](args, allow_recursion=allow_recursion)
+        return call
+
+
+class _Member(_Value):
+    def __init__(self, obj, member, nullish, expr):
+        self.obj, self.member, self.nullish = obj, member, nullish
+        if isinstance(obj, _Name):
+            name = obj.name
+
+            def get_obj(jsi, scope, allow_recursion):
+                for variables in scope.maps:
+                    if name in variables:
+                        return variables[name]
+                return jsi._get_object(name, scope, nullish)
+        else:
+            get_obj = obj.value
+        get_member = member if callable(member) else lambda jsi, scope, allow_recursion: member
+        self._get_obj, self._get_member = get_obj, get_member
+
+        def value(jsi, scope, allow_recursion):
+            obj = get_obj(jsi, scope, allow_recursion)
+            if nullish and obj is JS_Undefined:
+                return JS_Undefined
+            return jsi._index(obj, get_member(jsi, scope, allow_recursion), nullish)
+
+        super().__init__(value)
+
+    def _reference(self, jsi, scope, allow_recursion, expr):
+        obj = self._get_obj(jsi, scope, allow_recursion)
+        if obj in (None, JS_Undefined):
+            raise jsi.Exception('Cannot index undefined variable', expr)
+        idx = self._get_member(jsi, scope, allow_recursion)
+        if isinstance(obj, list):
+            if not isinstance(idx, (int, float)):
+                raise jsi.Exception(f'List index {idx} must be integer', expr)
+            idx = int(idx)
+        return obj, idx
+
+    def assign(self, op, value, expr):
+        reference = self._reference
+        operate = op and _compile_operator(op, value, expr)
+
+        def assign(jsi, scope, allow_recursion):
+            obj, idx = reference(jsi, scope, allow_recursion, expr)
+            return jsi._set_index(obj, idx, (
+                operate(jsi._index(obj, idx), jsi, scope, allow_recursion) if operate
+                else value(jsi, scope, allow_recursion)), expr)
+        return assign
+
+    def update(self, op, prefix, expr):
+        reference, delta = self._reference, 1 if op == '++' else -1
+
+        def update(jsi, scope, allow_recursion):
+            obj, idx = reference(jsi, scope, allow_recursion, expr)
+            ret = jsi._index(obj, idx)
+            new = jsi._set_index(obj, idx, ret + delta, expr)
+            return new if prefix else ret
+        return update
+
+    def call(self, argvals, expr):
+        path, obj = [], self
+        while isinstance(obj, _Member) and isinstance(obj.member, str) and not obj.nullish:
+            path.append(obj.member)
+            obj = obj.obj
+        if isinstance(obj, _Name) and (obj.name, path) == ('console', ['debug']):
+            def call(jsi, scope, allow_recursion):
+                if Debugger.ENABLED:
+                    Debugger.write([arg(jsi, scope, allow_recursion) for arg in argvals])
+            return call
+        elif isinstance(obj, _Name) and len(path) > 2 and path[-1] == 'prototype':
+            # eg: String.prototype.split.call(a, b)
+            name, member = obj.name, '.'.join(reversed(path))
+
+            def call(jsi, scope, allow_recursion):
+                return jsi._call_method(
+                    jsi._get_object(name, scope), member,
+                    [arg(jsi, scope, allow_recursion) for arg in argvals], expr, allow_recursion)
+            return call
+
+        get_obj, get_member, nullish = self._get_obj, self._get_member, self.nullish
+
+        def call(jsi, scope, allow_recursion):
+            obj = get_obj(jsi, scope, allow_recursion)
+            if nullish and obj is JS_Undefined:
+                return JS_Undefined
+            member = get_member(jsi, scope, allow_recursion)
+            return jsi._call_method(
+                obj, member, [arg(jsi, scope, allow_recursion) for arg in argvals], expr, allow_recursion)
+        return call
+
+
+class _Compiler:
+    """Compiles the body of a function into a tree of closures
+
+    Expressions compile to func(jsi, scope, allow_recursion) returning their value, and statements
+    to the same signature returning their completion: None, _BREAK, _CONTINUE or (return value, )
+    """
+
+    def __init__(self, code):
+        self.code, self._tokens, self._pos = code, _tokenize(code), 0
+        self._loops = self._switches = 0
+
+    def compile(self):
+        return self._statements(end=None)
+
+    def _error(self, msg, token=None):
+        token = token or self._peek()
+        return JSInterpreter.Exception(msg, self.code[token[2]:] if token is not _EOF else self.code)
+
+    def _peek(self):
+        return self._tokens[self._pos] if self._pos < len(self._tokens) else _EOF
+
+    def _next(self):
+        token = self._peek()
+        if token is _EOF:
+            raise self._error('Unexpected end of code')
+        self._pos += 1
+        return token
+
+    def _accept(self, value, kind='op'):
+        token = self._peek()
+        if token[1] == value and token[0] == kind:
+            self._pos += 1
+            return token
+
+    def _expect(self, value, kind='op'):
+        token = self._accept(value, kind)
+        if not token:
+            raise self._error(f'Expected {value}')
+        return token
+
+    def _name(self, what):
+        token = self._next()
+        if token[0] != 'name' or token[1] in _RESERVED_WORDS:
+            raise self._error(f'Unsupported {what}', token)
+        return token[1]
+
+    def _source(self, start):
+        return self.code[start:self._tokens[self._pos - 1][3]]
+
+    def _end_statement(self):
+        token = self._peek()
+        if not (self._accept(';') or token[4] or token[:2] == ('op', '}')):
+            raise self._error('Unsupported syntax')
+
+    @staticmethod
+    def _block(statements):
+        statements = [stmt for stmt in statements if stmt]
+        if len(statements) == 1:
+            return statements[0]
+
+        def block(jsi, scope, allow_recursion):
+            for stmt in statements:
+                ret = stmt(jsi, scope, allow_recursion)
+                if ret is not None:
+                    return ret
+        return block
+
+    def _statements(self, end='}'):
+        statements, declarations = [], []
+        while not (self._accept(end) if end else self._peek() is _EOF):
+            is_declaration = self._peek()[:2] == ('name', 'function')
+            (declarations if is_declaration else statements).append(self._statement())
+        # Function declarations are hoisted
+        return self._block(declarations + statements)
+
+    def _statement(self):
+        token = self._peek()
+        if token[:2] == ('op', '{'):
+            self._next()
+            return self._statements()
+        elif token[:2] == ('op', ';'):
+            self._next()
+            return None
+        elif token[0] == 'name' and token[1] in _RESERVED_WORDS:
+            statement = getattr(self, f'_statement_{token[1]}', None)
+            if not statement:
+                raise self._error(f'Unsupported statement {token[1]}')
+            self._next()
+            return statement()
+
+        expr = self._expression()
+        self._end_statement()
+
+        def statement(jsi, scope, allow_recursion):
+            expr(jsi, scope, allow_recursion)
+        return statement
+
+    def _declarations(self):
+        declarations = []
+        while True:
+            name = self._name('declaration')
+            declarations.append((name, self._assignment() if self._accept('=') else None))
+            if not self._accept(','):
+                break
+
+        def declare(jsi, scope, allow_recursion):
+            for name, value in declarations:
+                scope.set_local(name, scope.get_local(name) if value is None else value(jsi, scope, allow_recursion))
+        return declare
+
+    def _statement_var(self):
+        declare = self._declarations()
+        self._end_statement()
+        return declare
+
+    _statement_let = _statement_const = _statement_var
+
+    def _statement_function(self):
+        name = self._name('function name')
+        make_function = self._function()
+
+        def statement(jsi, scope, allow_recursion):
+            scope.set_local(name, make_function(jsi, scope, allow_recursion))
+        return statement
+
+    def _statement_return(self):
+        token, value = self._peek(), None
+        if not (token[4] or token[:2] in (('op', ';'), ('op', '}'))):
+            value = self._expression()
+        self._end_statement()
+
+        def statement(jsi, scope, allow_recursion):
+            return (value and value(jsi, scope, allow_recursion), )
+        return statement
+
+    def _statement_throw(self):
+        value = self._expression()
+        self._end_statement()
+
+        def statement(jsi, scope, allow_recursion):
+            raise JS_Throw(value(jsi, scope, allow_recursion))
+        return statement
+
+    def _loop_control(self, completion, allowed):
+        if not allowed:
+            raise self._error('Invalid loop control')
+        elif self._peek()[0] == 'name' and not self._peek()[4]:
+            raise self._error('Unsupported label')
+        self._end_statement()
+        return lambda jsi, scope, allow_recursion: completion
+
+    def _statement_break(self):
+        return self._loop_control(_BREAK, self._loops or self._switches)
+
+    def _statement_continue(self):
+        return self._loop_control(_CONTINUE, self._loops)
+
+    def _statement_if(self):
+        self._expect('(')
+        cndn = self._expression()
+        self._expect(')')
+        if_true = self._statement()
+        if_false = self._statement() if self._accept('else', 'name') else None
+
+        def statement(jsi, scope, allow_recursion):
+            branch = if_true if _js_ternary(cndn(jsi, scope, allow_recursion)) else if_false
+            if branch:
+                return branch(jsi, scope, allow_recursion)
+        return statement
+
+    def _loop_body(self):
+        self._loops += 1
+        try:
+            return self._statement()
+        finally:
+            self._loops -= 1
+
+    @staticmethod
+    def _loop(init, cndn, increment, body, check_first=True):
+        def statement(jsi, scope, allow_recursion):
+            if init:
+                init(jsi, scope, allow_recursion)
+            if check_first and cndn and not _js_ternary(cndn(jsi, scope, allow_recursion)):
+                return
+            while True:
+                ret = body and body(jsi, scope, allow_recursion)
+                if ret is _BREAK:
+                    break
+                elif ret is not None and ret is not _CONTINUE:
+                    return ret
+                if increment:
+                    increment(jsi, scope, allow_recursion)
+                if cndn and not _js_ternary(cndn(jsi, scope, allow_recursion)):
+                    break
+        return statement
+
+    def _statement_for(self):
+        self._expect('(')
+        init = cndn = increment = None
+        if self._peek()[:2] in (('name', 'var'), ('name', 'let'), ('name', 'const')):
+            self._next()
+            init = self._declarations()
+        elif self._peek()[:2] != ('op', ';'):
+            init = self._expression()
+        self._expect(';')
+        if self._peek()[:2] != ('op', ';'):
+            cndn = self._expression()
+        self._expect(';')
+        if self._peek()[:2] != ('op', ')'):
+            increment = self._expression()
+        self._expect(')')
+        return self._loop(init, cndn, increment, self._loop_body())
+
+    def _statement_while(self):
+        self._expect('(')
+        cndn = self._expression()
+        self._expect(')')
+        return self._loop(None, cndn, None, self._loop_body())
+
+    def _statement_do(self):
+        body = self._loop_body()
+        self._expect('while', 'name')
+        self._expect('(')
+        cndn = self._expression()
+        self._expect(')')
+        self._accept(';')
+        return self._loop(None, cndn, None, body, check_first=False)
+
+    def _statement_switch(self):
+        self._expect('(')
+        switch_val = self._expression()
+        self._expect(')')
+        self._expect('{')
+        cases, default = [], None
+        self._switches += 1
+        while not self._accept('}'):
+            if self._accept('default', 'name'):
+                if default is not None:
+                    raise self._error('Duplicate default in switch')
+                default, case = len(cases), None
+            else:
+                self._expect('case', 'name')
+                case = self._expression()
+            self._expect(':')
+            statements = []
+            while self._peek()[:2] not in (('name', 'case'), ('name', 'default'), ('op', '}')):
+                statements.append(self._statement())
+            cases.append((case, self._block(statements)))
+        self._switches -= 1
+
+        def statement(jsi, scope, allow_recursion):
+            val = switch_val(jsi, scope, allow_recursion)
+            start = next((
+                i for i, (case, _) in enumerate(cases) if case and val == case(jsi, scope, allow_recursion)), default)
+            if start is None:
+                return
+            for _, body in cases[start:]:
+                ret = body(jsi, scope, allow_recursion)
+                if ret is _BREAK:
+                    break
+                elif ret is not None:
+                    return ret
+        return statement
+
+    def _statement_try(self):
+        self._expect('{')
+        try_block, catch_block, finally_block, err_name = self._statements(), None, None, None
+        if self._accept('catch', 'name'):
+            if self._accept('('):
+                err_name = self._name('catch parameter')
+                self._expect(')')
+            self._expect('{')
+            catch_block = self._statements()
+        if self._accept('finally', 'name'):
+            self._expect('{')
+            finally_block = self._statements()
+        if not (catch_block or finally_block):
+            raise self._error('Missing catch or finally after try')
+
+        def statement(jsi, scope, allow_recursion):
+            ret = err = None
+            try:
+                ret = try_block(jsi, scope, allow_recursion)
+            except Exception as e:
+                err = e
+            if err and catch_block:
+                catch_vars = {}
+                if err_name:
+                    catch_vars[err_name] = err.error if isinstance(err, JS_Throw) else err
+                try:
+                    ret, err = catch_block(jsi, scope.new_child(catch_vars), allow_recursion), None
+                except Exception as e:
+                    err = e
+            if finally_block:
+                finally_ret = finally_block(jsi, scope, allow_recursion)
+                if finally_ret is not None:
+                    return finally_ret
+            if err:
+                raise err
+            return ret
+        return statement
+
+    def _function(self, name=None):
+        self._expect('(')
+        argnames = []
+        while not self._accept(')'):
+            if argnames:
+                self._expect(',')
+            argnames.append(self._name('parameter'))
+        self._expect('{')
+        loops, switches = self._loops, self._switches
+        self._loops = self._switches = 0
+        body = self._statements()
+        self._loops, self._switches = loops, switches
+
+        def make_function(jsi, scope, allow_recursion):
+            if not name:
+                return _bind_function(argnames, body, jsi, scope.maps)
+            own_scope = {}
+            own_scope[name] = _bind_function(argnames, body, jsi, [own_scope, *scope.maps])
+            return own_scope[name]
+        return make_function
+
+    def _expression(self):
+        expressions = [self._assignment()]
+        while self._accept(','):
+            expressions.append(self._assignment())
+        if len(expressions) == 1:
+            return expressions[0]
+
+        def sequence(jsi, scope, allow_recursion):
+            for expr in expressions:
+                ret = expr(jsi, scope, allow_recursion)
+            return ret
+        return sequence
+
+    def _assignment(self):
+        start = self._peek()[2]
+        target = self._conditional()
+        token = self._peek()
+        if token[0] != 'op' or token[1] not in _ASSIGN_OPERATORS:
+            return target.value
+        self._next()
+        value = self._assignment()
+        return target.assign(token[1][:-1] or None, value, self._source(start))
+
+    def _conditional(self):
+        cndn = self._binary(1)
+        if not self._accept('?'):
+            return cndn
+        cndn, if_true = cndn.value, self._assignment()
+        self._expect(':')
+        if_false = self._assignment()
+
+        def conditional(jsi, scope, allow_recursion):
+            if _js_ternary(cndn(jsi, scope, allow_recursion)):
+                return if_true(jsi, scope, allow_recursion)
+            return if_false(jsi, scope, allow_recursion)
+        return _Value(conditional)
+
+    def _binary(self, min_precedence):
+        start = self._peek()[2]
+        left = self._unary()
+        while True:
+            token = self._peek()
+            precedence = token[0] == 'op' and _BINARY_PRECEDENCE.get(token[1])
+            if not precedence or precedence < min_precedence:
+                return left
+            self._next()
+            # ** is right-associative
+            right = self._binary(precedence if token[1] == '**' else precedence + 1)
+            left = _Value(_compile_binary(token[1], left.value, right.value, self._source(start)))
+
+    def _unary(self):
+        token = self._next()
+        if token[:2] in (('op', '++'), ('op', '--')):
+            return _Value(self._unary().update(token[1], True, self._source(token[2])))
+        elif token[:2] in (('op', '!'), ('op', '-'), ('op', '+'), ('name', 'void')):
+            value = self._unary().value
+            if token[1] == '!':
+                return _Value(lambda jsi, scope, allow_recursion: not _js_ternary(value(jsi, scope, allow_recursion)))
+            elif token[1] == 'void':
+                def void(jsi, scope, allow_recursion):
+                    value(jsi, scope, allow_recursion)
+                return _Value(void)
+            return _Value(_compile_binary(token[1], lambda *_: 0, value, self._source(token[2])))
+
+        self._pos -= 1
+        value = self._call()
+        token = self._peek()
+        if token[:2] in (('op', '++'), ('op', '--')) and not token[4]:
+            self._next()
+            return _Value(value.update(token[1], False, self._source(token[2])))
+        return value
+
+    def _arguments(self):
+        argvals = []
+        while not self._accept(')'):
+            if argvals:
+                self._expect(',')
+            argvals.append(self._assignment())
+        return argvals
+
+    def _call(self):
+        start = self._peek()[2]
+        if self._accept('new', 'name'):
+            self._expect('Date', 'name')
+            self._expect('(')
+            argvals = self._arguments()
+            if len(argvals) != 1:
+                raise self._error('Unsupported Date arguments')
+            expr = self._source(start)
+
+            def new_date(jsi, scope, allow_recursion):
+                date = unified_timestamp(argvals[0](jsi, scope, allow_recursion), False)
+                if date is None:
+                    raise jsi.Exception('Failed to parse date', expr)
+                return int(date * 1000)
+            value = _Value(new_date)
+        else:
+            value = self._primary()
+
+        while True:
+            if self._accept('('):
+                argvals = self._arguments()
+                value = _Value(value.call(argvals, self._source(start)))
+            elif self._accept('['):
+                member = self._expression()
+                self._expect(']')
+                value = _Member(value, member, False, self._source(start))
+            elif token := self._accept('.') or self._accept('?.'):
+                if self._peek()[0] != 'name':
+                    raise self._error('Unsupported member expression')
+                value = _Member(value, self._next()[1], token[1] == '?.', self._source(start))
+            else:
+                return value
+
+    def _literal(self, token):
+        kind, val = token[:2]
+        if kind == 'num':
+            return int(val, 16) if val[:2] in ('0x', '0X') else int(val) if val.isdigit() else float(val)
+        elif kind == 'str':
+            return json.loads(js_to_json(val, strict=True))
+        raise self._error('Unsupported literal', token)
+
+    def _primary(self):
+        token = self._next()
+        kind, val = token[:2]
+        if kind in ('num', 'str'):
+            literal = self._literal(token)
+            return _Value(lambda jsi, scope, allow_recursion: literal)
+        elif kind == 'regex':
+            return _Value(lambda jsi, scope, allow_recursion: val)
+        elif kind == 'name':
+            if val in _LITERALS:
+                literal = _LITERALS[val]
+                return _Value(lambda jsi, scope, allow_recursion: literal)
+            elif val == 'function':
+                return _Value(self._function(self._peek()[1] if self._peek()[0] == 'name' and self._next() else None))
+            elif val in _RESERVED_WORDS:
+                raise self._error(f'Unsupported expression {val}', token)
+            return _Name(val)
+        elif val == '(':
+            expr = self._expression()
+            self._expect(')')
+            return _Value(expr)
+        elif val == '[':
+            items = []
+            while not self._accept(']'):
+                items.append(self._assignment())
+                if not self._accept(','):
+                    self._expect(']')
+                    break
+
+            def array(jsi, scope, allow_recursion):
+                return [item(jsi, scope, allow_recursion) for item in items]
+            return _Value(array)
+        elif val == '{':
+            items = []
+            while not self._accept('}'):
+                key = self._next()
+                key = key[1] if key[0] == 'name' else self._literal(key)
+                self._expect(':')
+                items.append((key, self._assignment()))
+                if not self._accept(','):
+                    self._expect('}')
+                    break
+
+            def obj(jsi, scope, allow_recursion):
+                return {key: val(jsi, scope, allow_recursion) for key, val in items}
+            return _Value(obj)
+        raise self._error('Unsupported syntax', token)
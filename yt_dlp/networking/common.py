@@ -30,6 +30,7 @@
     update_url_query,
 )
 from ..utils.networking import HTTPHeaderDict, normalize_url
+from ..utils.tracing import traced
 
 DEFAULT_TIMEOUT = 20
 
@@ -91,6 +92,8 @@ def _print_verbose(self, msg):
         if self.verbose:
             self.logger.stdout(f'director: {msg}')
 
+    @traced('network', 'RequestDirector.send',
+            args=lambda self, request: {'url': request.url, 'method': request.method})
     def send(self, request: Request) -> Response:
         """
         Passes a request onto a suitable RequestHandler
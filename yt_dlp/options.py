@@ -496,6 +496,20 @@ def _preset_alias_callback(option, opt_str, value, parser):
         '--no-mark-watched',
         action='store_false', dest='mark_watched',
         help='Do not mark videos watched (default)')
+    general.add_option(
+        '--serve',
+        dest='serve', metavar='ADDRESS', default=None,
+        help=(
+            'Instead of downloading the given URLs, run a local JSON API server that accepts extract/download jobs '
+            'and runs them with the other given options. The extractors, caches and connections are kept warm '
+            'between jobs. ADDRESS is [HOST:]PORT (HOST defaults to 127.0.0.1) or the path of a UNIX socket. '
+            'Requests must have the header "Authorization: Bearer TOKEN" (see --serve-token), and POST bodies '
+            'must be sent with "Content-Type: application/json". '
+            'Endpoints: GET /status, POST /extract {"url": URL}, POST /download {"urls": [URLS]}'))
+    general.add_option(
+        '--serve-token',
+        dest='serve_token', metavar='TOKEN', default=None,
+        help='Bearer token that clients of --serve must send. By default, a random token is generated and printed')
     general.add_option(
         '--no-colors', '--no-colours',
         action='store_const', dest='color', const={
@@ -749,6 +763,22 @@ def _preset_alias_callback(option, opt_str, value, parser):
         '--no-download-archive',
         dest='download_archive', action='store_const', const=None,
         help='Do not use archive file (default)')
+    selection.add_option(
+        '--download-archive-backend',
+        metavar='BACKEND', dest='download_archive_backend', default=None, choices=('text', 'sqlite'),
+        help=(
+            'Storage format of the archive file. One of "text" (one ID per line, loaded into memory) or '
+            '"sqlite" (an indexed database that is not loaded into memory and can be shared between '
+            'concurrent processes). By default, sqlite is used for existing databases and for files '
+            'with a .sqlite, .sqlite3 or .db extension, and text otherwise'))
+    selection.add_option(
+        '--download-archive-import', metavar='FILE',
+        dest='download_archive_import', default=None,
+        help='Add the IDs in the text archive FILE to the --download-archive before downloading')
+    selection.add_option(
+        '--download-archive-export', metavar='FILE',
+        dest='download_archive_export', default=None,
+        help='Write all the IDs in the --download-archive to the text archive FILE after downloading')
     selection.add_option(
         '--max-downloads',
         dest='max_downloads', metavar='NUMBER', type=int, default=None,
@@ -980,6 +1010,46 @@ def _preset_alias_callback(option, opt_str, value, parser):
         '-N', '--concurrent-fragments',
         dest='concurrent_fragment_downloads', metavar='N', default=1, type=int,
         help='Number of fragments of a dash/hlsnative video that should be downloaded concurrently (default is %default)')
+    downloader.add_option(
+        '--adaptive-fragment-concurrency',
+        action='store_true', dest='adaptive_fragment_concurrency', default=False,
+        help=(
+            'Adapt the number of fragments downloaded concurrently between 1 and --concurrent-fragments '
+            'to the measured throughput, backing off when fragments fail'))
+    downloader.add_option(
+        '--no-adaptive-fragment-concurrency',
+        action='store_false', dest='adaptive_fragment_concurrency',
+        help='Always download --concurrent-fragments fragments concurrently (default)')
+    downloader.add_option(
+        '--http-connections',
+        dest='http_connections', metavar='N', default=1, type=int,
+        help=(
+            'Number of connections to download a single-file HTTP format with, each fetching a part of the file '
+            '(default is %default). Idle connections take over half of the largest remaining part. '
+            'Falls back to a single connection if the server does not support ranges'))
+    downloader.add_option(
+        '--hedge-percentile',
+        dest='hedge_percentile', metavar='PERCENTILE', default=None, type=float,
+        help=(
+            'Send a duplicate request for a fragment or --http-connections range that has been waiting for longer '
+            'than this percentile of the recent latencies of the download, e.g. 95, and use the first to complete '
+            '(default is disabled). Fragments are only hedged with --concurrent-fragments'))
+    downloader.add_option(
+        '--concurrent-videos',
+        dest='concurrent_video_downloads', metavar='N', default=1, type=int,
+        help=(
+            'Number of playlist entries (or input URLs) that should be extracted, downloaded and '
+            'post-processed concurrently (default is %default) (experimental)'))
+    downloader.add_option(
+        '--pipelined-downloads',
+        action='store_true', dest='pipelined_downloads', default=False,
+        help=(
+            'Extract the next playlist entry (or input URL) while the current one is being downloaded '
+            'and the previous one is being post-processed (experimental)'))
+    downloader.add_option(
+        '--no-pipelined-downloads',
+        action='store_false', dest='pipelined_downloads',
+        help='Process playlist entries one stage after the other (default)')
     downloader.add_option(
         '-r', '--limit-rate', '--rate-limit',
         dest='ratelimit', metavar='RATE',
@@ -1029,6 +1099,19 @@ def _preset_alias_callback(option, opt_str, value, parser):
         '--no-keep-fragments',
         action='store_false', dest='keep_fragments',
         help='Delete downloaded fragments after downloading is finished (default)')
+    downloader.add_option(
+        '--fragment-memory-limit',
+        dest='fragment_memory_limit', metavar='SIZE', default=None,
+        help=(
+            'Download the fragments of DASH, hlsnative and ISM downloads into memory instead of temporary files, '
+            'holding at most SIZE bytes of them at once, e.g. 50M (default is disabled). '
+            'Fragments over the limit are written to temporary files. Not used with --keep-fragments'))
+    downloader.add_option(
+        '--fragment-coalesce-size',
+        dest='fragment_coalesce_size', metavar='SIZE', default=None,
+        help=(
+            'Merge the fragments of DASH and hlsnative downloads that are adjacent byte ranges of the same file '
+            'into requests of up to SIZE bytes, e.g. 10M (default is disabled)'))
     downloader.add_option(
         '--buffer-size',
         dest='buffersize', metavar='SIZE', default='1024',
@@ -1104,7 +1187,9 @@ def _preset_alias_callback(option, opt_str, value, parser):
             'Download only chapters that match the regular expression. '
             'A "*" prefix denotes time-range instead of chapter. Negative timestamps are calculated from the end. '
             '"*from-url" can be used to download between the "start_time" and "end_time" extracted from the URL. '
-            'Needs ffmpeg. This option can be used multiple times to download multiple sections, '
+            'Needs ffmpeg, except with the native downloader for HLS and DASH (see --downloader), '
+            'which only downloads the fragments of the sections and uses ffmpeg for precise cuts if available. '
+            'This option can be used multiple times to download multiple sections, '
             'e.g. --download-sections "*10:15-inf" --download-sections "intro"'))
     downloader.add_option(
         '--downloader', '--external-downloader',
@@ -1354,6 +1439,12 @@ def _preset_alias_callback(option, opt_str, value, parser):
         '--print-traffic', '--dump-headers',
         dest='debug_printtraffic', action='store_true', default=False,
         help='Display sent and read HTTP traffic')
+    verbosity.add_option(
+        '--trace-file',
+        dest='trace_file', metavar='FILE', default=None,
+        help=(
+            'Write a performance trace of the extraction, network requests, downloads and post-processing '
+            'to FILE in the Chrome trace event format. It can be viewed in chrome://tracing or https://ui.perfetto.dev'))
     verbosity.add_option(
         '-C', '--call-home',
         dest='call_home', action='store_true', default=False,
@@ -1565,6 +1656,21 @@ def _preset_alias_callback(option, opt_str, value, parser):
         '--rm-cache-dir',
         action='store_true', dest='rm_cachedir',
         help='Delete all filesystem cache files')
+    filesystem.add_option(
+        '--cache-backend',
+        metavar='BACKEND', dest='cache_backend', default=None, choices=('dir', 'sqlite', 'memory'),
+        help=(
+            'How the cache is stored. One of "dir" (one file per entry in the cache directory, default), '
+            '"sqlite" (a single database in the cache directory, which is faster to read and '
+            'can be shared between concurrent processes) or "memory" (only kept while yt-dlp runs)'))
+    filesystem.add_option(
+        '--cache-max-size',
+        metavar='SIZE', dest='cache_max_size', default=None,
+        help='Maximum size of the cache, e.g. 50M. The least recently used entries are deleted to stay under it')
+    filesystem.add_option(
+        '--cache-stats',
+        action='store_true', dest='cache_stats', default=False,
+        help='Print the number of entries in the cache and its hits and misses before exiting')
 
     thumbnail = optparse.OptionGroup(parser, 'Thumbnail Options')
     thumbnail.add_option(
@@ -1954,6 +2060,22 @@ def _preset_alias_callback(option, opt_str, value, parser):
         '--no-hls-split-discontinuity',
         dest='hls_split_discontinuity', action='store_false',
         help='Do not split HLS playlists into different formats at discontinuities such as ad breaks (default)')
+    extractor.add_option(
+        '--extract-cache',
+        action='store_true', dest='extract_cache', default=False,
+        help=(
+            'Reuse the results of previous extractions of the same videos from the cache directory, '
+            'until their format URLs expire or --extract-cache-max-age is reached. '
+            'The results are only reused with the same version, extractor args, cookies, account and source address. '
+            'Playlists, live streams and results with credentials in their headers are not cached'))
+    extractor.add_option(
+        '--no-extract-cache',
+        action='store_false', dest='extract_cache',
+        help='Extract the videos every time (default)')
+    extractor.add_option(
+        '--extract-cache-max-age',
+        metavar='SECONDS', dest='extract_cache_max_age', default=None, type=float,
+        help='Maximum age of the reused extraction results (default is 3600)')
     _extractor_arg_parser = lambda key, vals='': (key.strip().lower().replace('-', '_'), [
         val.replace(r'\,', ',').strip() for val in re.split(r'(?<!\\),', vals)])
     extractor.add_option(
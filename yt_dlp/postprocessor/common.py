@@ -11,6 +11,7 @@
     deprecation_warning,
 )
 from ..utils._utils import _ProgressState
+from ..utils.tracing import trace_span
 
 
 class PostProcessorMetaClass(type):
@@ -20,7 +21,8 @@ def run_wrapper(func):
         def run(self, info, *args, **kwargs):
             info_copy = self._copy_infodict(info)
             self._hook_progress({'status': 'started'}, info_copy)
-            ret = func(self, info, *args, **kwargs)
+            with trace_span(self.PP_NAME, 'postprocess', id=info.get('id')):
+                ret = func(self, info, *args, **kwargs)
             if ret is not None:
                 _, info = ret
             self._hook_progress({'status': 'finished'}, info_copy)
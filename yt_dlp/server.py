@@ -0,0 +1,210 @@
+import hmac
+import http.server
+import ipaddress
+import json
+import os
+import secrets
+import socket
+import socketserver
+import threading
+import time
+
+from .archive import DownloadArchive
+from .utils import DownloadCancelled, DownloadError, YoutubeDLError, variadic
+from .version import __version__
+
+
+class YoutubeDLServer:
+    """A JSON API to run jobs against one long-lived YoutubeDL instance
+
+    Since the extractors, the Cache, the connection pools of the RequestDirector
+    and the post-processors of the YoutubeDL are reused by all the jobs, only the
+    first job pays for their initialization. Endpoints:
+
+        GET  /status                            {"version": ..., "jobs": int, "uptime": float}
+        POST /extract   {"url": URL}            The sanitized info dict, as given by --dump-single-json
+        POST /download  {"urls": [URL, ...]}    {"retcode": int}
+
+    Errors are returned as {"error": message} with a 4xx/5xx status code.
+    Jobs are run one at a time, since the YoutubeDL keeps per-run state;
+    use --concurrent-videos to parallelize the videos of each job.
+
+    Since web pages can send requests to loopback addresses, POST bodies must have
+    "Content-Type: application/json" (which browsers do not send cross-origin without
+    a preflight) and, over TCP, the Host header must be the listening address
+    (against DNS rebinding). It is not checked when listening on a wildcard address
+
+    @param address  "[HOST:]PORT" to listen on (HOST defaults to 127.0.0.1),
+                    or the path of a UNIX socket
+    @param token    If given, requests must have "Authorization: Bearer TOKEN"
+    """
+
+    def __init__(self, ydl, address, token=None):
+        self.ydl, self.token = ydl, token
+        self._lock = threading.Lock()
+        self._jobs, self._started = 0, time.monotonic()
+        host, _, port = address.rpartition(':')
+        if port.isdecimal():
+            self._server = _TCPServer((host or '127.0.0.1', int(port)), _RequestHandler)
+            self.address, self._socket_path = '{}:{}'.format(*self._server.server_address[:2]), None
+            self._allowed_hosts = _allowed_hosts(*self._server.server_address[:2])
+        elif _UnixServer:
+            self._server = _UnixServer(address, _RequestHandler)
+            self.address = self._socket_path = address
+            # Browsers cannot connect to UNIX sockets
+            self._allowed_hosts = None
+        else:
+            raise YoutubeDLError(f'Invalid server address {address!r}; UNIX sockets are not supported on this platform')
+        self._server.yt_dlp_server = self
+
+    def serve_forever(self):
+        self.ydl.to_screen(f'[server] Listening on {self.address}')
+        self._server.serve_forever()
+
+    def shutdown(self):
+        """Stop serve_forever; must be called from another thread"""
+        self._server.shutdown()
+
+    def close(self):
+        self._server.server_close()
+        if self._socket_path:
+            os.remove(self._socket_path)
+
+    def check_request(self, headers, json_body=False):
+        """Return (status, error) if the request must be rejected, else None"""
+        if self._allowed_hosts is not None and (headers.get('Host') or '').lower() not in self._allowed_hosts:
+            return 403, f'Invalid Host header; expected {self.address}'
+        if self.token:
+            scheme, _, token = (headers.get('Authorization') or '').partition(' ')
+            if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip().encode(), self.token.encode()):
+                return 401, 'A valid bearer token is required'
+        if json_body and headers.get_content_type() != 'application/json':
+            return 415, 'Content-Type must be application/json'
+
+    def status(self):
+        return {
+            'version': __version__,
+            'jobs': self._jobs,
+            'uptime': time.monotonic() - self._started,
+        }
+
+    def run_job(self, endpoint, job):
+        with self._lock:
+            self._jobs += 1
+            ydl = self.ydl
+            # Counters such as --max-downloads apply to each job
+            ydl._download_retcode, ydl._num_downloads = 0, 0
+            try:
+                if endpoint == 'extract':
+                    info = ydl.extract_info(job['url'], download=False)
+                    if info is None:
+                        raise DownloadError(f'Unable to extract {job["url"]}')
+                    return ydl.sanitize_info(info)
+                elif endpoint == 'download':
+                    try:
+                        return {'retcode': ydl.download(list(variadic(job['urls'])))}
+                    except DownloadCancelled:
+                        ydl.to_screen('Aborting remaining downloads')
+                        return {'retcode': 101}
+            finally:
+                # The archive may also be a set or list when used through the API
+                if isinstance(ydl.archive, DownloadArchive):
+                    ydl.archive.flush()
+
+
+def _allowed_hosts(host, port):
+    """The values of the Host header that address the server, or None to allow any"""
+    try:
+        ip = ipaddress.ip_address(host)
+    except ValueError:
+        return {f'{host.lower()}:{port}'}
+    if ip.is_unspecified:
+        return None
+    hosts = {f'[{ip}]:{port}' if ip.version == 6 else f'{ip}:{port}'}
+    if ip.is_loopback:
+        hosts.add(f'localhost:{port}')
+    return hosts
+
+
+def serve(ydl, address, token=None):
+    """Run a YoutubeDLServer until interrupted. Returns the exit code
+
+    A random token is generated and printed if none is given"""
+    if not token:
+        token = secrets.token_urlsafe()
+        ydl.to_screen(f'[server] Requests must have the header "Authorization: Bearer {token}"')
+    server = YoutubeDLServer(ydl, address, token)
+    try:
+        server.serve_forever()
+    finally:
+        server.close()
+    return ydl._download_retcode
+
+
+class _RequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = f'yt-dlp/{__version__}'
+
+    def _respond(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 401:
+            self.send_header('WWW-Authenticate', 'Bearer')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        error = self.server.yt_dlp_server.check_request(self.headers)
+        if error:
+            return self._respond(error[0], {'error': error[1]})
+        elif self.path != '/status':
+            return self._respond(404, {'error': f'Unknown endpoint {self.path}'})
+        self._respond(200, self.server.yt_dlp_server.status())
+
+    def do_POST(self):
+        endpoint, required = {
+            '/extract': ('extract', 'url'),
+            '/download': ('download', 'urls'),
+        }.get(self.path, (None, None))
+        # The body is read first so that the connection can be kept alive
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        error = self.server.yt_dlp_server.check_request(self.headers, json_body=True)
+        if error:
+            return self._respond(error[0], {'error': error[1]})
+        try:
+            job = json.loads(body or b'{}')
+        except ValueError as e:
+            return self._respond(400, {'error': f'Invalid JSON: {e}'})
+        if not endpoint:
+            return self._respond(404, {'error': f'Unknown endpoint {self.path}'})
+        elif not isinstance(job, dict) or not job.get(required):
+            return self._respond(400, {'error': f'"{required}" is required'})
+
+        try:
+            result = self.server.yt_dlp_server.run_job(endpoint, job)
+        except DownloadError as e:
+            return self._respond(500, {'error': str(e)})
+        except Exception as e:
+            self.server.yt_dlp_server.ydl.report_warning(f'Unexpected error in server job: {e}')
+            return self._respond(500, {'error': f'{type(e).__name__}: {e}'})
+        self._respond(200, result)
+
+    def log_message(self, format, *args):
+        self.server.yt_dlp_server.ydl.write_debug(f'[server] {format % args}')
+
+    def address_string(self):
+        # client_address is empty for UNIX sockets
+        return self.client_address[0] if self.client_address else 'unix'
+
+
+class _TCPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+
+if hasattr(socket, 'AF_UNIX'):
+    class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+else:
+    _UnixServer = None
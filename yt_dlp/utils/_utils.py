@@ -3210,40 +3210,52 @@ def filter_using_list(row, filter_array):
     return '\n'.join(''.join(row).rstrip() for row in table)
 
 
-def _match_one(filter_part, dct, incomplete):
-    # TODO: Generalize code with YoutubeDL._build_format_filter
-    STRING_OPERATORS = {
-        '*=': operator.contains,
-        '^=': lambda attr, value: attr.startswith(value),
-        '$=': lambda attr, value: attr.endswith(value),
-        '~=': lambda attr, value: re.search(value, attr),
-    }
-    COMPARISON_OPERATORS = {
-        **STRING_OPERATORS,
-        '<=': operator.le,  # "<=" must be defined above "<"
-        '<': operator.lt,
-        '>=': operator.ge,
-        '>': operator.gt,
-        '=': operator.eq,
-    }
+_MATCH_STRING_OPERATORS = {
+    '*=': operator.contains,
+    '^=': lambda attr, value: attr.startswith(value),
+    '$=': lambda attr, value: attr.endswith(value),
+    '~=': lambda attr, value: re.search(value, attr),
+}
+_MATCH_COMPARISON_OPERATORS = {
+    **_MATCH_STRING_OPERATORS,
+    '<=': operator.le,  # "<=" must be defined above "<"
+    '<': operator.lt,
+    '>=': operator.ge,
+    '>': operator.gt,
+    '=': operator.eq,
+}
+_MATCH_UNARY_OPERATORS = {
+    '': lambda v: (v is True) if isinstance(v, bool) else (v is not None),
+    '!': lambda v: (v is False) if isinstance(v, bool) else (v is None),
+}
+_MATCH_COMPARISON_RE = re.compile(r'''(?x)
+    (?P<key>[a-z_]+)
+    \s*(?P<negation>!\s*)?(?P<op>{})(?P<none_inclusive>\s*\?)?\s*
+    (?:
+        (?P<quote>["\'])(?P<quotedstrval>.+?)(?P=quote)|
+        (?P<strval>.+?)
+    )
+    '''.format('|'.join(map(re.escape, _MATCH_COMPARISON_OPERATORS.keys()))))
+_MATCH_UNARY_RE = re.compile(r'''(?x)
+    (?P<op>{})\s*(?P<key>[a-z_]+)
+    '''.format('|'.join(map(re.escape, _MATCH_UNARY_OPERATORS.keys()))))
 
-    if isinstance(incomplete, bool):
-        is_incomplete = lambda _: incomplete
-    else:
-        is_incomplete = lambda k: k in incomplete
 
-    operator_rex = re.compile(r'''(?x)
-        (?P<key>[a-z_]+)
-        \s*(?P<negation>!\s*)?(?P<op>{})(?P<none_inclusive>\s*\?)?\s*
-        (?:
-            (?P<quote>["\'])(?P<quotedstrval>.+?)(?P=quote)|
-            (?P<strval>.+?)
-        )
-        '''.format('|'.join(map(re.escape, COMPARISON_OPERATORS.keys()))))
-    m = operator_rex.fullmatch(filter_part.strip())
+def _is_incomplete(key, incomplete):
+    return incomplete if isinstance(incomplete, bool) else key in incomplete
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_match_one(filter_part):
+    """Parse a single condition of a match filter
+    @returns    A predicate func(dct, incomplete) with the semantics of _match_one
+    """
+    # TODO: Generalize code with YoutubeDL._build_format_filter
+    m = _MATCH_COMPARISON_RE.fullmatch(filter_part.strip())
     if m:
         m = m.groupdict()
-        unnegated_op = COMPARISON_OPERATORS[m['op']]
+        key, op_name, none_inclusive = m['key'], m['op'], m['none_inclusive']
+        unnegated_op = _MATCH_COMPARISON_OPERATORS[op_name]
         if m['negation']:
             op = lambda attr, value: not unnegated_op(attr, value)
         else:
@@ -3251,43 +3263,56 @@ def _match_one(filter_part, dct, incomplete):
         comparison_value = m['quotedstrval'] or m['strval']
         if m['quote']:
             comparison_value = comparison_value.replace(r'\{}'.format(m['quote']), m['quote'])
-        actual_value = dct.get(m['key'])
-        numeric_comparison = None
-        if isinstance(actual_value, (int, float)):
-            # If the original field is a string and matching comparisonvalue is
-            # a number we should respect the origin of the original field
-            # and process comparison value as a string (see
-            # https://github.com/ytdl-org/youtube-dl/issues/11082)
-            try:
-                numeric_comparison = int(comparison_value)
-            except ValueError:
-                numeric_comparison = parse_filesize(comparison_value)
-                if numeric_comparison is None:
-                    numeric_comparison = parse_filesize(f'{comparison_value}B')
-                if numeric_comparison is None:
-                    numeric_comparison = parse_duration(comparison_value)
-        if numeric_comparison is not None and m['op'] in STRING_OPERATORS:
-            raise ValueError('Operator {} only supports string values!'.format(m['op']))
-        if actual_value is None:
-            return is_incomplete(m['key']) or m['none_inclusive']
-        return op(actual_value, comparison_value if numeric_comparison is None else numeric_comparison)
-
-    UNARY_OPERATORS = {
-        '': lambda v: (v is True) if isinstance(v, bool) else (v is not None),
-        '!': lambda v: (v is False) if isinstance(v, bool) else (v is None),
-    }
-    operator_rex = re.compile(r'''(?x)
-        (?P<op>{})\s*(?P<key>[a-z_]+)
-        '''.format('|'.join(map(re.escape, UNARY_OPERATORS.keys()))))
-    m = operator_rex.fullmatch(filter_part.strip())
+        # If the original field is a string and matching comparisonvalue is
+        # a number we should respect the origin of the original field
+        # and process comparison value as a string (see
+        # https://github.com/ytdl-org/youtube-dl/issues/11082)
+        try:
+            numeric_comparison = int(comparison_value)
+        except ValueError:
+            numeric_comparison = parse_filesize(comparison_value)
+            if numeric_comparison is None:
+                numeric_comparison = parse_filesize(f'{comparison_value}B')
+            if numeric_comparison is None:
+                numeric_comparison = parse_duration(comparison_value)
+
+        def match_comparison(dct, incomplete):
+            actual_value = dct.get(key)
+            if numeric_comparison is not None and isinstance(actual_value, (int, float)):
+                if op_name in _MATCH_STRING_OPERATORS:
+                    raise ValueError(f'Operator {op_name} only supports string values!')
+                return op(actual_value, numeric_comparison)
+            if actual_value is None:
+                return _is_incomplete(key, incomplete) or none_inclusive
+            return op(actual_value, comparison_value)
+        return match_comparison
+
+    m = _MATCH_UNARY_RE.fullmatch(filter_part.strip())
     if m:
-        op = UNARY_OPERATORS[m.group('op')]
-        actual_value = dct.get(m.group('key'))
-        if is_incomplete(m.group('key')) and actual_value is None:
-            return True
-        return op(actual_value)
+        op, key = _MATCH_UNARY_OPERATORS[m.group('op')], m.group('key')
+
+        def match_unary(dct, incomplete):
+            actual_value = dct.get(key)
+            if actual_value is None and _is_incomplete(key, incomplete):
+                return True
+            return op(actual_value)
+        return match_unary
 
-    raise ValueError(f'Invalid filter part {filter_part!r}')
+    def invalid_filter(dct, incomplete):
+        raise ValueError(f'Invalid filter part {filter_part!r}')
+    return invalid_filter
+
+
+def _match_one(filter_part, dct, incomplete):
+    return _compile_match_one(filter_part)(dct, incomplete)
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_match_str(filter_str):
+    """Parse a match filter once into the predicates of each of its conditions"""
+    return tuple(
+        _compile_match_one(filter_part.replace(r'\&', '&'))
+        for filter_part in re.split(r'(?<!\\)&', filter_str))
 
 
 def match_str(filter_str, dct, incomplete=False):
@@ -3297,9 +3322,7 @@ def match_str(filter_str, dct, incomplete=False):
                        Can be True/False to indicate all/none of the keys may be missing.
                        All conditions on incomplete keys pass if the key is missing
     """
-    return all(
-        _match_one(filter_part.replace(r'\&', '&'), dct, incomplete)
-        for filter_part in re.split(r'(?<!\\)&', filter_str))
+    return all(predicate(dct, incomplete) for predicate in _compile_match_str(filter_str))
 
 
 def match_filter_func(filters, breaking_filters=None):
@@ -3313,6 +3336,7 @@ def match_filter_func(filters, breaking_filters=None):
     interactive = '-' in filters
     if interactive:
         filters.remove('-')
+    compiled_filters = [_compile_match_str(f) for f in filters]
 
     @function_with_repr.set_repr(repr_)
     def _match_func(info_dict, incomplete=False):
@@ -3320,7 +3344,9 @@ def _match_func(info_dict, incomplete=False):
         if ret is not None:
             raise RejectedVideoReached(ret)
 
-        if not filters or any(match_str(f, info_dict, incomplete) for f in filters):
+        if not filters or any(
+                all(predicate(info_dict, incomplete) for predicate in predicates)
+                for predicates in compiled_filters):
             return NO_DEFAULT if interactive and not incomplete else None
         else:
             video_title = info_dict.get('title') or info_dict.get('id') or 'entry'
@@ -0,0 +1,118 @@
+"""Performance tracing in the Chrome trace event format
+
+The trace file can be opened in chrome://tracing or https://ui.perfetto.dev.
+While no trace is being recorded, trace_span and traced only cost a global lookup
+"""
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+_NULL_SPAN = contextlib.nullcontext()
+_tracer = None
+
+
+class Tracer:
+    """Records timed spans to a trace file
+
+    The file is a JSON array with one event per line. Spans are written
+    when they end and nest by time within each thread. As allowed by the
+    format, the array is not closed if the process does not exit cleanly
+    """
+
+    def __init__(self, fn):
+        self.fn = fn
+        self._file = open(fn, 'w', encoding='utf-8')
+        self._file.write('[\n')
+        self._lock = threading.Lock()
+        self._pid, self._start = os.getpid(), time.perf_counter_ns()
+        self._threads = set()
+
+    def _write(self, event):
+        event.update(pid=self._pid, tid=threading.get_ident())
+        with self._lock:
+            if self._file is None:
+                return
+            if event['tid'] not in self._threads:
+                self._threads.add(event['tid'])
+                self._file.write(json.dumps({
+                    'name': 'thread_name', 'ph': 'M', 'pid': self._pid, 'tid': event['tid'],
+                    'args': {'name': threading.current_thread().name},
+                }) + ',\n')
+            self._file.write(json.dumps(event, default=str) + ',\n')
+
+    @contextlib.contextmanager
+    def span(self, name, category, args=None):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            event = {
+                'name': name, 'cat': category, 'ph': 'X',
+                'ts': (start - self._start) / 1000, 'dur': (end - start) / 1000,
+            }
+            if args:
+                event['args'] = args
+            self._write(event)
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            # Trailing commas are not allowed in the JSON array
+            self._file.write(json.dumps({'name': 'end', 'ph': 'i', 's': 'g', 'pid': self._pid, 'tid': 0,
+                                         'ts': (time.perf_counter_ns() - self._start) / 1000}) + '\n]\n')
+            self._file.close()
+            self._file = None
+
+
+def start_tracing(fn):
+    """Start recording spans from all threads to the file, unless a trace is already being recorded
+
+    @returns    The new Tracer, or None
+    """
+    global _tracer
+    if _tracer is not None:
+        return None
+    _tracer = Tracer(fn)
+    return _tracer
+
+
+def stop_tracing(tracer):
+    global _tracer
+    if tracer is None:
+        return
+    if _tracer is tracer:
+        _tracer = None
+    tracer.close()
+
+
+def trace_span(name, category, **args):
+    """Context manager that records a span, if tracing"""
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, category, args)
+
+
+def traced(category, name=None, args=None):
+    """Decorator that records each call of the function as a span, if tracing
+
+    @param name     Name of the spans. Defaults to the qualified name of the function
+    @param args     Function that returns the args of the span, given the arguments of the call
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*func_args, **func_kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return func(*func_args, **func_kwargs)
+            with tracer.span(span_name, category, args and args(*func_args, **func_kwargs)):
+                return func(*func_args, **func_kwargs)
+        return wrapper
+    return decorator